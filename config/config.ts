@@ -1,5 +1,10 @@
 // Parameters for Application
-export interface AppParameter {}
+export interface AppParameter {
+  // 単月のアップロードをRunWorkSchedule(1プロセス)で処理する
+  useWorkScheduleRunner: boolean;
+}
 
 // Example
-export const config: AppParameter = {};
+export const config: AppParameter = {
+  useWorkScheduleRunner: false,
+};
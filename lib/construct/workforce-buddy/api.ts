@@ -1,11 +1,18 @@
-import { aws_kms as kms, aws_lambda as lambda } from "aws-cdk-lib";
+import {
+  aws_dynamodb as dynamodb,
+  aws_kms as kms,
+  aws_lambda as lambda,
+} from "aws-cdk-lib";
 import { Construct } from "constructs";
 
 import { Lambda } from "./lambda";
 
 export interface ApiProps {
+  table: dynamodb.ITable;
   appKey: kms.IKey;
   workscheduleMakerKey: string;
+  workscheduleRunnerKey: string;
+  coreLayer: lambda.ILayerVersion;
 }
 
 export class Api extends Construct {
@@ -17,8 +24,11 @@ export class Api extends Construct {
 
     // Lambda Function
     const functions = new Lambda(this, "LambdaSlackHandle", {
+      table: props.table,
       appKey: props.appKey,
       workscheduleMakerKey: props.workscheduleMakerKey,
+      workscheduleRunnerKey: props.workscheduleRunnerKey,
+      coreLayer: props.coreLayer,
     });
 
     // Lambda FunctionURLs
@@ -1,5 +1,6 @@
 import * as cdk from "aws-cdk-lib";
 import {
+  aws_dynamodb as dynamodb,
   aws_iam as iam,
   aws_kms as kms,
   aws_lambda as lambda,
@@ -8,8 +9,11 @@ import {
 import { Construct } from "constructs";
 
 export interface LambdaProps {
+  table: dynamodb.ITable;
   appKey: kms.IKey;
   workscheduleMakerKey: string;
+  workscheduleRunnerKey: string;
+  coreLayer: lambda.ILayerVersion;
 }
 
 export class Lambda extends Construct {
@@ -99,13 +103,16 @@ export class Lambda extends Construct {
         runtime: lambda.Runtime.PYTHON_3_9,
         code: lambda.Code.fromAsset("src/lambda/handle_workforce_buddy"),
         handler: "handle_workforce_buddy.lambda_handler",
-        layers: [slackBoltLayer],
+        layers: [props.coreLayer, slackBoltLayer],
         timeout: cdk.Duration.minutes(1),
         environment: {
           SLACK_SIGNING_SECRET: slackSigningSecret,
           SLACK_BOT_TOKEN: slackBotToken,
           SLACK_BOT_ID: slackBotId,
           WORKSCHEDULE_MAKER_KEY: props.workscheduleMakerKey,
+          WORKSCHEDULE_RUNNER_KEY: props.workscheduleRunnerKey,
+          TABLE_NAME: props.table.tableName,
+          LOG_LEVEL: "INFO",
         },
       }
     );
@@ -123,6 +130,16 @@ export class Lambda extends Construct {
         resources: ["*"],
       })
     );
+    handleWorkforceBuddy.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: [
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:DeleteItem",
+        ],
+        resources: [props.table.tableArn],
+      })
+    );
     this.handleWorkforceBuddy = handleWorkforceBuddy;
   }
 }
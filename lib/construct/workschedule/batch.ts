@@ -2,6 +2,7 @@ import {
   aws_dynamodb as dynamodb,
   aws_iam as iam,
   aws_kms as kms,
+  aws_lambda as lambda,
   aws_s3 as s3,
   aws_stepfunctions as sfn,
 } from "aws-cdk-lib";
@@ -13,10 +14,12 @@ export interface BatchProps {
   table: dynamodb.ITable;
   bucket: s3.IBucket;
   appKey: kms.IKey;
+  coreLayer: lambda.ILayerVersion;
 }
 
 export class Batch extends Construct {
   public readonly activationKey: string;
+  public readonly runnerKey: string;
   constructor(scope: Construct, id: string, props: BatchProps) {
     super(scope, id);
 
@@ -26,6 +29,7 @@ export class Batch extends Construct {
       table: props.table,
       bucket: props.bucket,
       appKey: props.appKey,
+      coreLayer: props.coreLayer,
     });
 
     //-------------------------------------------
@@ -82,11 +86,7 @@ export class Batch extends Construct {
         /SEND_WORK_SCHEDULE_LAMBDA_ARN/g,
         `${functions.sendWorkSchedule.functionArn}:$LATEST`
       )
-      .replace(/WORKSCHEDULE_TABLE_NAME/g, `${props.table.tableName}`)
-      .replace(
-        /CREATE_USER_CONFIG_STATEMACHINE_ARN/g,
-        `${createUserConfig.stateMachineArn}`
-      );
+      .replace(/WORKSCHEDULE_TABLE_NAME/g, `${props.table.tableName}`);
     // Step Functions Statemachine
     const workScheduleMaker = new sfn.StateMachine(this, "WorkScheduleMaker", {
       stateMachineName: "WorkScheduleMaker",
@@ -106,22 +106,29 @@ export class Batch extends Construct {
     );
     workScheduleMaker.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ["dynamodb:Query", "dynamodb:GetItem", "dynamodb:PutItem"],
+        // DeleteItem: まとめたアップロードのバッファの取り出し(FlushUploads)
+        actions: [
+          "dynamodb:Query",
+          "dynamodb:GetItem",
+          "dynamodb:PutItem",
+          "dynamodb:DeleteItem",
+        ],
         resources: [props.table.tableArn],
       })
     );
-    workScheduleMaker.addToRolePolicy(
-      new iam.PolicyStatement({
-        actions: ["states:StartExecution"],
-        resources: [createUserConfig.stateMachineArn],
-      })
+    this.activationKey = workScheduleMaker.stateMachineArn;
+
+    // 上限を超えるジョブはRunWorkScheduleからステートマシンへ委譲する
+    functions.runWorkSchedule.addEnvironment(
+      "WORKSCHEDULE_MAKER_KEY",
+      workScheduleMaker.stateMachineArn
     );
-    workScheduleMaker.addToRolePolicy(
+    functions.runWorkSchedule.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ["events:PutTargets", "events:PutRule", "events:DescribeRule"],
-        resources: ["*"],
+        actions: ["states:StartExecution"],
+        resources: [workScheduleMaker.stateMachineArn],
       })
     );
-    this.activationKey = workScheduleMaker.stateMachineArn;
+    this.runnerKey = functions.runWorkSchedule.functionName;
   }
 }
@@ -31,10 +31,30 @@ export class Datastore extends Construct {
         type: dynamodb.AttributeType.STRING,
       },
       billingMode: dynamodb.BillingMode.PAY_PER_REQUEST,
+      timeToLiveAttribute: "expires_at",
       encryption: dynamodb.TableEncryption.CUSTOMER_MANAGED,
       encryptionKey: props.appKey,
       removalPolicy: cdk.RemovalPolicy.RETAIN,
     });
+    // 勤務月ごと(Month#yyyy-mm)・テンプレートごと(Template#id)のユーザ一覧
+    table.addGlobalSecondaryIndex({
+      indexName: "InvertedIndex",
+      partitionKey: {
+        name: "index_pk",
+        type: dynamodb.AttributeType.STRING,
+      },
+      sortKey: {
+        name: "index_sk",
+        type: dynamodb.AttributeType.STRING,
+      },
+      projectionType: dynamodb.ProjectionType.INCLUDE,
+      nonKeyAttributes: [
+        "work_minutes",
+        "night_minutes",
+        "break_minutes",
+        "template_id",
+      ],
+    });
     this.table = table;
 
     //-------------------------------------------
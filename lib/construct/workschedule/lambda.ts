@@ -4,7 +4,9 @@ import {
   aws_iam as iam,
   aws_kms as kms,
   aws_lambda as lambda,
+  aws_lambda_destinations as destinations,
   aws_s3 as s3,
+  aws_sqs as sqs,
   aws_ssm as ssm,
 } from "aws-cdk-lib";
 import { Construct } from "constructs";
@@ -13,6 +15,7 @@ export interface LambdaProps {
   table: dynamodb.ITable;
   bucket: s3.IBucket;
   appKey: kms.IKey;
+  coreLayer: lambda.ILayerVersion;
 }
 
 export class Lambda extends Construct {
@@ -20,6 +23,8 @@ export class Lambda extends Construct {
   public readonly storeWorkData: lambda.Function;
   public readonly createWorkSchedule: lambda.Function;
   public readonly sendWorkSchedule: lambda.Function;
+  public readonly runWorkSchedule: lambda.Function;
+  public readonly createTeamReport: lambda.Function;
 
   constructor(scope: Construct, id: string, props: LambdaProps) {
     super(scope, id);
@@ -112,11 +117,13 @@ export class Lambda extends Construct {
       runtime: lambda.Runtime.PYTHON_3_9,
       code: lambda.Code.fromAsset("src/lambda/get_work_data"),
       handler: "get_work_data.lambda_handler",
-      layers: [slackLayer],
+      layers: [props.coreLayer, slackLayer],
       timeout: cdk.Duration.minutes(1),
       environment: {
         BUCKET_NAME: props.bucket.bucketName,
+        TABLE_NAME: props.table.tableName,
         SLACK_BOT_TOKEN: slackBotToken,
+        LOG_LEVEL: "INFO",
       },
       environmentEncryption: props.appKey,
     });
@@ -124,7 +131,13 @@ export class Lambda extends Construct {
     getWorkData.addToRolePolicy(kmsPolicy);
     getWorkData.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ["s3:PutObject", "s3:DeleteObject"],
+        actions: ["dynamodb:GetItem"],
+        resources: [props.table.tableArn],
+      })
+    );
+    getWorkData.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ["s3:GetObject", "s3:PutObject", "s3:DeleteObject"],
         resources: [`${props.bucket.bucketArn}*`],
       })
     );
@@ -141,11 +154,12 @@ export class Lambda extends Construct {
       runtime: lambda.Runtime.PYTHON_3_9,
       code: lambda.Code.fromAsset("src/lambda/store_work_data"),
       handler: "store_work_data.lambda_handler",
-      layers: [pandasLayer],
+      layers: [props.coreLayer, pandasLayer],
       timeout: cdk.Duration.minutes(1),
       environment: {
         TABLE_NAME: props.table.tableName,
         BUCKET_NAME: props.bucket.bucketName,
+        LOG_LEVEL: "INFO",
       },
       environmentEncryption: props.appKey,
     });
@@ -153,7 +167,11 @@ export class Lambda extends Construct {
     storeWorkData.addToRolePolicy(kmsPolicy);
     storeWorkData.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ["dynamodb:BatchWriteItem"],
+        actions: [
+          "dynamodb:BatchGetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+        ],
         resources: ["*"],
       })
     );
@@ -176,11 +194,12 @@ export class Lambda extends Construct {
       runtime: lambda.Runtime.PYTHON_3_9,
       code: lambda.Code.fromAsset("src/lambda/create_work_schedule"),
       handler: "create_work_schedule.lambda_handler",
-      layers: [pandasLayer, openpyxlLayer],
+      layers: [props.coreLayer, pandasLayer, openpyxlLayer],
       timeout: cdk.Duration.minutes(1),
       environment: {
         BUCKET_NAME: props.bucket.bucketName,
         TABLE_NAME: props.table.tableName,
+        LOG_LEVEL: "INFO",
       },
       environmentEncryption: props.appKey,
     });
@@ -188,7 +207,7 @@ export class Lambda extends Construct {
     createWorkSchedule.addToRolePolicy(kmsPolicy);
     createWorkSchedule.addToRolePolicy(
       new iam.PolicyStatement({
-        actions: ["dynamodb:Query"],
+        actions: ["dynamodb:Query", "dynamodb:GetItem"],
         resources: [props.table.tableArn],
       })
     );
@@ -211,15 +230,23 @@ export class Lambda extends Construct {
       runtime: lambda.Runtime.PYTHON_3_9,
       code: lambda.Code.fromAsset("src/lambda/send_work_schedule"),
       handler: "send_work_schedule.lambda_handler",
-      layers: [slackLayer],
-      timeout: cdk.Duration.minutes(1),
+      layers: [props.coreLayer, slackLayer],
+      timeout: cdk.Duration.minutes(3),
       environment: {
         SLACK_BOT_TOKEN: slackBotToken,
+        TABLE_NAME: props.table.tableName,
+        LOG_LEVEL: "INFO",
       },
       environmentEncryption: props.appKey,
     });
     // IAM Role
     sendWorkSchedule.addToRolePolicy(kmsPolicy);
+    sendWorkSchedule.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ["dynamodb:GetItem", "dynamodb:PutItem"],
+        resources: [props.table.tableArn],
+      })
+    );
     sendWorkSchedule.addToRolePolicy(
       new iam.PolicyStatement({
         actions: ["s3:GetObject"],
@@ -227,5 +254,98 @@ export class Lambda extends Construct {
       })
     );
     this.sendWorkSchedule = sendWorkSchedule;
+
+    /**
+     * Name: RunWorkSchedule
+     * Resource: Lambda Function
+     * Description: 単月の勤務データ取得から勤務表の送信までを1プロセスで実行する関数
+     */
+    // SQS Queue
+    // 再試行すると勤務表を二重に送信するため、失敗したイベントは再試行せずに保管する
+    const runWorkScheduleFailures = new sqs.Queue(
+      this,
+      "RunWorkScheduleFailures",
+      {
+        encryption: sqs.QueueEncryption.KMS,
+        encryptionMasterKey: props.appKey,
+        retentionPeriod: cdk.Duration.days(14),
+      }
+    );
+    // Lambda Function
+    const runWorkSchedule = new lambda.Function(this, "RunWorkSchedule", {
+      functionName: "RunWorkSchedule",
+      runtime: lambda.Runtime.PYTHON_3_9,
+      code: lambda.Code.fromAsset("src/lambda"),
+      handler: "run_work_schedule.run_work_schedule.lambda_handler",
+      layers: [props.coreLayer, slackLayer, pandasLayer, openpyxlLayer],
+      timeout: cdk.Duration.minutes(3),
+      memorySize: 1024,
+      retryAttempts: 0,
+      onFailure: new destinations.SqsDestination(runWorkScheduleFailures),
+      environment: {
+        BUCKET_NAME: props.bucket.bucketName,
+        TABLE_NAME: props.table.tableName,
+        SLACK_BOT_TOKEN: slackBotToken,
+        LOG_LEVEL: "INFO",
+      },
+      environmentEncryption: props.appKey,
+    });
+    // IAM Role
+    runWorkSchedule.addToRolePolicy(kmsPolicy);
+    runWorkSchedule.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: [
+          "dynamodb:Query",
+          "dynamodb:GetItem",
+          "dynamodb:BatchGetItem",
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+        ],
+        resources: [props.table.tableArn],
+      })
+    );
+    runWorkSchedule.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ["s3:GetObject", "s3:PutObject"],
+        resources: [`${props.bucket.bucketArn}*`],
+      })
+    );
+    this.runWorkSchedule = runWorkSchedule;
+
+    /**
+     * Name: CreateTeamReport
+     * Resource: Lambda Function
+     * Description: チームメンバーごとに1シートの勤務表をまとめたチーム勤務表を作成する関数
+     */
+    // Lambda Function
+    const createTeamReport = new lambda.Function(this, "CreateTeamReport", {
+      functionName: "CreateTeamReport",
+      runtime: lambda.Runtime.PYTHON_3_9,
+      code: lambda.Code.fromAsset("src/lambda"),
+      handler: "create_team_report.create_team_report.lambda_handler",
+      layers: [props.coreLayer, pandasLayer, openpyxlLayer],
+      timeout: cdk.Duration.minutes(5),
+      environment: {
+        BUCKET_NAME: props.bucket.bucketName,
+        TABLE_NAME: props.table.tableName,
+        LOG_LEVEL: "INFO",
+      },
+      environmentEncryption: props.appKey,
+    });
+    // IAM Role
+    createTeamReport.addToRolePolicy(kmsPolicy);
+    createTeamReport.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ["dynamodb:Query", "dynamodb:GetItem"],
+        resources: [props.table.tableArn, `${props.table.tableArn}/index/*`],
+      })
+    );
+    createTeamReport.addToRolePolicy(
+      new iam.PolicyStatement({
+        actions: ["s3:PutObject", "s3:AbortMultipartUpload"],
+        resources: [`${props.bucket.bucketArn}*`],
+      })
+    );
+    this.createTeamReport = createTeamReport;
   }
 }
@@ -1,6 +1,7 @@
-import { Names, Stack, StackProps } from "aws-cdk-lib";
+import { Names, Stack, StackProps, aws_lambda as lambda } from "aws-cdk-lib";
 import { Key } from "aws-cdk-lib/aws-kms";
 import { Construct } from "constructs";
+import { config } from "../../config/config";
 import { Api } from "../construct/workforce-buddy/api";
 import { Batch as WorkScheduleBatch } from "../construct/workschedule/batch";
 import { Datastore as WorkScheduleDatastore } from "../construct/workschedule/datastore";
@@ -17,6 +18,13 @@ export class WorkforceBuddyStack extends Stack {
     });
     this.appKey = cmk;
 
+    // 各Lambda関数で共通して使用する処理(workforce_buddy_core)
+    const coreLayer = new lambda.LayerVersion(this, "CoreLayer", {
+      code: lambda.Code.fromAsset("src/layer/workforce_buddy_core"),
+      compatibleRuntimes: [lambda.Runtime.PYTHON_3_9],
+      description: "workforce_buddy_core",
+    });
+
     const workScheduleDatastore = new WorkScheduleDatastore(this, "Datastore", {
       appKey: cmk,
     });
@@ -25,11 +33,18 @@ export class WorkforceBuddyStack extends Stack {
       appKey: cmk,
       bucket: workScheduleDatastore.bucket,
       table: workScheduleDatastore.table,
+      coreLayer: coreLayer,
     });
 
     new Api(this, "Api", {
+      table: workScheduleDatastore.table,
       appKey: cmk,
       workscheduleMakerKey: workScheduleBatch.activationKey,
+      // 空の場合は全てのアップロードをステートマシンで処理する
+      workscheduleRunnerKey: config.useWorkScheduleRunner
+        ? workScheduleBatch.runnerKey
+        : "",
+      coreLayer: coreLayer,
     });
   }
 }
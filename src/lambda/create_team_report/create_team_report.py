@@ -0,0 +1,393 @@
+import os
+import re
+import tempfile
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+from openpyxl import Workbook
+
+from create_work_schedule import create_work_schedule
+from workforce_buddy_core import (
+    WorkforceBuddyException,
+    decode_item,
+    get_client,
+    get_latest_user_config,
+    get_logger,
+)
+
+# ロギングの初期設定
+logger = get_logger(__name__)
+
+# チーム勤務表の見出し行
+REPORT_HEADER: list[str] = [
+    "日付",
+    "曜日",
+    "勤務形態コード",
+    "開始時刻",
+    "終了時刻",
+    "休憩時間",
+    "勤務時間",
+    "深夜時間",
+    "備考",
+]
+
+# 勤務月・テンプレートごとのユーザ一覧のインデックス名
+INVERTED_INDEX_NAME: str = "InvertedIndex"
+
+# シート名に使用できない文字
+INVALID_SHEET_TITLE_CHARS = re.compile(r"[\[\]:*?/\\]")
+
+# シート名の最大文字数
+MAX_SHEET_TITLE_LENGTH: int = 31
+
+# ユーザ設定に時刻まるめがない場合の既定値(分)
+DEFAULT_TIME_SHARING: int = 1
+
+
+def lambda_handler(event: dict, context: dict) -> dict:
+    """
+    Lambda関数ハンドラ
+
+    Args:
+        event (dict)
+        context (dict)
+
+    Returns:
+        dict: レスポンス
+    """
+    try:
+        logger.log_event(event, context)
+        res: dict = logic(event)
+
+    except WorkforceBuddyException:
+        raise WorkforceBuddyException
+
+    except Exception as err:
+        logger.error("想定外のエラーが発生しました", error=err)
+        raise WorkforceBuddyException
+
+    return res
+
+
+def logic(event: dict) -> dict:
+    """
+    メインロジック
+
+    チームメンバーごとに1シートの勤務表を書き込み専用モードで作成する
+    メンバーの勤務データは1人ずつ取得・書き込みを行い、メモリ上に保持しない
+
+    Args:
+        event (dict):
+            team_name (str): チーム名
+            user_ids (list[str]): チームメンバーの社員番号のリスト(省略可)
+            work_month (str): 勤務月(ex: '2023-07')
+
+    Returns:
+        dict: レスポンス
+    """
+    # 環境情報の読み出し
+    try:
+        team_name: str = event["team_name"]
+        work_month: str = event["work_month"]
+        datetime.strptime(work_month, "%Y-%m")
+        bucket_name: str = os.environ["BUCKET_NAME"]
+        table_name: str = os.environ["TABLE_NAME"]
+    except Exception as err:
+        logger.error("環境情報の読み出しに失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    # メンバーの指定がなければ、勤務月に勤務データがある全ユーザとする
+    user_ids: list[str]
+    if "user_ids" in event:
+        # 重複したメンバーは1シートにまとめる
+        user_ids = list(dict.fromkeys(event["user_ids"]))
+    else:
+        user_ids = list(query_month_users(table_name, work_month))
+
+    if not user_ids:
+        logger.error("チームメンバーがいません")
+        raise WorkforceBuddyException
+
+    object_name: str = f"{team_name}_{'_'.join(work_month.split('-'))}.xlsx"
+
+    # 一時ファイルへ書き出し、そのままS3へアップロード
+    with tempfile.NamedTemporaryFile(suffix=".xlsx") as file:
+        members: Iterator[tuple[dict, list[dict]]] = iter_team_members(
+            table_name, user_ids, work_month
+        )
+        write_team_report(file.name, work_month, members)
+        put_team_report(bucket_name, file.name, object_name)
+
+    # レスポンスを生成
+    response: dict = create_work_schedule.create_response(
+        work_month, bucket_name, object_name
+    )
+
+    return response
+
+
+def iter_team_members(
+    table_name: str, user_ids: list[str], work_month: str
+) -> Iterator[tuple[dict, list[dict]]]:
+    """
+    チームメンバーのユーザ設定と勤務データを1人ずつ取得する
+
+    Args:
+        table_name (str): テーブル名
+        user_ids (list[str]): チームメンバーの社員番号のリスト
+        work_month (str): 勤務月(ex: '2023-07')
+
+    Yields:
+        tuple[dict, list[dict]]: ユーザ設定, 勤務データのリスト
+    """
+    for user_id in user_ids:
+        try:
+            user_config_item: Optional[dict] = get_latest_user_config(
+                table_name, user_id
+            )
+            work_data: list[dict] = query_work_data(
+                table_name, user_id, work_month
+            )
+        except Exception as err:
+            logger.error(
+                "勤務データの取得に失敗しました", user_id=user_id, error=err
+            )
+            raise WorkforceBuddyException
+
+        # ユーザ設定がない場合は社員番号のみで作成する
+        user_config: dict = (
+            decode_item(user_config_item) if user_config_item else {}
+        )
+        user_config = {**user_config, "id": user_id}
+
+        yield user_config, work_data
+
+
+def query_month_users(table_name: str, work_month: str) -> Iterator[str]:
+    """
+    勤務月に勤務データがあるユーザをInvertedIndexから取得する
+
+    Args:
+        table_name (str): テーブル名
+        work_month (str): 勤務月(ex: '2023-07')
+
+    Yields:
+        str: 社員番号
+    """
+    query: dict = {
+        "TableName": table_name,
+        "IndexName": INVERTED_INDEX_NAME,
+        "KeyConditionExpression": "index_pk = :index_pk",
+        "ExpressionAttributeValues": {
+            ":index_pk": {"S": f"Month#{work_month}"}
+        },
+        "ProjectionExpression": "index_sk",
+    }
+    try:
+        while True:
+            res: dict = get_client("dynamodb").query(**query)
+            for item in res["Items"]:
+                yield item["index_sk"]["S"]
+            if "LastEvaluatedKey" not in res:
+                break
+            query["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+    except Exception as err:
+        logger.error("勤務月のユーザ一覧の取得に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+
+def query_work_data(
+    table_name: str, user_id: str, work_month: str
+) -> list[dict]:
+    """
+    1人分・1か月分の勤務データをDBから取得する
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): 社員番号
+        work_month (str): 勤務月(ex: '2023-07')
+
+    Returns:
+        list[dict]: 勤務データのリスト
+    """
+    query: dict = {
+        "TableName": table_name,
+        "KeyConditionExpression": "id = :id AND begins_with(SK, :work_data)",
+        "ExpressionAttributeValues": {
+            ":id": {"S": user_id},
+            ":work_data": {"S": f"WorkData#{work_month}"},
+        },
+    }
+    work_data: list[dict] = []
+    while True:
+        res: dict = get_client("dynamodb").query(**query)
+        work_data.extend(decode_item(item) for item in res["Items"])
+        if "LastEvaluatedKey" not in res:
+            break
+        query["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+    return work_data
+
+
+def write_team_report(
+    path: str,
+    work_month: str,
+    members: Iterable[tuple[dict, list[dict]]],
+) -> int:
+    """
+    チーム勤務表を書き込み専用モードで作成する
+
+    書き込み専用モードでは行をシートごとに一時ファイルへ書き出し、
+    書き終えたシートは閉じるため、メンバー数が増えてもメモリ使用量は増えない
+
+    Args:
+        path (str): 書き出し先のファイルパス
+        work_month (str): 勤務月(ex: '2023-07')
+        members (Iterable[tuple[dict, list[dict]]]):
+            ユーザ設定と勤務データのリスト(1人ずつ取得する)
+
+    Returns:
+        int: 作成したシート数
+    """
+    year_month: datetime = datetime.strptime(work_month, "%Y-%m")
+    days: list[datetime] = [
+        day.to_pydatetime()
+        for day in create_work_schedule.create_one_month_dataframe(work_month)[
+            "datetime"
+        ]
+    ]
+
+    wb = Workbook(write_only=True)
+    sheet_count: int = 0
+    for user_config, work_data in members:
+        ws = wb.create_sheet(title=create_sheet_title(user_config))
+        ws.append(
+            [
+                user_config["id"],
+                user_config.get("user_name"),
+                f"{year_month.year}年{year_month.month}月",
+            ]
+        )
+        ws.append(REPORT_HEADER)
+        for row in iter_report_rows(days, work_data, user_config):
+            ws.append(row)
+        # 書き終えたシートは閉じて書き込みバッファを解放する
+        ws.close()
+        sheet_count += 1
+
+    if sheet_count == 0:
+        logger.error("チームメンバーの勤務データがありません")
+        raise WorkforceBuddyException
+
+    wb.save(path)
+
+    return sheet_count
+
+
+def iter_report_rows(
+    days: list[datetime], work_data: list[dict], user_config: dict
+) -> Iterator[list]:
+    """
+    1か月分の勤務データを行に変換する
+
+    勤務データのない日は日付と曜日のみの行とする
+
+    Args:
+        days (list[datetime]): 勤務月の日付のリスト
+        work_data (list[dict]): 1人分の勤務データのリスト
+        user_config (dict): ユーザ設定
+
+    Yields:
+        list: チーム勤務表の1行
+    """
+    time_sharing: int = int(
+        user_config.get("time_sharing") or DEFAULT_TIME_SHARING
+    )
+
+    # 日付ごとに勤務データをまとめる(ソートキー順)
+    work_by_day: dict[str, list[dict]] = {}
+    for item in sorted(work_data, key=lambda x: x["SK"]):
+        work_by_day.setdefault(item["datetime"], []).append(item)
+
+    for day in days:
+        day_label: str = str(day.day)
+        weekday: str = create_work_schedule.WEEKDAY_JP[day.weekday()]
+        items: list[dict] = work_by_day.get(day.strftime("%Y-%m-%d"), [])
+        if not items:
+            yield [day_label, weekday] + [None] * (len(REPORT_HEADER) - 2)
+            continue
+
+        for item in items:
+            yield [
+                day_label,
+                weekday,
+                item.get("work_code"),
+                format_time(day, item.get("start_datetime"), time_sharing),
+                format_time(day, item.get("end_datetime"), time_sharing),
+                item.get("break_hours"),
+                item.get("work_hours"),
+                item.get("night_hours"),
+                item.get("memo"),
+            ]
+
+
+def format_time(
+    day: datetime, value: Optional[str], time_sharing: int
+) -> Optional[str]:
+    """
+    勤務日からの経過時間を'hh:mm'形式の時刻に変換する
+
+    Args:
+        day (datetime): 勤務日
+        value (Optional[str]): 時刻(ex: '2023-07-03 18:00:00')
+        time_sharing (int): 時刻まるめ(ex: 15 -> 15分単位で切り捨て)
+
+    Returns:
+        Optional[str]: hh:mm形式の時刻文字列
+    """
+    if not value:
+        return None
+
+    elapsed: timedelta = datetime.fromisoformat(value) - day
+
+    return create_work_schedule.print_timedelta(
+        pd.Timedelta(elapsed), time_sharing
+    )
+
+
+def create_sheet_title(user_config: dict) -> str:
+    """
+    シート名を作成する(社員番号 氏名)
+
+    Args:
+        user_config (dict): ユーザ設定
+
+    Returns:
+        str: シート名
+    """
+    title: str = " ".join(
+        filter(None, [user_config["id"], user_config.get("user_name")])
+    )
+    title = INVALID_SHEET_TITLE_CHARS.sub("_", title)
+
+    return title[:MAX_SHEET_TITLE_LENGTH]
+
+
+def put_team_report(bucket_name: str, path: str, object_name: str) -> None:
+    """
+    チーム勤務表をS3へアップロードする
+
+    Args:
+        bucket_name (str): アップロード先S3バケット名
+        path (str): チーム勤務表のファイルパス
+        object_name (str): アップロードするファイル名
+    """
+    try:
+        get_client("s3").upload_file(
+            path, bucket_name, f"team_report/{object_name}"
+        )
+    except Exception as err:
+        logger.error("ファイルのアップロードに失敗しました", error=err)
+        raise WorkforceBuddyException
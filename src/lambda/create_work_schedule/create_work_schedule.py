@@ -1,24 +1,32 @@
+import hashlib
 import io
 import json
-import logging
+import math
 import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Union
+from typing import Any, Callable, Optional, TypeVar, Union
 
-import boto3
 import numpy as np
 import openpyxl
 import pandas as pd
-from boto3.dynamodb.conditions import Key
-from boto3.dynamodb.types import TypeDeserializer
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.utils.cell import coordinate_to_tuple
 
-# ロギングの初期設定
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+from workforce_buddy_core import (
+    WorkforceBuddyException,
+    decode_item,
+    decode_string_columns,
+    get_client,
+    get_logger,
+    measure,
+)
+
+T = TypeVar("T")
 
-s3 = boto3.client("s3")
-dynamodb = boto3.resource("dynamodb")
+# ロギングの初期設定
+logger = get_logger(__name__)
 
 
 # 曜日
@@ -40,10 +48,96 @@ WORK_CODE: dict[str, str] = {
     "11": "in-house_offsite",
 }
 
+# 勤務データ(WorkData#)の項目
+WORK_DATA_COLUMNS: tuple[str, ...] = (
+    "id",
+    "SK",
+    "datetime",
+    "date_code",
+    "work_code",
+    "start_datetime",
+    "end_datetime",
+    "break_hours",
+    "work_hours",
+    "night_hours",
+    "memo",
+)
+
+# 勤務表へ書き込み可能なカラム(convert_work_dataの出力)
+RENDERABLE_COLUMNS: frozenset[str] = frozenset(
+    [
+        "id",
+        "SK",
+        "datetime",
+        "date_code",
+        "work_code",
+        "start_datetime",
+        "end_datetime",
+        "break_hours",
+        "work_hours",
+        "night_hours",
+        "memo",
+        "start_timedelta",
+        "end_timedelta",
+        "start_time",
+        "end_time",
+        "work_day",
+        "work_weekday",
+    ]
+)
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """
+    検証・解析済みのテンプレート設定
+
+    Attributes:
+        template_id (str): テンプレートID
+        version (str): テンプレート設定のバージョン
+        name (str): テンプレートファイル名
+        year_month_formats (dict[str, str]): 年月の書式
+        year_month_cells (dict[str, tuple[int, int]]): 年月を書き込むセル座標
+        user_name_cell (tuple[int, int]): 氏名を書き込むセル座標
+        start_cells (dict[str, tuple[int, int]]): 勤務データの書き込み開始セル座標
+    """
+
+    template_id: str
+    version: str
+    name: str
+    year_month_formats: dict[str, str]
+    year_month_cells: dict[str, tuple[int, int]]
+    user_name_cell: tuple[int, int]
+    start_cells: dict[str, tuple[int, int]]
+
+
+# コンパイル済みテンプレートのキャッシュ(ウォームコンテナ内で保持)
+# key: テンプレートID, value: コンパイル済みテンプレート(最新バージョンのみ)
+_template_cache: dict[str, CompiledTemplate] = {}
 
-# カスタムエラーを定義
-class WorkforceBuddyException(Exception):
-    pass
+# テンプレート設定をDBから取得した時刻(time.monotonic)
+# key: テンプレートID, value: 取得した時刻
+_template_loaded_at: dict[str, float] = {}
+
+# version属性を持たないテンプレート設定のキャッシュの有効期間(秒)
+# (参照からは更新を判定できないため、期間が過ぎたら取得し直す)
+TEMPLATE_CACHE_TTL_SECONDS: float = float(
+    os.environ.get("TEMPLATE_CACHE_TTL_SECONDS", 300)
+)
+
+# ユーザ設定のキャッシュ(ウォームコンテナ内で保持)
+# UserConfig#<作成日時> の項目は更新されないため、キーごとに保持する
+# key: (社員番号, SK), value: 変換済みのユーザ設定
+_user_config_cache: dict[tuple[str, str], dict] = {}
+
+# ユーザ設定のキャッシュの最大件数
+USER_CONFIG_CACHE_SIZE: int = 128
+
+# 入出力(勤務データの取得・テンプレートファイルの取得)を並行して行うスレッド数
+IO_WORKERS: int = 2
+
+# 入出力用のスレッドプール(初回の使用時に作成し、ウォームコンテナ内で再利用する)
+_io_executor: Optional[ThreadPoolExecutor] = None
 
 
 def lambda_handler(event: dict, context: dict) -> dict:
@@ -58,14 +152,14 @@ def lambda_handler(event: dict, context: dict) -> dict:
         dict: レスポンス
     """
     try:
-        logger.info(f"event: {event}")
+        logger.log_event(event, context)
         res: dict = logic(event)
 
     except WorkforceBuddyException:
         raise WorkforceBuddyException
 
     except Exception as err:
-        logger.error(f"想定外のエラーが発生しました\n{err}")
+        logger.error("想定外のエラーが発生しました", error=err)
         raise WorkforceBuddyException
 
     return res
@@ -82,86 +176,472 @@ def logic(event: dict) -> dict:
         dict: レスポンス
     """
     # ファイル情報の読み出し
-    deserializer = TypeDeserializer()
     try:
-        user_config: dict = {
-            k: deserializer.deserialize(v)
-            for k, v in event["user_config"]["Item"].items()
-        }
-        template_config: dict = {
-            k: deserializer.deserialize(v)
-            for k, v in event["template_config"]["Item"].items()
-        }
-        work_info: dict = event["work_info"]["result"]
         work_month: str = event["work_months"]
         bucket_name: str = os.environ["BUCKET_NAME"]
         table_name: str = os.environ["TABLE_NAME"]
     except Exception as err:
-        logger.error("環境情報の読み出しに失敗しました\n{err}")
+        logger.error("環境情報の読み出しに失敗しました", error=err)
         raise WorkforceBuddyException
 
-    # 勤務データをDBから取得
-    table = dynamodb.Table(table_name)
-    work_data: dict = table.query(
-        KeyConditionExpression=Key("id").eq(work_info["user_id"])
-        & Key("SK").begins_with(f"WorkData#{work_month}"),
-    )["Items"]
-    work_df: pd.DataFrame = pd.DataFrame(work_data)
-
-    # 勤務データを必要な形式に加工
-    converted_work_df: pd.DataFrame = convert_work_data(
-        work_month, work_df, user_config
+    timings: dict[str, float] = {}
+
+    # 勤務データの取得は社員番号だけで始められるため、設定の取得より先に開始する
+    work_df_future: Future[pd.DataFrame] = submit_io(
+        timings,
+        "get_work_data",
+        get_work_data,
+        table_name,
+        get_event_user_id(event),
+        work_month,
     )
+    template_file_future: Optional[Future[bytes]] = None
+    try:
+        # ユーザ設定の取得とテンプレート設定のコンパイル(キャッシュ済みなら再利用)
+        with measure(timings, "resolve_configs"):
+            user_config: dict
+            template: CompiledTemplate
+            user_config, template = resolve_configs(event, table_name)
+
+        # テンプレートファイルの読み込み(勤務データの取得・加工と並行して行う)
+        template_file_future = submit_io(
+            timings,
+            "get_template_file",
+            get_template_file,
+            bucket_name,
+            template,
+        )
 
-    # テンプレートファイルの読み込み
-    template_path: str = f"template/{template_config['name']}"
-    template_file: Optional[bytes] = None
+        # 勤務データを必要な形式に加工
+        with measure(timings, "wait_work_data"):
+            work_df: pd.DataFrame = work_df_future.result()
+        with measure(timings, "convert_work_data"):
+            converted_work_df: pd.DataFrame = convert_work_data(
+                work_month, work_df, user_config
+            )
+
+        with measure(timings, "wait_template_file"):
+            template_file: bytes = template_file_future.result()
+
+    except Exception:
+        # 実行中の入出力を次の呼び出しに持ち越さない
+        discard_futures(work_df_future, template_file_future)
+        raise
+
+    # 勤務表の生成
+    with measure(timings, "create_work_schedule"):
+        work_schedule_file: bytes = create_work_schedule(
+            template_file,
+            template,
+            user_config,
+            work_month,
+            converted_work_df,
+        )
+
+    # 勤務表をアップロード
+    with measure(timings, "put_work_schedule"):
+        work_schedule_object_name: str
+        etag: str
+        work_schedule_object_name, etag = put_work_schedule(
+            bucket_name, user_config["id"], work_month, work_schedule_file
+        )
+
+    # レスポンスを生成
+    response: dict = create_response(
+        work_month, bucket_name, work_schedule_object_name, etag
+    )
+
+    logger.info("timings", timings=timings)
+
+    return response
+
+
+def get_event_user_id(event: dict) -> str:
+    """
+    イベントから社員番号を取り出す(設定の取得を待たずに勤務データを取得するため)
+
+    Args:
+        event (dict):
+            user_config_key (dict): ユーザ設定のキー(id, SK)
+            user_config (dict): DynamoDB形式のユーザ設定(Item)
+
+    Returns:
+        str: 社員番号
+    """
     try:
-        template_file = (
-            s3.get_object(Bucket=bucket_name, Key=template_path)
-            .get("Body")
-            .read()
+        if "user_config_key" in event:
+            return event["user_config_key"]["id"]
+        return event["user_config"]["Item"]["id"]["S"]
+    except Exception as err:
+        logger.error("社員番号の読み出しに失敗しました", error=err)
+        raise WorkforceBuddyException
+
+
+def submit_io(
+    timings: dict[str, float],
+    stage: str,
+    func: Callable[..., T],
+    *args: Any,
+) -> Future[T]:
+    """
+    入出力を行う処理をスレッドプールで開始する
+
+    処理時間はステージ名をキーに記録する
+    処理中の例外は、戻り値のFutureのresult()を呼び出した際に送出される
+
+    Args:
+        timings (dict[str, float]): 処理時間(秒)の記録先
+        stage (str): ステージ名
+        func (Callable[..., T]): 実行する処理
+        *args (Any): 処理の引数
+
+    Returns:
+        Future[T]: 処理の戻り値
+    """
+
+    def run() -> T:
+        with measure(timings, stage):
+            return func(*args)
+
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            IO_WORKERS, thread_name_prefix="WorkScheduleIO"
+        )
+
+    return _io_executor.submit(run)
+
+
+def discard_futures(*futures: Optional[Future]) -> None:
+    """
+    開始前の処理を取り消し、実行中の処理は終了を待つ
+
+    ウォームコンテナで再利用するスレッドプールに、失敗した呼び出しの
+    処理が残らないようにする(処理中の例外は送出しない)
+
+    Args:
+        *futures (Optional[Future]): 処理の戻り値(未開始の場合はNone)
+    """
+    for future in futures:
+        if future is not None and not future.cancel():
+            future.exception()
+
+
+def resolve_configs(
+    event: dict, table_name: str
+) -> tuple[dict, CompiledTemplate]:
+    """
+    イベントからユーザ設定とコンパイル済みテンプレートを取得する
+
+    ステートマシンからはキーとバージョンのみ(user_config_key, template_ref)
+    が渡されるため、キャッシュになければDBから取得する
+    設定の項目全体(user_config, template_config)が渡された場合はそれを使用する
+
+    Args:
+        event (dict):
+            user_config_key (dict): ユーザ設定のキー(id, SK)
+            template_ref (dict): DynamoDB形式のテンプレートID・バージョン
+            user_config (dict): DynamoDB形式のユーザ設定(Item)
+            template_config (dict): DynamoDB形式のテンプレート設定(Item)
+        table_name (str): テーブル名
+
+    Returns:
+        tuple[dict, CompiledTemplate]: ユーザ設定, コンパイル済みテンプレート
+    """
+    if "user_config_key" in event:
+        try:
+            user_config_key: dict = event["user_config_key"]
+            template_ref: dict = event["template_ref"]
+        except Exception as err:
+            logger.error("設定の参照の読み出しに失敗しました", error=err)
+            raise WorkforceBuddyException
+
+        return (
+            load_user_config(table_name, user_config_key),
+            load_template(table_name, template_ref),
         )
+
+    try:
+        user_config: dict = decode_item(event["user_config"]["Item"])
+        template_item: dict = event["template_config"]["Item"]
     except Exception as err:
-        logger.error(f"テンプレートファイルの取得に失敗しました\n{err}")
+        logger.error("設定の読み出しに失敗しました", error=err)
         raise WorkforceBuddyException
 
-    # テンプレートファイルを取得できなかった場合
-    if not template_file:
-        logger.error("テンプレートファイルの取得に失敗しました")
+    return user_config, get_compiled_template(template_item)
+
+
+def load_user_config(table_name: str, user_config_key: dict) -> dict:
+    """
+    ユーザ設定を取得する(キャッシュ済みなら再利用)
+
+    Args:
+        table_name (str): テーブル名
+        user_config_key (dict): ユーザ設定のキー(ex: {'id': '1234567',
+            'SK': 'UserConfig#2023-01-01 00:00:00'})
+
+    Returns:
+        dict: ユーザ設定
+    """
+    key: tuple[str, str] = (user_config_key["id"], user_config_key["SK"])
+    user_config: Optional[dict] = _user_config_cache.get(key)
+    if user_config is not None:
+        return user_config
+
+    user_config = decode_item(get_config_item(table_name, *key))
+
+    # 最大件数を超える場合は古いものから破棄する
+    if len(_user_config_cache) >= USER_CONFIG_CACHE_SIZE:
+        _user_config_cache.pop(next(iter(_user_config_cache)))
+    _user_config_cache[key] = user_config
+
+    return user_config
+
+
+def load_template(table_name: str, template_ref: dict) -> CompiledTemplate:
+    """
+    コンパイル済みテンプレートを取得する
+
+    参照のバージョンとキャッシュのバージョンが一致すればDBから取得しない
+    version属性を持たないテンプレート設定は、取得から
+    TEMPLATE_CACHE_TTL_SECONDS の間はキャッシュを使用する
+
+    Args:
+        table_name (str): テーブル名
+        template_ref (dict): DynamoDB形式のテンプレートID・バージョン
+            (ex: {'id': {'S': 'T0001'}, 'version': {'N': '3'}})
+
+    Returns:
+        CompiledTemplate: コンパイル済みテンプレート
+    """
+    try:
+        template_id: str = template_ref["id"]["S"]
+    except Exception as err:
+        logger.error("テンプレートIDの取得に失敗しました", error=err)
         raise WorkforceBuddyException
 
-    # 勤務表の生成
-    work_schedule_file: bytes = create_work_schedule(
-        template_file,
-        template_config,
-        user_config,
-        work_month,
-        converted_work_df,
-    )
+    cached: Optional[CompiledTemplate] = _template_cache.get(template_id)
+    if cached is not None:
+        if template_ref.get("version"):
+            if cached.version == get_template_version(template_ref):
+                return cached
+        elif (
+            time.monotonic() - _template_loaded_at.get(template_id, -math.inf)
+            < TEMPLATE_CACHE_TTL_SECONDS
+        ):
+            return cached
 
-    # 勤務表をアップロード
-    work_schedule_object_name: str = (
-        f"{user_config['id']}_{'_'.join(work_month.split('-'))}.xlsx"
+    template_item: dict = get_config_item(
+        table_name, template_id, "TemplateConfig"
     )
-    work_schedule_path = f"work_schedule/{work_schedule_object_name}"
+    template: CompiledTemplate = get_compiled_template(template_item)
+    _template_loaded_at[template_id] = time.monotonic()
+
+    return template
+
+
+def get_config_item(table_name: str, config_id: str, sort_key: str) -> dict:
+    """
+    設定の項目をDBから取得する
+
+    Args:
+        table_name (str): テーブル名
+        config_id (str): 社員番号またはテンプレートID
+        sort_key (str): ソートキー(ex: 'TemplateConfig')
+
+    Returns:
+        dict: DynamoDB形式の項目
+    """
     try:
-        s3.put_object(
-            Bucket=bucket_name, Body=work_schedule_file, Key=work_schedule_path
+        item: Optional[dict] = (
+            get_client("dynamodb")
+            .get_item(
+                TableName=table_name,
+                Key={"id": {"S": config_id}, "SK": {"S": sort_key}},
+            )
+            .get("Item")
         )
     except Exception as err:
-        logger.error(f"ファイルのアップロードに失敗しました\n{err}")
+        logger.error(
+            "設定の取得に失敗しました", config_id=config_id, error=err
+        )
         raise WorkforceBuddyException
 
-    # レスポンスを生成
-    response: dict = create_response(
-        work_month, bucket_name, work_schedule_object_name
-    )
+    if not item:
+        logger.error(
+            "設定が存在しません", config_id=config_id, sort_key=sort_key
+        )
+        raise WorkforceBuddyException
 
-    return response
+    return item
+
+
+def get_compiled_template(template_item: dict) -> CompiledTemplate:
+    """
+    コンパイル済みテンプレートを取得する
+
+    (テンプレートID, バージョン)が一致するキャッシュがあれば再利用し、
+    なければコンパイルしてキャッシュを置き換える
+
+    Args:
+        template_item (dict): DynamoDB形式のテンプレート設定
+
+    Returns:
+        CompiledTemplate: コンパイル済みテンプレート
+    """
+    try:
+        template_id: str = template_item["id"]["S"]
+    except Exception as err:
+        logger.error("テンプレートIDの取得に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    version: str = get_template_version(template_item)
+    cached: Optional[CompiledTemplate] = _template_cache.get(template_id)
+    if cached is not None and cached.version == version:
+        return cached
+
+    template_config: dict = decode_item(template_item)
+    template: CompiledTemplate = compile_template(template_config, version)
+
+    # 古いバージョンを破棄して置き換える
+    _template_cache[template_id] = template
+
+    return template
+
+
+def get_template_version(template_item: dict) -> str:
+    """
+    テンプレート設定のバージョンを取得する
+
+    version属性を持たない場合は、設定内容のハッシュ値をバージョンとする
+
+    Args:
+        template_item (dict): DynamoDB形式のテンプレート設定
 
+    Returns:
+        str: テンプレート設定のバージョン
+    """
+    version: Optional[dict] = template_item.get("version")
+    if version:
+        return str(next(iter(version.values())))
+
+    digest = hashlib.sha256(
+        json.dumps(template_item, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+    return f"sha256:{digest}"
+
+
+def invalidate_config_cache() -> None:
+    """
+    ユーザ設定とコンパイル済みテンプレートのキャッシュを全て破棄する
+    """
+    _user_config_cache.clear()
+    _template_cache.clear()
+    _template_loaded_at.clear()
 
-def get_work_data(table_name: str, user_id: str, work_month: str) -> dict:
+
+def compile_template(template_config: dict, version: str) -> CompiledTemplate:
+    """
+    テンプレート設定を解析・検証し、コンパイル済みテンプレートを生成する
+
+    設定に誤りがある場合は、勤務表の作成前にエラーとする
+
+    Args:
+        template_config (dict): テンプレート設定
+        version (str): テンプレート設定のバージョン
+
+    Returns:
+        CompiledTemplate: コンパイル済みテンプレート
+    """
+    template_id: str = template_config.get("id", "")
+    try:
+        name: str = template_config["name"]
+        year_month_formats: dict = json.loads(
+            template_config["year_month_formats"]
+        )
+        year_month_cells: dict = json.loads(
+            template_config["year_month_cells"]
+        )
+        start_cells: dict = json.loads(template_config["start_cells"])
+        user_name_cell: str = template_config["user_name_cell"]
+    except Exception as err:
+        logger.error(
+            "テンプレート設定の読み込みに失敗しました",
+            template_id=template_id,
+            error=err,
+        )
+        raise WorkforceBuddyException
+
+    # 年月の書式を検証
+    for key, year_month_format in year_month_formats.items():
+        try:
+            year_month_format.format(year="2000", month="1")
+        except Exception as err:
+            logger.error(
+                "年月の書式が不正です",
+                template_id=template_id,
+                key=key,
+                error=err,
+            )
+            raise WorkforceBuddyException
+
+    # 年月のセルに対応する書式が存在するか検証
+    undefined_keys = set(year_month_cells) - set(year_month_formats)
+    if undefined_keys:
+        logger.error(
+            "書式が未定義の年月セルがあります",
+            template_id=template_id,
+            undefined_keys=undefined_keys,
+        )
+        raise WorkforceBuddyException
+
+    # 書き込むカラムが存在するか検証
+    unknown_columns = set(start_cells) - RENDERABLE_COLUMNS
+    if unknown_columns:
+        logger.error(
+            "存在しないカラムが指定されています",
+            template_id=template_id,
+            unknown_columns=unknown_columns,
+        )
+        raise WorkforceBuddyException
+
+    # セル座標を事前に計算
+    try:
+        compiled_year_month_cells: dict[str, tuple[int, int]] = {
+            key: coordinate_to_tuple(cell)
+            for key, cell in year_month_cells.items()
+        }
+        compiled_start_cells: dict[str, tuple[int, int]] = {
+            column: coordinate_to_tuple(cell)
+            for column, cell in start_cells.items()
+        }
+        compiled_user_name_cell: tuple[int, int] = coordinate_to_tuple(
+            user_name_cell
+        )
+    except Exception as err:
+        logger.error(
+            "セルの指定が不正です", template_id=template_id, error=err
+        )
+        raise WorkforceBuddyException
+
+    return CompiledTemplate(
+        template_id=template_id,
+        version=version,
+        name=name,
+        year_month_formats=year_month_formats,
+        year_month_cells=compiled_year_month_cells,
+        user_name_cell=compiled_user_name_cell,
+        start_cells=compiled_start_cells,
+    )
+
+
+def get_work_data(
+    table_name: str,
+    user_id: str,
+    work_month: str,
+    consistent_read: bool = False,
+) -> pd.DataFrame:
     """
     勤務データをDBから取得
 
@@ -169,19 +649,37 @@ def get_work_data(table_name: str, user_id: str, work_month: str) -> dict:
         table_name (str): テーブル名
         user_id (str): 社員番号
         work_month (str): 勤務月(ex: '2023-07')
+        consistent_read (bool): 強い整合性で読み込むか
+            (登録直後に同じ処理内で読み込む場合に指定する)
 
     Returns:
-        dict: 勤務データ
+        pd.DataFrame: 勤務データ
     """
-    table = dynamodb.Table(table_name)
+    query: dict = {
+        "TableName": table_name,
+        "KeyConditionExpression": "id = :id AND begins_with(SK, :work_data)",
+        "ExpressionAttributeValues": {
+            ":id": {"S": user_id},
+            ":work_data": {"S": f"WorkData#{work_month}"},
+        },
+        "ConsistentRead": consistent_read,
+    }
 
     # 勤務データの取得
-    work_data: dict = table.query(
-        KeyConditionExpression=Key("id").eq(user_id)
-        & Key("SK").begins_with(f"WorkData#{work_month}"),
-    )["Items"]
+    items: list[dict] = []
+    try:
+        while True:
+            res: dict = get_client("dynamodb").query(**query)
+            items.extend(res["Items"])
+            if "LastEvaluatedKey" not in res:
+                break
+            query["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+    except Exception as err:
+        logger.error("勤務データの取得に失敗しました", error=err)
+        raise WorkforceBuddyException
 
-    return work_data
+    return pd.DataFrame(decode_string_columns(items, WORK_DATA_COLUMNS))
 
 
 def convert_work_data(
@@ -306,7 +804,7 @@ def create_one_month_dataframe(year_month: str) -> pd.DataFrame:
 
 def create_work_schedule(
     template_file: bytes,
-    template_config: dict,
+    template: CompiledTemplate,
     user_config: dict,
     work_month: str,
     df: pd.DataFrame,
@@ -316,7 +814,7 @@ def create_work_schedule(
 
     Args:
         template_file (bytes): テンプレートファイル
-        template_config (dict): 作成する勤務表の設定
+        template (CompiledTemplate): 作成する勤務表のコンパイル済み設定
         user_config (dict): ユーザ設定
         work_month (str): 勤務月(ex: '2023-07')
         df (pd.DataFrame): 勤務データ
@@ -324,20 +822,12 @@ def create_work_schedule(
     Returns:
         bytes: 勤務表
     """
-    # テンプレート設定を読み込み
-    year_month_formats: dict = json.loads(
-        template_config["year_month_formats"]
-    )
-    year_month_cells: dict = json.loads(template_config["year_month_cells"])
-    start_cells: dict = json.loads(template_config["start_cells"])
-    user_name_cell: str = template_config["user_name_cell"]
-
     # 日付フォーマットの変換
     year_month: datetime = datetime.strptime(work_month, "%Y-%m")
     year: str = str(year_month.year)
     month: str = str(year_month.month)
     year_months: dict = {}
-    for k, v in year_month_formats.items():
+    for k, v in template.year_month_formats.items():
         year_months[k] = v.format(year=year, month=month)
 
     # テンプレートファイルの読み込み
@@ -345,19 +835,20 @@ def create_work_schedule(
     ws = wb.worksheets[0]
 
     # 年月の書き込み
-    for key, cell in year_month_cells.items():
-        ws[cell] = year_months[key]
+    for key, (row, col) in template.year_month_cells.items():
+        ws.cell(row=row, column=col).value = year_months[key]
 
     # 氏名の書き込み
-    ws[user_name_cell] = user_config.get("user_name")
+    row, col = template.user_name_cell
+    ws.cell(row=row, column=col).value = user_config.get("user_name")
 
     # 勤務データの書き込み
-    for column, cell in start_cells.items():
-        for i, value in enumerate(
-            dataframe_to_rows(df[[column]], index=False, header=False)
-        ):
-            current_cell = ws[cell].offset(i)
-            current_cell.value = value[0]
+    # 勤務のない日の数値の列(NaN)・日時の列(NaT)は空のセルとする
+    for column, (row, col) in template.start_cells.items():
+        for i, value in enumerate(df[column].tolist()):
+            ws.cell(row=row + i, column=col).value = (
+                None if pd.isna(value) else value
+            )
 
     # 勤務表の書き出し
     work_schedule_file: Optional[bytes] = None
@@ -368,8 +859,73 @@ def create_work_schedule(
     return work_schedule_file
 
 
+def get_template_file(bucket_name: str, template: CompiledTemplate) -> bytes:
+    """
+    テンプレートファイルをS3から取得する
+
+    Args:
+        bucket_name (str): S3バケット名
+        template (CompiledTemplate): コンパイル済みテンプレート
+
+    Returns:
+        bytes: テンプレートファイル
+    """
+    template_path: str = f"template/{template.name}"
+    template_file: Optional[bytes] = None
+    try:
+        template_file = (
+            get_client("s3")
+            .get_object(Bucket=bucket_name, Key=template_path)
+            .get("Body")
+            .read()
+        )
+    except Exception as err:
+        logger.error("テンプレートファイルの取得に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    # テンプレートファイルを取得できなかった場合
+    if not template_file:
+        logger.error("テンプレートファイルの取得に失敗しました")
+        raise WorkforceBuddyException
+
+    return template_file
+
+
+def put_work_schedule(
+    bucket_name: str, user_id: str, work_month: str, work_schedule_file: bytes
+) -> tuple[str, str]:
+    """
+    勤務表をS3へアップロードする
+
+    Args:
+        bucket_name (str): アップロード先S3バケット名
+        user_id (str): 社員番号
+        work_month (str): 勤務月(ex: '2023-07')
+        work_schedule_file (bytes): 勤務表
+
+    Returns:
+        tuple[str, str]: アップロードしたファイル名とETag
+    """
+    work_schedule_object_name: str = (
+        f"{user_id}_{'_'.join(work_month.split('-'))}.xlsx"
+    )
+    work_schedule_path = f"work_schedule/{work_schedule_object_name}"
+    try:
+        etag: str = get_client("s3").put_object(
+            Bucket=bucket_name, Body=work_schedule_file, Key=work_schedule_path
+        )["ETag"]
+    except Exception as err:
+        logger.error("ファイルのアップロードに失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    return work_schedule_object_name, etag
+
+
 def create_response(
-    work_month: str, bucket_name: str, object_name: str
+    work_month: str,
+    bucket_name: str,
+    object_name: str,
+    etag: Optional[str] = None,
 ) -> dict:
     """
     関数の返却値を生成する
@@ -378,17 +934,20 @@ def create_response(
         work_month (str): 勤務月(ex: '2023-07')
         bucket_name (str): アップロード先S3バケット名
         object_name (str): アップロードしたファイル名
+        etag (Optional[str]): アップロードしたファイルのETag
 
     Returns:
         dict:
             work_month (str): 勤務月(ex: '2023-07')
             bucket_name (str): アップロード先S3バケット名
             object_name (str): アップロードしたファイル名
+            etag (Optional[str]): アップロードしたファイルのETag
     """
     res: dict = {
         "work_month": work_month,
         "bucket_name": bucket_name,
         "object_name": object_name,
+        "etag": etag,
     }
 
     return res
@@ -1,22 +1,54 @@
-import logging
+import hashlib
 import os
 from typing import Optional
 
-import boto3
-import requests
-from slack_sdk import WebClient
 from slack_sdk.web.slack_response import SlackResponse
 
+from workforce_buddy_core import (
+    HTTP_TIMEOUT,
+    WorkforceBuddyException,
+    check_work_file_header,
+    check_work_file_row,
+    get_client,
+    get_http_session,
+    get_logger,
+    get_slack_client,
+    get_work_file_user_ids,
+)
+
 # ロギングの初期設定
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
+
+# 勤務データとして受け付けるファイル形式(Slackが判定したfiletype)
+ACCEPTED_FILETYPES: frozenset[str] = frozenset(["text", "tsv", "csv"])
+
+# 勤務データとして受け付ける最大ファイルサイズ(バイト)
+MAX_WORK_FILE_BYTES: int = 1024 * 1024
+
+# 見出し行と最初の勤務データの行を探す先頭のバイト数
+# (この範囲に2行分の改行がなければ勤務データではない)
+HEADER_PROBE_BYTES: int = 4096
+
+# ファイルを取得する際の読み込み単位(バイト)
+DOWNLOAD_CHUNK_BYTES: int = 64 * 1024
+
+
+class InvalidWorkFile(WorkforceBuddyException):
+    """
+    ダウンロード中に勤務データではないと判定したファイル
+
+    Args:
+        reason (str): 読み込めない理由
+    """
 
-s3 = boto3.client("s3")
+    def __init__(self, reason: str) -> None:
+        super().__init__(reason)
+        self.reason = reason
 
 
-# カスタムエラーを定義
-class WorkforceBuddyException(Exception):
-    pass
+# アップロード済みファイルの索引のソートキーの接頭辞
+# (send_work_schedule.UPLOAD_INDEX_PREFIXと同じ)
+UPLOAD_INDEX_PREFIX: str = "Upload#"
 
 
 def lambda_handler(event: dict, context: dict) -> dict:
@@ -31,11 +63,11 @@ def lambda_handler(event: dict, context: dict) -> dict:
         dict: レスポンス
     """
     try:
-        logger.info(f"event: {event}")
+        logger.log_event(event, context)
         res: dict = logic(event)
 
     except Exception as err:
-        logger.error(f"想定外のエラーが発生しました\n{err}")
+        logger.error("想定外のエラーが発生しました", error=err)
         raise WorkforceBuddyException
 
     return res
@@ -55,81 +87,419 @@ def logic(event: dict) -> dict:
     try:
         token: str = os.environ["SLACK_BOT_TOKEN"]
         bucket_name: str = os.environ["BUCKET_NAME"]
+        table_name: Optional[str] = os.environ.get("TABLE_NAME")
 
     except Exception as err:
-        logger.error(f"環境情報の読み出しに失敗しました\n{err}")
+        logger.error("環境情報の読み出しに失敗しました", error=err)
         raise WorkforceBuddyException
 
-    # ファイル情報を取得
-    file_id: str = event["slack_info"]["file_id"]
-    slack: WebClient = WebClient(token=token)
+    # 取得するファイルIDの一覧(まとめてアップロードされた場合は複数)
+    slack_info: dict = event["slack_info"]
+    file_ids: list[str] = slack_info.get("file_ids") or [slack_info["file_id"]]
+
+    file_contents: dict[str, bytes] = {}
+    rejected_files: list[tuple[str, str]] = []
+    user_id: Optional[str] = None
+    for file_id in file_ids:
+        # ファイル情報を取得
+        file_info: SlackResponse = get_file_info(file_id, token)
+
+        # ファイル取得(取得しながら内容のハッシュを計算する)
+        # 形式・サイズが勤務データでないファイルはダウンロードせず、
+        # 見出し行・最初の行を読み込めないファイルは先頭のみで取得を打ち切って除外する
+        file_content: bytes = b""
+        content_hash: str = ""
+        reason: Optional[str] = check_work_file(file_info)
+        if not reason:
+            try:
+                file_content, content_hash = download_file(file_info, token)
+            except InvalidWorkFile as err:
+                reason = err.reason
+        # まとめてアップロードされたファイルは最初の社員のものに限る
+        if not reason:
+            reason = check_work_file_user(file_content, user_id)
+        if reason:
+            logger.info(
+                "勤務データではないファイルです",
+                file_id=file_id,
+                reason=reason,
+            )
+            rejected_files.append((file_info["file"].get("name", ""), reason))
+            continue
+
+        # ファイル取得失敗
+        if not file_content:
+            logger.error("ファイル情報の取得に失敗しました")
+            raise WorkforceBuddyException
+
+        # 同じ内容のファイルは1件にまとめる
+        user_id = user_id or min(get_work_file_user_ids(file_content))
+        logger.info(
+            "file",
+            name=file_info["file"]["name"],
+            content_hash=content_hash,
+        )
+        file_contents.setdefault(content_hash, file_content)
+
+    # 除外したファイルをユーザへ通知
+    if rejected_files:
+        reply_rejected_files(slack_info, rejected_files, token)
+
+    file_names: list[str] = list(file_contents)
+    if not file_names:
+        return create_response(file_names)
+
+    # 前回と同じ内容のアップロードであれば、作成済みの勤務表を返す
+    upload_hash: str = get_upload_hash(file_names)
+    duplicate: Optional[dict] = None
+    if table_name:
+        duplicate = find_duplicate_upload(
+            table_name, slack_info["user_id"], upload_hash
+        )
+    if duplicate:
+        logger.info("前回と同じ内容のファイルです", upload_hash=upload_hash)
+        return create_response(file_names, upload_hash, duplicate)
+
+    # S3へファイルを格納(内容のハッシュをキーとする)
+    for file_name, file_content in file_contents.items():
+        put_raw_file(bucket_name, file_name, file_content)
+
+    # レスポンスを作成
+    res = create_response(file_names, upload_hash)
+    return res
+
+
+def get_file_info(file_id: str, token: str) -> SlackResponse:
+    """
+    Slackにアップロードされたファイルの情報を取得する
+
+    Args:
+        file_id (str): SlackのファイルID
+        token (str): アクセストークン
+
+    Returns:
+        SlackResponse: アップロードされたファイル情報
+    """
     file_info: Optional[SlackResponse] = None
     try:
-        file_info = slack.files_info(token=token, file=file_id)
-        logger.info(f"file_info: {file_info}")
+        file_info = get_slack_client(token).files_info(file=file_id)
+        file: dict = file_info["file"]
+        logger.info(
+            "file_info",
+            file_id=file_id,
+            name=file.get("name"),
+            filetype=file.get("filetype"),
+            size=file.get("size"),
+        )
+        logger.debug("file_info", file_info=file_info)
 
     except Exception as err:
-        logger.error(f"ファイル情報の取得に失敗しました\n{err}")
+        logger.error("ファイル情報の取得に失敗しました", error=err)
         raise WorkforceBuddyException
 
-    # ファイル取得
-    file_content: bytes = download_file(file_info, token)
+    return file_info
 
-    # ファイル取得失敗
-    if not file_content:
-        logger.error(f"ファイル情報の取得に失敗しました")
-        raise WorkforceBuddyException
 
-    # S3へファイルを格納
-    file_name: str = file_info["file"]["name"]
-    s3.put_object(
-        Bucket=bucket_name, Body=file_content, Key=f"raw/{file_name}"
-    )
+def check_work_file(file_info: SlackResponse) -> Optional[str]:
+    """
+    勤務データとして読み込めるファイルかを、ファイル情報(形式・サイズ)で
+    ダウンロードの前に検証する
 
-    # レスポンスを作成
-    res = create_response(file_name)
-    return res
+    見出し行と最初の勤務データの行はダウンロードの開始時に検証する(download_file)
+
+    Args:
+        file_info (SlackResponse): アップロードされたファイル情報
 
+    Returns:
+        Optional[str]: 読み込めない理由(読み込める場合はNone)
+    """
+    file: dict = file_info["file"]
+
+    # ファイル形式の検証
+    filetype: str = file.get("filetype", "")
+    if filetype not in ACCEPTED_FILETYPES:
+        return f"ファイル形式が勤務データ(TSV)ではありません({filetype})"
+
+    # ファイルサイズの検証
+    size: int = int(file.get("size", 0))
+    if size <= 0:
+        return "ファイルが空です"
+    if size > MAX_WORK_FILE_BYTES:
+        return f"ファイルサイズが大きすぎます({size}バイト)"
 
-def download_file(file_info: SlackResponse, token: str) -> bytes:
+    return None
+
+
+def check_header(head: bytes, complete: bool) -> Optional[str]:
+    """
+    ファイルの先頭から見出し行と最初の勤務データの行を取り出して検証する
+
+    Args:
+        head (bytes): ファイルの先頭
+        complete (bool): headがファイル全体の場合True
+
+    Returns:
+        Optional[str]: 読み込めない理由(読み込める場合はNone)
+    """
+    lines: list[bytes] = head.split(b"\n", 2)
+    if len(lines) < 3 and not complete:
+        return "見出し行と勤務データの行が見つかりません"
+
+    reason: Optional[str] = check_work_file_header(lines[0])
+    if reason:
+        return reason
+
+    if len(lines) < 2 or not lines[1].rstrip(b"\r"):
+        return "勤務データの行がありません"
+
+    return check_work_file_row(lines[1])
+
+
+def check_work_file_user(
+    content: bytes, user_id: Optional[str]
+) -> Optional[str]:
+    """
+    ファイルの勤務データが1人の社員のものかを検証する
+
+    Args:
+        content (bytes): 勤務データファイル
+        user_id (Optional[str]): 先に受け付けたファイルの社員番号
+
+    Returns:
+        Optional[str]: 受け付けない理由(受け付ける場合はNone)
+    """
+    user_ids: set[str] = get_work_file_user_ids(content)
+    if len(user_ids) > 1:
+        return (
+            "複数の社員の勤務データが含まれています。"
+            "社員ごとに分けてアップロードしてください"
+        )
+    if user_id is not None and user_ids != {user_id}:
+        return (
+            f"他の社員({user_id})のファイルとまとめてアップロードされました。"
+            "社員ごとに分けてアップロードしてください"
+        )
+
+    return None
+
+
+def reply_rejected_files(
+    slack_info: dict, rejected_files: list[tuple[str, str]], token: str
+) -> None:
+    """
+    勤務データとして読み込めなかったファイルをユーザへ通知する
+
+    Args:
+        slack_info (dict): アップロード元のSlack情報
+        rejected_files (list[tuple[str, str]]): ファイル名と理由のリスト
+        token (str): アクセストークン
+    """
+    lines: list[str] = [f"{name}: {reason}" for name, reason in rejected_files]
+    try:
+        get_slack_client(token).chat_postMessage(
+            channel=slack_info["channel_id"],
+            text=f"<@{slack_info['user_id']}>\n"
+            "勤務データとして読み込めないファイルがありました。\n"
+            + "\n".join(lines),
+        )
+    except Exception as err:
+        logger.error("ユーザへの通知に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+
+def download_file(file_info: SlackResponse, token: str) -> tuple[bytes, str]:
     """
     Slackにアップロードされたファイルを取得する
 
+    取得しながら内容のハッシュ(SHA-256)を計算する
+    見出し行と最初の勤務データの行(HEADER_PROBE_BYTESまで)を受信した時点で
+    検証し、勤務データでなければ残りを受信せずに切断する
+
     Args:
         file_info (SlackResponse): アップロードされたファイル情報
         token (str): アクセストークン
 
     Returns:
-        bytes: 勤務データ(バイナリ)
+        tuple[bytes, str]: 勤務データ(バイナリ)と内容のハッシュ(16進数)
+
+    Raises:
+        InvalidWorkFile: 見出し行・勤務データの行を読み込めない場合
     """
     download_url: str = file_info["file"].get("url_private_download")
-    if download_url:
-        headers = {"Authorization": f"Bearer {token}"}
-        try:
-            response: requests.Response = requests.get(
-                download_url, headers=headers
+    if not download_url:
+        logger.error("ファイルのダウンロードURLがありません")
+        raise WorkforceBuddyException
+
+    headers = {"Authorization": f"Bearer {token}"}
+    digest = hashlib.sha256()
+    chunks: list[bytes] = []
+    received: int = 0
+    reason: Optional[str] = None
+    header_checked: bool = False
+    try:
+        with get_http_session().get(
+            download_url, headers=headers, stream=True, timeout=HTTP_TIMEOUT
+        ) as response:
+            logger.info("response", status_code=response.status_code)
+            for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+                digest.update(chunk)
+                chunks.append(chunk)
+                received += len(chunk)
+                if header_checked:
+                    continue
+                head: bytes = b"".join(chunks)[:HEADER_PROBE_BYTES]
+                if head.count(b"\n") >= 2 or received >= HEADER_PROBE_BYTES:
+                    reason = check_header(head, False)
+                    header_checked = True
+                    if reason:
+                        break
+
+    except Exception as err:
+        logger.error("ファイル情報の取得に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    content: bytes = b"".join(chunks)
+    if not header_checked:
+        reason = check_header(content, True)
+    if reason:
+        raise InvalidWorkFile(reason)
+
+    return content, digest.hexdigest()
+
+
+def get_upload_hash(content_hashes: list[str]) -> str:
+    """
+    アップロード全体の内容のハッシュを求める
+
+    1ファイルの場合はファイルのハッシュ、複数ファイルの場合は
+    ファイルのハッシュを並べ替えて連結したもののハッシュとする
+
+    Args:
+        content_hashes (list[str]): ファイルごとの内容のハッシュ
+
+    Returns:
+        str: アップロード全体の内容のハッシュ
+    """
+    if len(content_hashes) == 1:
+        return content_hashes[0]
+    joined: str = "\n".join(sorted(content_hashes))
+    return hashlib.sha256(joined.encode()).hexdigest()
+
+
+def put_raw_file(bucket_name: str, content_hash: str, content: bytes) -> None:
+    """
+    勤務データファイルを内容のハッシュをキーとしてS3へ格納する
+
+    Args:
+        bucket_name (str): S3バケット名
+        content_hash (str): 内容のハッシュ
+        content (bytes): 勤務データ(バイナリ)
+    """
+    try:
+        get_client("s3").put_object(
+            Bucket=bucket_name, Body=content, Key=f"raw/{content_hash}"
+        )
+    except Exception as err:
+        logger.error("ファイルの格納に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+
+def find_duplicate_upload(
+    table_name: str, slack_user_id: str, upload_hash: str
+) -> Optional[dict]:
+    """
+    同じユーザが同じ内容のファイルを処理済みであれば、その結果を取得する
+
+    作成済みの勤務表が後の実行で上書きされている(ETagが異なる)場合は
+    処理済みとしない
+    索引は処理を省くためのものであるため、取得に失敗した場合も処理済みとしない
+
+    Args:
+        table_name (str): テーブル名
+        slack_user_id (str): SlackのユーザID
+        upload_hash (str): アップロード全体の内容のハッシュ
+
+    Returns:
+        Optional[dict]: 処理済みの結果(処理済みでなければNone)
+            user_id (str): 社員番号
+            work_months (list[str]): 勤務月のリスト
+            work_schedule_info_list (list[dict]): 作成済みの勤務表の情報
+    """
+    try:
+        item: Optional[dict] = (
+            get_client("dynamodb")
+            .get_item(
+                TableName=table_name,
+                Key={
+                    "id": {"S": slack_user_id},
+                    "SK": {"S": f"{UPLOAD_INDEX_PREFIX}{upload_hash}"},
+                },
             )
-            logger.info(f"response: {response}")
-            file_content = response.content
+            .get("Item")
+        )
+        if not item:
+            return None
+
+        work_schedule_info_list: list[dict] = [
+            {key: value["S"] for key, value in info["M"].items()}
+            for info in item["work_schedules"]["L"]
+        ]
+        s3 = get_client("s3")
+        for info in work_schedule_info_list:
+            etag: str = s3.head_object(
+                Bucket=info["bucket_name"],
+                Key=f"work_schedule/{info['object_name']}",
+            )["ETag"]
+            if etag != info.pop("etag"):
+                logger.info(
+                    "勤務表が更新されています", object_name=info["object_name"]
+                )
+                return None
 
-        except Exception as err:
-            logger.error(f"ファイル情報の取得に失敗しました\n{err}")
-            raise WorkforceBuddyException
+    except Exception as err:
+        logger.warning("処理済みのファイルの確認に失敗しました", error=err)
+        return None
 
-    return file_content
+    return {
+        "user_id": item["user_id"]["S"],
+        "work_months": [month["S"] for month in item["work_months"]["L"]],
+        "work_schedule_info_list": work_schedule_info_list,
+    }
 
 
-def create_response(file_name: str) -> dict:
+def create_response(
+    file_names: list[str],
+    upload_hash: Optional[str] = None,
+    duplicate: Optional[dict] = None,
+) -> dict:
     """
     レスポンスを作成する
 
     Args:
-        file_name (str): ファイル名
+        file_names (list[str]): ファイル名(内容のハッシュ)のリスト
+        upload_hash (Optional[str]): アップロード全体の内容のハッシュ
+        duplicate (Optional[dict]): 処理済みのアップロードの結果
 
     Returns:
         dict: レスポンス
-            file_name (str): ファイル名
+            file_name (Optional[str]): 先頭のファイル名
+            file_names (list[str]): ファイル名のリスト(S3のraw/以下のキー)
+            upload_hash (Optional[str]): アップロード全体の内容のハッシュ
+            rejected (bool): 読み込めるファイルがなかった場合True
+            duplicate (bool): 前回と同じ内容のアップロードの場合True
+            user_id (str): 社員番号(duplicateの場合のみ)
+            work_months (list[str]): 勤務月のリスト(duplicateの場合のみ)
+            work_schedule_info_list (list[dict]):
+                作成済みの勤務表の情報(duplicateの場合のみ)
     """
-    res: dict = {"file_name": file_name}
+    res: dict = {
+        "file_name": file_names[0] if file_names else None,
+        "file_names": file_names,
+        "upload_hash": upload_hash,
+        "rejected": not file_names,
+        "duplicate": duplicate is not None,
+    }
+    if duplicate:
+        res.update(duplicate)
 
     return res
@@ -1,31 +1,56 @@
 import json
-import logging
 import os
-from typing import Dict
+import threading
+import time
+from typing import Dict, Optional
 
-import boto3
-from slack_bolt import Ack, App, Say
+from slack_bolt import Ack, App
 from slack_bolt.adapter.aws_lambda import SlackRequestHandler
 
+from workforce_buddy_core import (
+    WorkforceBuddyException,
+    get_client,
+    get_logger,
+    get_slack_client,
+)
+
 # ロギングの初期設定
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 SLACK_SIGNING_SECRET = os.environ["SLACK_SIGNING_SECRET"]
 SLACK_BOT_TOKEN = os.environ["SLACK_BOT_TOKEN"]
 SLACK_BOT_ID: str = os.environ["SLACK_BOT_ID"]
+
+# 重複イベント判定の保持期間(秒)
+IDEMPOTENCY_TTL_SECONDS: int = int(
+    os.environ.get("IDEMPOTENCY_TTL_SECONDS", 60 * 60)
+)
+
+# 処理中の処理権の有効期間(秒, 関数のタイムアウト(1分)より長くする)
+# 開始前に異常終了した場合も、この期間の後の再試行で処理し直せる
+IDEMPOTENCY_LEASE_SECONDS: int = int(
+    os.environ.get("IDEMPOTENCY_LEASE_SECONDS", 90)
+)
+
+# 連続アップロードをまとめる待機時間(秒, 0の場合はまとめない)
+# 待機はステートマシン(WaitForUploads)で行い、この関数では待たない
+UPLOAD_COALESCE_WINDOW_SECONDS: int = int(
+    os.environ.get("UPLOAD_COALESCE_WINDOW_SECONDS", 0)
+)
+
+# 取りまとめ役の実行が停止したとみなすまでの猶予(秒)
+UPLOAD_BUFFER_STALE_SECONDS: int = 60
+
+# Lazy Listenerの実行結果(呼び出しごと)
+lazy_listener_result = threading.local()
+
 app = App(
     process_before_response=True,
     signing_secret=SLACK_SIGNING_SECRET,
-    token=SLACK_BOT_TOKEN,
+    client=get_slack_client(SLACK_BOT_TOKEN),
 )
 
 
-# カスタムエラーを定義
-class WorkforceBuddyException(Exception):
-    pass
-
-
 def respond_to_slack_within_3_seconds(ack: Ack) -> None:
     """
     Lazy Lisners機能の使用時に3秒以内にレスポンスを返す
@@ -36,21 +61,42 @@ def respond_to_slack_within_3_seconds(ack: Ack) -> None:
     ack()
 
 
-def make_workschedule(event: Dict, say: Say) -> None:
+def make_workschedule(body: Dict, event: Dict) -> None:
     """
     勤務データを受け取り非同期で勤務表を作成する
 
+    Boltは Lazy Listener の例外を記録するのみのため、失敗した場合は
+    lambda_handler から例外を送出し、Lambdaの非同期呼び出しの再試行の対象とする
+
     Args:
+        body (Dict)
         event (Dict)
-        say (Say): sayアクション
     """
     try:
+        start_workschedule(body, event)
+
+    except Exception:
+        lazy_listener_result.failed = True
+        raise
+
+
+def start_workschedule(body: Dict, event: Dict) -> None:
+    """
+    重複したイベントを除き、勤務表の作成を開始する
+
+    Args:
+        body (Dict)
+        event (Dict)
+    """
+    try:
+        event_id: str = body["event_id"]
         file_id: str = event["file_id"]
         user_id: str = event["user_id"]
         channel_id: str = event["channel_id"]
         statemachine_arn: str = os.environ["WORKSCHEDULE_MAKER_KEY"]
+        table_name: str = os.environ["TABLE_NAME"]
     except Exception as err:
-        logger.error("event, 環境変数の取得に失敗しました\n{err}")
+        logger.error("event, 環境変数の取得に失敗しました", error=err)
         raise Exception
 
     # Slack BOTがアップロードしたファイルなら終了
@@ -58,28 +104,437 @@ def make_workschedule(event: Dict, say: Say) -> None:
         logger.info("Slack BOTがアップロードしたファイルです")
         return None
 
-    # ステートマシンの実行
+    # 再送などで処理済みのファイルなら終了
+    if not claim_file_event(table_name, event_id, file_id):
+        logger.info(
+            "処理済みのイベントです", event_id=event_id, file_id=file_id
+        )
+        return None
+
+    req: dict = {
+        "slack_info": {
+            "file_id": file_id,
+            "user_id": user_id,
+            "channel_id": channel_id,
+        }
+    }
+
+    coalesce: bool = UPLOAD_COALESCE_WINDOW_SECONDS > 0
+    leader: bool = False
     try:
-        sfn = boto3.client("stepfunctions")
-        req: dict = {
-            "slack_info": {
-                "file_id": file_id,
-                "user_id": user_id,
-                "channel_id": channel_id,
+        # 待機時間内のアップロードをまとめる
+        if coalesce:
+            leader = buffer_upload(table_name, user_id, channel_id, file_id)
+
+            # 取りまとめ役でなければ終了
+            if not leader:
+                logger.info("アップロードを取りまとめ中です", file_id=file_id)
+                complete_file_event(table_name, event_id, file_id)
+                return None
+
+            # 待機後にステートマシンがバッファを取り出して処理する
+            req["upload_buffer"] = {
+                "key": get_upload_buffer_key(user_id, channel_id),
+                "wait_seconds": UPLOAD_COALESCE_WINDOW_SECONDS,
             }
-        }
-        res = sfn.start_execution(
+
+        # 同期実行用の関数が設定されていれば1プロセスで実行
+        # まとめる場合はステートマシンで待機して処理する
+        runner_name: Optional[str] = os.environ.get("WORKSCHEDULE_RUNNER_KEY")
+        if runner_name and not coalesce:
+            start_runner(runner_name, req)
+        else:
+            start_statemachine(statemachine_arn, req)
+
+    except Exception:
+        # Lambdaの非同期呼び出しの再試行で処理し直せるよう、処理権を解放し
+        # バッファを次の呼び出しが取りまとめられる状態に戻す
+        release_file_event(table_name, event_id, file_id)
+        if leader:
+            reopen_upload_buffer(table_name, user_id, channel_id)
+        raise
+
+    # 開始済みのファイルとして保持期間まで処理権を保持する
+    complete_file_event(table_name, event_id, file_id)
+
+    # メッセージ送信
+    if coalesce:
+        notify_accepted(
+            channel_id,
+            f"<@{user_id}>\n勤務データを受け付けました！"
+            f"\n{UPLOAD_COALESCE_WINDOW_SECONDS}秒以内にアップロードされた"
+            "ファイルはまとめて処理します。"
+            "\n勤務表の作成までしばらくお待ちください。",
+        )
+    else:
+        notify_accepted(
+            channel_id,
+            f"<@{user_id}>\n勤務データを受け付けました！"
+            "\n勤務表の作成までしばらくお待ちください。",
+        )
+
+
+def notify_accepted(channel_id: str, text: str) -> None:
+    """
+    勤務データを受け付けたことをチャンネルへ通知する
+
+    勤務表の作成は開始済みのため、レート制限(429)では待機・再試行せず、
+    送信できなかった場合も記録のみ行う
+    (待機するとack用の同時実行枠を占有し、イベントの応答が遅れる)
+
+    Args:
+        channel_id (str): SlackのチャンネルID
+        text (str): メッセージ
+    """
+    try:
+        get_slack_client(
+            SLACK_BOT_TOKEN, rate_limit_retries=0
+        ).chat_postMessage(channel=channel_id, text=text)
+
+    except Exception as err:
+        logger.warning("受付の通知に失敗しました", error=err)
+
+
+def get_upload_buffer_key(user_id: str, channel_id: str) -> dict:
+    """
+    ユーザ・チャンネルごとのアップロードのバッファのキー(DynamoDB形式)
+
+    Args:
+        user_id (str): SlackのユーザID
+        channel_id (str): SlackのチャンネルID
+
+    Returns:
+        dict: バッファのキー
+    """
+    return {
+        "id": {"S": f"UploadBuffer#{user_id}#{channel_id}"},
+        "SK": {"S": "UploadBuffer"},
+    }
+
+
+def buffer_upload(
+    table_name: str, user_id: str, channel_id: str, file_id: str
+) -> bool:
+    """
+    アップロードされたファイルをユーザごとのバッファに追加する
+
+    バッファを新しく作成した場合(または取りまとめ役の実行が停止したとみなせる
+    場合)は取りまとめ役としてステートマシンを実行する
+    バッファはステートマシンが待機時間後に取り出して削除する(FlushUploads)
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): SlackのユーザID
+        channel_id (str): SlackのチャンネルID
+        file_id (str): SlackのファイルID
+
+    Returns:
+        bool: 取りまとめ役となった場合True
+    """
+    now: int = int(time.time())
+    try:
+        res: dict = get_client("dynamodb").update_item(
+            TableName=table_name,
+            Key=get_upload_buffer_key(user_id, channel_id),
+            UpdateExpression=(
+                "SET file_ids = list_append("
+                "if_not_exists(file_ids, :empty), :file_ids), "
+                "flush_at = if_not_exists(flush_at, :flush_at), "
+                "expires_at = if_not_exists(expires_at, :expires_at)"
+            ),
+            ExpressionAttributeValues={
+                ":empty": {"L": []},
+                ":file_ids": {"L": [{"S": file_id}]},
+                ":flush_at": {"N": str(now + UPLOAD_COALESCE_WINDOW_SECONDS)},
+                ":expires_at": {"N": str(now + IDEMPOTENCY_TTL_SECONDS)},
+            },
+            ReturnValues="ALL_OLD",
+        )
+
+    except Exception as err:
+        logger.error("アップロードの取りまとめに失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    old_buffer: dict = res.get("Attributes", {})
+    if not old_buffer:
+        return True
+
+    flush_at: int = int(old_buffer["flush_at"]["N"])
+    if flush_at + UPLOAD_BUFFER_STALE_SECONDS >= now:
+        return False
+
+    # 停止した取りまとめ役を引き継ぐ(同時に引き継ごうとした場合は1件のみ)
+    return take_over_upload_buffer(table_name, user_id, channel_id, flush_at)
+
+
+def take_over_upload_buffer(
+    table_name: str, user_id: str, channel_id: str, flush_at: int
+) -> bool:
+    """
+    取りまとめ役の実行が停止したバッファの取り出し予定時刻を更新し、
+    取りまとめ役を引き継ぐ
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): SlackのユーザID
+        channel_id (str): SlackのチャンネルID
+        flush_at (int): 読み込んだ時点の取り出し予定時刻
+
+    Returns:
+        bool: 取りまとめ役を引き継いだ場合True
+    """
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=get_upload_buffer_key(user_id, channel_id),
+            UpdateExpression="SET flush_at = :flush_at",
+            ConditionExpression="flush_at = :old_flush_at",
+            ExpressionAttributeValues={
+                ":flush_at": {
+                    "N": str(int(time.time()) + UPLOAD_COALESCE_WINDOW_SECONDS)
+                },
+                ":old_flush_at": {"N": str(flush_at)},
+            },
+        )
+
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        # 他の呼び出しが引き継いだ、またはステートマシンが取り出し済み
+        return False
+
+    except Exception as err:
+        logger.error("アップロードの取りまとめに失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    return True
+
+
+def reopen_upload_buffer(
+    table_name: str, user_id: str, channel_id: str
+) -> None:
+    """
+    ステートマシンを実行できなかったバッファを、次の呼び出しが取りまとめ役となれる
+    状態にする(バッファ内のファイルは残し、再試行や次のアップロードでまとめて処理する)
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): SlackのユーザID
+        channel_id (str): SlackのチャンネルID
+    """
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=get_upload_buffer_key(user_id, channel_id),
+            UpdateExpression="SET flush_at = :stale",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeValues={":stale": {"N": "0"}},
+        )
+
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        # 他の実行が取り出し済み
+        return None
+
+    except Exception as err:
+        # 元のエラーを優先し、バッファは保持期間後に取りまとめ直される
+        logger.error("アップロードのバッファの更新に失敗しました", error=err)
+
+
+def get_idempotency_keys(event_id: str, file_id: str) -> list[dict]:
+    """
+    ファイル共有イベントの処理権の項目のキー(DynamoDB形式)
+
+    Args:
+        event_id (str): SlackのイベントID
+        file_id (str): SlackのファイルID
+
+    Returns:
+        list[dict]: イベントIDの項目とファイルIDの項目のキー
+    """
+    return [
+        {"id": {"S": f"SlackEvent#{event_id}"}, "SK": {"S": "Idempotency"}},
+        {"id": {"S": f"SlackFile#{file_id}"}, "SK": {"S": "Idempotency"}},
+    ]
+
+
+def claim_file_event(table_name: str, event_id: str, file_id: str) -> bool:
+    """
+    ファイル共有イベントの処理権を取得する
+
+    イベントIDとファイルIDをキーとする項目を1トランザクションで条件付き書き込みし、
+    Slackの再送(同じイベントID)や同じファイルの重複イベント(異なるイベントID)
+    では処理権を取得できないようにする
+    処理中の処理権はIDEMPOTENCY_LEASE_SECONDSで失効し(開始前に異常終了した
+    場合)、開始後に保持期間(IDEMPOTENCY_TTL_SECONDS)まで延長する
+    書き込んだ項目はTTL(expires_at)で削除される
+
+    Args:
+        table_name (str): テーブル名
+        event_id (str): SlackのイベントID
+        file_id (str): SlackのファイルID
+
+    Returns:
+        bool: 処理権を取得できた場合True
+    """
+    now: int = int(time.time())
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.transact_write_items(
+            TransactItems=[
+                {
+                    "Put": {
+                        "TableName": table_name,
+                        "Item": {
+                            **key,
+                            "event_id": {"S": event_id},
+                            "file_id": {"S": file_id},
+                            "expires_at": {
+                                "N": str(now + IDEMPOTENCY_LEASE_SECONDS)
+                            },
+                        },
+                        # TTLによる削除は遅延するため、期限切れの項目は上書きを許可する
+                        "ConditionExpression": (
+                            "attribute_not_exists(id) OR expires_at < :now"
+                        ),
+                        "ExpressionAttributeValues": {":now": {"N": str(now)}},
+                    }
+                }
+                for key in get_idempotency_keys(event_id, file_id)
+            ]
+        )
+
+    except dynamodb.exceptions.TransactionCanceledException as err:
+        reasons: list[dict] = err.response.get("CancellationReasons", [])
+        if any(r.get("Code") == "ConditionalCheckFailed" for r in reasons):
+            return False
+        # 同時に届いた重複イベントとの競合は、非同期呼び出しの再試行で判定し直す
+        logger.error("イベントの処理状況の登録が競合しました", error=err)
+        raise WorkforceBuddyException
+
+    except Exception as err:
+        logger.error("イベントの処理状況の登録に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    return True
+
+
+def complete_file_event(table_name: str, event_id: str, file_id: str) -> None:
+    """
+    勤務表の作成を開始したファイル共有イベントの処理権を保持期間まで延長する
+
+    Args:
+        table_name (str): テーブル名
+        event_id (str): SlackのイベントID
+        file_id (str): SlackのファイルID
+    """
+    expires_at: int = int(time.time()) + IDEMPOTENCY_TTL_SECONDS
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.transact_write_items(
+            TransactItems=[
+                {
+                    "Update": {
+                        "TableName": table_name,
+                        "Key": key,
+                        "UpdateExpression": "SET expires_at = :expires_at",
+                        # 他のイベントが取得した処理権は変更しない
+                        "ConditionExpression": "event_id = :event_id",
+                        "ExpressionAttributeValues": {
+                            ":event_id": {"S": event_id},
+                            ":expires_at": {"N": str(expires_at)},
+                        },
+                    }
+                }
+                for key in get_idempotency_keys(event_id, file_id)
+            ]
+        )
+
+    except Exception as err:
+        # 開始済みのため再試行はせず、処理権は処理中の有効期間後に失効する
+        logger.error("イベントの処理状況の更新に失敗しました", error=err)
+
+
+def release_file_event(table_name: str, event_id: str, file_id: str) -> None:
+    """
+    処理を開始できなかったファイル共有イベントの処理権を解放する
+
+    Args:
+        table_name (str): テーブル名
+        event_id (str): SlackのイベントID
+        file_id (str): SlackのファイルID
+    """
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.transact_write_items(
+            TransactItems=[
+                {
+                    "Delete": {
+                        "TableName": table_name,
+                        "Key": key,
+                        # 他のイベントが取得した処理権は削除しない
+                        "ConditionExpression": "event_id = :event_id",
+                        "ExpressionAttributeValues": {
+                            ":event_id": {"S": event_id}
+                        },
+                    }
+                }
+                for key in get_idempotency_keys(event_id, file_id)
+            ]
+        )
+
+    except dynamodb.exceptions.TransactionCanceledException:
+        return None
+
+    except Exception as err:
+        # 元のエラーを優先し、処理権は処理中の有効期間後に失効する
+        logger.error("イベントの処理状況の削除に失敗しました", error=err)
+
+
+def start_statemachine(statemachine_arn: str, req: dict) -> None:
+    """
+    WorkScheduleMakerステートマシンを実行する
+
+    Args:
+        statemachine_arn (str): ステートマシンのARN
+        req (dict): ステートマシンへの入力
+    """
+    try:
+        res = get_client("stepfunctions").start_execution(
             stateMachineArn=statemachine_arn, input=json.dumps(req)
         )
         executionArn: str = res["executionArn"]
-        logger.info(f"executionArn: {executionArn}, request: {req}")
+        logger.info(
+            "ステートマシンを実行しました",
+            execution_arn=executionArn,
+            request=req,
+        )
 
     except Exception as err:
-        logger.error(f"ステートマシンの実行に失敗しました\n{err}")
+        logger.error("ステートマシンの実行に失敗しました", error=err)
         raise WorkforceBuddyException
 
-    # メッセージ送信
-    say(f"<@{user_id}>\n勤務データを受け付けました！\n勤務表の作成までしばらくお待ちください。")
+
+def start_runner(runner_name: str, req: dict) -> None:
+    """
+    勤務表作成を1プロセスで行う関数を非同期で呼び出す
+
+    Args:
+        runner_name (str): RunWorkSchedule関数名
+        req (dict): 関数への入力
+    """
+    try:
+        get_client("lambda").invoke(
+            FunctionName=runner_name,
+            InvocationType="Event",
+            Payload=json.dumps(req).encode("utf-8"),
+        )
+        logger.info(
+            "勤務表作成関数を呼び出しました", runner=runner_name, request=req
+        )
+
+    except Exception as err:
+        logger.error("勤務表作成関数の呼び出しに失敗しました", error=err)
+        raise WorkforceBuddyException
 
 
 app.event("file_shared")(
@@ -99,14 +554,25 @@ def lambda_handler(event: dict, context: dict) -> SlackRequestHandler:
         dict: レスポンス
     """
     try:
-        logger.info(f"event: {event}")
+        logger.log_event(event, context)
+        lazy_listener_result.failed = False
         slack_handler = SlackRequestHandler(app=app)
+        # Lazy Listenersの非同期呼び出しにも共通のLambdaクライアントを使用する
+        runner = slack_handler.app.listener_runner.lazy_listener_runner
+        runner.lambda_client = get_client("lambda")
 
     except WorkforceBuddyException:
         raise WorkforceBuddyException
 
     except Exception as err:
-        logger.error(f"想定外のエラーが発生しました\n{err}")
+        logger.error("想定外のエラーが発生しました", error=err)
+        raise WorkforceBuddyException
+
+    res: dict = slack_handler.handle(event, context)
+
+    # Lazy Listenerが失敗した場合は、非同期呼び出しの再試行で処理し直す
+    if lazy_listener_result.failed:
+        logger.error("勤務表の作成を開始できませんでした")
         raise WorkforceBuddyException
 
-    return slack_handler.handle(event, context)
+    return res
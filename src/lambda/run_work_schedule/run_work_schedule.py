@@ -0,0 +1,471 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+import pandas as pd
+from slack_sdk.web.slack_response import SlackResponse
+
+from create_work_schedule import create_work_schedule
+from get_work_data import get_work_data
+from send_work_schedule import send_work_schedule
+from store_work_data import store_work_data
+from workforce_buddy_core import (
+    USER_CONFIG_LATEST_SK,
+    WorkforceBuddyException,
+    decode_item,
+    get_client,
+    get_latest_user_config,
+    get_logger,
+    measure,
+)
+
+# ロギングの初期設定
+logger = get_logger(__name__)
+
+# デフォルトのユーザ設定を持つユーザID
+DEFAULT_USER_ID: str = "0000000"
+
+# 同期実行する勤務データファイルの最大サイズ(バイト)
+DEFAULT_MAX_FILE_BYTES: int = 64 * 1024
+
+# 同期実行する勤務月の最大数
+DEFAULT_MAX_MONTHS: int = 1
+
+
+def lambda_handler(event: dict, context: dict) -> dict:
+    """
+    Lambda関数ハンドラ
+
+    Args:
+        event (dict)
+        context (dict)
+
+    Returns:
+        dict: レスポンス
+    """
+    try:
+        logger.log_event(event, context)
+        res: dict = logic(event)
+
+    except WorkforceBuddyException:
+        raise WorkforceBuddyException
+
+    except Exception as err:
+        logger.error("想定外のエラーが発生しました", error=err)
+        raise WorkforceBuddyException
+
+    return res
+
+
+def logic(event: dict) -> dict:
+    """
+    メインロジック
+
+    WorkScheduleMakerと同じ処理を1プロセス内で実行する
+    ファイルの内容や勤務表はS3やステートを経由せずメモリ上で受け渡す
+    ファイルサイズや勤務月の数が上限を超える場合はステートマシンに委譲する
+
+    Args:
+        event (dict):
+            slack_info (dict)
+                file_id (str)
+                user_id (str)
+                channel_id (str)
+
+    Returns:
+        dict: レスポンス
+    """
+    # 環境情報の読み出し
+    try:
+        slack_info: dict = event["slack_info"]
+        token: str = os.environ["SLACK_BOT_TOKEN"]
+        bucket_name: str = os.environ["BUCKET_NAME"]
+        table_name: str = os.environ["TABLE_NAME"]
+        statemachine_arn: str = os.environ["WORKSCHEDULE_MAKER_KEY"]
+        max_file_bytes: int = int(
+            os.environ.get("DIRECT_MAX_FILE_BYTES", DEFAULT_MAX_FILE_BYTES)
+        )
+        max_months: int = int(
+            os.environ.get("DIRECT_MAX_MONTHS", DEFAULT_MAX_MONTHS)
+        )
+    except Exception as err:
+        logger.error("環境情報の読み出しに失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    timings: dict[str, float] = {}
+
+    # ファイル情報を取得
+    with measure(timings, "get_file_info"):
+        file_info: SlackResponse = get_work_data.get_file_info(
+            slack_info["file_id"], token
+        )
+
+    # 形式・サイズが勤務データでないファイルはダウンロードせずに終了
+    reason: Optional[str] = get_work_data.check_work_file(file_info)
+    if reason:
+        return reject_file(slack_info, file_info, reason, token)
+
+    # ファイルサイズが上限を超える場合はステートマシンで処理
+    file_size: int = int(file_info["file"].get("size", 0))
+    if file_size > max_file_bytes:
+        return start_statemachine(statemachine_arn, slack_info, "file_size")
+
+    # ファイル取得(取得しながら内容のハッシュを計算する)
+    # 見出し行・最初の行を読み込めなければ先頭のみで取得を打ち切って終了
+    try:
+        with measure(timings, "download_file"):
+            file_content: bytes
+            content_hash: str
+            file_content, content_hash = get_work_data.download_file(
+                file_info, token
+            )
+    except get_work_data.InvalidWorkFile as err:
+        return reject_file(slack_info, file_info, err.reason, token)
+
+    # 前回と同じ内容のアップロードであれば、作成済みの勤務表を送信する
+    with measure(timings, "find_duplicate_upload"):
+        duplicate: Optional[dict] = get_work_data.find_duplicate_upload(
+            table_name, slack_info["user_id"], content_hash
+        )
+    if duplicate:
+        return resend_work_schedules(
+            table_name, slack_info, duplicate, timings
+        )
+
+    # 複数の社員の勤務データを含むファイルは受け付けない
+    reason = get_work_data.check_work_file_user(file_content, None)
+    if reason:
+        return reject_file(slack_info, file_info, reason, token)
+
+    # ファイルの読み込み・加工
+    with measure(timings, "parse_work_file"):
+        work_data: pd.DataFrame
+        converted_work_json: list[dict]
+        (
+            work_data,
+            converted_work_json,
+        ) = store_work_data.parse_work_file(file_content)
+        work_info: dict = store_work_data.create_response(work_data)
+
+    # 勤務月の数が上限を超える場合はステートマシンで処理
+    work_months: list[str] = work_info["work_months"]
+    if len(work_months) > max_months:
+        return start_statemachine(statemachine_arn, slack_info, "work_months")
+
+    # 元ファイルの保管とデータの登録
+    with measure(timings, "store_work_data"):
+        get_work_data.put_raw_file(bucket_name, content_hash, file_content)
+        store_work_data.store_work_data(converted_work_json)
+
+    # ユーザ設定・テンプレート設定の取得
+    with measure(timings, "get_config"):
+        user_config_item: dict = get_user_config(
+            table_name, work_info["user_id"]
+        )
+        user_config: dict = decode_item(user_config_item)
+        template_item: dict = get_template_config(
+            table_name, user_config["template_id"]
+        )
+        template: create_work_schedule.CompiledTemplate = (
+            create_work_schedule.get_compiled_template(template_item)
+        )
+        template_file: bytes = create_work_schedule.get_template_file(
+            bucket_name, template
+        )
+
+    # 勤務表の生成
+    # CreateWorkScheduleと同じく登録済みの勤務月のデータ全体から作成する
+    # (アップロードされたファイルにない日の登録済みのデータも含める)
+    # 直前に登録したデータを読み込むため、強い整合性で読み込む
+    work_schedules: list[tuple[dict, bytes]] = []
+    with measure(timings, "create_work_schedule"):
+        for work_month in work_months:
+            month_df: pd.DataFrame = create_work_schedule.get_work_data(
+                table_name,
+                work_info["user_id"],
+                work_month,
+                consistent_read=True,
+            )
+            converted_work_df: pd.DataFrame = (
+                create_work_schedule.convert_work_data(
+                    work_month, month_df, user_config
+                )
+            )
+            work_schedule_file: bytes = (
+                create_work_schedule.create_work_schedule(
+                    template_file,
+                    template,
+                    user_config,
+                    work_month,
+                    converted_work_df,
+                )
+            )
+            object_name: str
+            etag: str
+            object_name, etag = create_work_schedule.put_work_schedule(
+                bucket_name, user_config["id"], work_month, work_schedule_file
+            )
+            work_schedules.append(
+                (
+                    create_work_schedule.create_response(
+                        work_month, bucket_name, object_name, etag
+                    ),
+                    work_schedule_file,
+                )
+            )
+
+    # 勤務表をSlackへ送信
+    with measure(timings, "send_work_schedule"):
+        shared_files: list[tuple[dict, SlackResponse]] = (
+            send_work_schedule.upload_files_to_slack(work_schedules)
+        )
+        summaries: dict[str, dict[str, int]] = (
+            send_work_schedule.get_monthly_summaries(
+                table_name, work_info["user_id"], work_months
+            )
+        )
+        send_work_schedule.share_files_to_channel(
+            shared_files, slack_info, summaries
+        )
+        send_work_schedule.record_upload(
+            table_name,
+            slack_info["user_id"],
+            content_hash,
+            work_info["user_id"],
+            [info for info, _ in work_schedules],
+        )
+
+    logger.info("timings", timings=timings)
+
+    uploaded_files: list[str] = [
+        info["object_name"] for info, _ in shared_files
+    ]
+    res: dict = send_work_schedule.create_response(slack_info, uploaded_files)
+    res["mode"] = "direct"
+    res["timings"] = timings
+
+    return res
+
+
+def reject_file(
+    slack_info: dict, file_info: SlackResponse, reason: str, token: str
+) -> dict:
+    """
+    勤務データとして読み込めないファイルをユーザへ通知する
+
+    Args:
+        slack_info (dict): Slack情報
+        file_info (SlackResponse): アップロードされたファイル情報
+        reason (str): 読み込めない理由
+        token (str): アクセストークン
+
+    Returns:
+        dict: レスポンス
+    """
+    get_work_data.reply_rejected_files(
+        slack_info, [(file_info["file"].get("name", ""), reason)], token
+    )
+    return {"mode": "direct", "rejected": True, "reason": reason}
+
+
+def resend_work_schedules(
+    table_name: str,
+    slack_info: dict,
+    duplicate: dict,
+    timings: dict[str, float],
+) -> dict:
+    """
+    前回と同じ内容のアップロードに対して、作成済みの勤務表を送信する
+
+    勤務データの読み込み・登録と勤務表の生成は行わない
+
+    Args:
+        table_name (str): テーブル名
+        slack_info (dict): Slack情報
+        duplicate (dict): 処理済みのアップロードの結果
+            (get_work_data.find_duplicate_upload の戻り値)
+        timings (dict[str, float]): 処理ごとの時間(秒)
+
+    Returns:
+        dict: レスポンス
+    """
+    work_schedule_info_list: list[dict] = duplicate["work_schedule_info_list"]
+    with measure(timings, "send_work_schedule"):
+        shared_files: list[tuple[dict, SlackResponse]] = (
+            send_work_schedule.upload_files_to_slack(
+                [(info, None) for info in work_schedule_info_list]
+            )
+        )
+        summaries: dict[str, dict[str, int]] = (
+            send_work_schedule.get_monthly_summaries(
+                table_name, duplicate["user_id"], duplicate["work_months"]
+            )
+        )
+        send_work_schedule.share_files_to_channel(
+            shared_files, slack_info, summaries
+        )
+
+    logger.info("timings", timings=timings)
+
+    uploaded_files: list[str] = [
+        info["object_name"] for info, _ in shared_files
+    ]
+    res: dict = send_work_schedule.create_response(slack_info, uploaded_files)
+    res["mode"] = "direct"
+    res["duplicate"] = True
+    res["timings"] = timings
+
+    return res
+
+
+def get_user_config(table_name: str, user_id: str) -> dict:
+    """
+    最新のユーザ設定を取得する
+    ユーザ設定が存在しない場合はデフォルト設定から作成する
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): 社員番号
+
+    Returns:
+        dict: DynamoDB形式のユーザ設定
+    """
+    user_config: Optional[dict] = get_latest_user_config(table_name, user_id)
+    if user_config is None:
+        user_config = provision_user_config(table_name, user_id)
+
+    return user_config
+
+
+def provision_user_config(table_name: str, user_id: str) -> dict:
+    """
+    デフォルト設定をコピーしてユーザ設定を作成する
+
+    設定の版(UserConfig#<作成日時>)と UserConfig#LATEST を同じトランザクションで
+    書き込むため、同時に複数の初回実行があっても1件のみ作成される
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): 社員番号
+
+    Returns:
+        dict: DynamoDB形式のユーザ設定(UserConfig#LATEST)
+    """
+    basic_user_config: Optional[dict] = get_latest_user_config(
+        table_name, DEFAULT_USER_ID
+    )
+    if basic_user_config is None:
+        logger.error("デフォルトのユーザ設定が存在しません")
+        raise WorkforceBuddyException
+
+    entered_time: str = datetime.now(timezone.utc).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    version_sk: str = f"UserConfig#{entered_time}"
+    version_item: dict = {
+        **basic_user_config,
+        "id": {"S": user_id},
+        "SK": {"S": version_sk},
+        "created_at": {"S": entered_time},
+        "version_sk": {"S": version_sk},
+        "version": {"N": "1"},
+    }
+    user_config: dict = {
+        **version_item,
+        "SK": {"S": USER_CONFIG_LATEST_SK},
+        # テンプレートごとのユーザ一覧(InvertedIndex)
+        "index_pk": {"S": f"Template#{basic_user_config['template_id']['S']}"},
+        "index_sk": {"S": user_id},
+    }
+
+    dynamodb = get_client("dynamodb")
+    try:
+        dynamodb.transact_write_items(
+            TransactItems=[
+                {
+                    "Put": {
+                        "TableName": table_name,
+                        "Item": item,
+                        "ConditionExpression": "attribute_not_exists(id)",
+                    }
+                }
+                for item in (version_item, user_config)
+            ]
+        )
+    except dynamodb.exceptions.TransactionCanceledException:
+        # 他の実行が先に作成した設定を使用する
+        user_config = get_latest_user_config(table_name, user_id)
+    except Exception as err:
+        logger.error("ユーザ設定の作成に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    return user_config
+
+
+def get_template_config(table_name: str, template_id: str) -> dict:
+    """
+    テンプレート設定をDBから取得する
+
+    Args:
+        table_name (str): テーブル名
+        template_id (str): テンプレートID
+
+    Returns:
+        dict: DynamoDB形式のテンプレート設定
+    """
+    try:
+        item: Optional[dict] = (
+            get_client("dynamodb")
+            .get_item(
+                TableName=table_name,
+                Key={"id": {"S": template_id}, "SK": {"S": "TemplateConfig"}},
+            )
+            .get("Item")
+        )
+    except Exception as err:
+        logger.error("テンプレート設定の取得に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    if not item:
+        logger.error("テンプレート設定が存在しません", template_id=template_id)
+        raise WorkforceBuddyException
+
+    return item
+
+
+def start_statemachine(
+    statemachine_arn: str, slack_info: dict, reason: str
+) -> dict:
+    """
+    同期実行の対象外のジョブをステートマシンに委譲する
+
+    Args:
+        statemachine_arn (str): WorkScheduleMakerのARN
+        slack_info (dict): Slack情報
+        reason (str): 委譲した理由
+
+    Returns:
+        dict: レスポンス
+    """
+    try:
+        res = get_client("stepfunctions").start_execution(
+            stateMachineArn=statemachine_arn,
+            input=json.dumps({"slack_info": slack_info}),
+        )
+        execution_arn: str = res["executionArn"]
+        logger.info(
+            "ステートマシンで処理します",
+            execution_arn=execution_arn,
+            reason=reason,
+        )
+
+    except Exception as err:
+        logger.error("ステートマシンの実行に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    return {
+        "mode": "statemachine",
+        "reason": reason,
+        "execution_arn": execution_arn,
+    }
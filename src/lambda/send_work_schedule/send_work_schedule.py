@@ -1,26 +1,39 @@
-import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
+from typing import Optional
 
-import boto3
-from slack_sdk import WebClient
 from slack_sdk.web.slack_response import SlackResponse
 
-# ロギングの初期設定
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+from workforce_buddy_core import (
+    WorkforceBuddyException,
+    get_client,
+    get_logger,
+    get_slack_scheduler,
+)
 
-# S3クライアント初期化
-s3 = boto3.client("s3")
+# ロギングの初期設定
+logger = get_logger(__name__)
 
-# Slack WebAPIクライアント初期化
+# Slack BOTのアクセストークン
 SLACK_BOT_TOKEN: str = os.environ["SLACK_BOT_TOKEN"]
-slack: WebClient = WebClient(SLACK_BOT_TOKEN)
 
 
-# カスタムエラーを定義
-class WorkforceBuddyException(Exception):
-    pass
+# files_upload_v2 が呼び出すSlack APIのメソッド
+UPLOAD_METHODS: tuple[str, ...] = (
+    "files.getUploadURLExternal",
+    "files.completeUploadExternal",
+)
+
+# アップロード済みファイルの索引のソートキーの接頭辞
+# (get_work_data.UPLOAD_INDEX_PREFIXと同じ)
+UPLOAD_INDEX_PREFIX: str = "Upload#"
+
+# 月次集計の項目と表示名
+SUMMARY_LABELS: dict[str, str] = {
+    "work_minutes": "勤務時間",
+    "night_minutes": "深夜時間",
+    "break_minutes": "休憩時間",
+}
 
 
 def lambda_handler(event: dict, context: dict) -> dict:
@@ -35,14 +48,14 @@ def lambda_handler(event: dict, context: dict) -> dict:
         dict: レスポンス
     """
     try:
-        logger.info(f"event: {event}")
+        logger.log_event(event, context)
         res: dict = logic(event)
 
     except WorkforceBuddyException:
         raise WorkforceBuddyException
 
     except Exception as err:
-        logger.error(f"想定外のエラーが発生しました\n{err}")
+        logger.error("想定外のエラーが発生しました", error=err)
         raise WorkforceBuddyException
 
     return res
@@ -59,15 +72,19 @@ def logic(event: dict) -> dict:
                     work_month (str)
                     bucket_name (str)
                     object_name (str)
+                    etag (str)
             slack_info (dict)
                 channel_id (str)
                 user_id(str)
+            work_info (dict)
+                result (dict)
+                    user_id (str)
+            upload_hash (Optional[str]): アップロード全体の内容のハッシュ
+                (索引に記録する場合のみ)
 
     Returns:
         dict: レスポンス
     """
-    logger.info(f"event: {event}")
-
     # ファイル情報の読み出し
     try:
         work_schedule_info_list: dict = event["work_schedule_info_list"]
@@ -76,17 +93,44 @@ def logic(event: dict) -> dict:
         logger.error("ファイル情報の読み出しに失敗しました")
         raise WorkforceBuddyException
 
-    uploaded_files: list[str] = []
-    for work_schedule_info in work_schedule_info_list:
-        # ファイルの取得
-        retrieved_file: bytes = get_object_info(work_schedule_info)
-        # ファイルのアップロード
-        uploaded_file: SlackResponse = upload_file_to_slack(
-            work_schedule_info, retrieved_file, uploaded_files
+    # この呼び出しでの送信の集計を出力するため、コンテナ内の集計を戻す
+    get_slack_scheduler(SLACK_BOT_TOKEN).reset_stats()
+
+    # ファイルの取得・アップロード
+    shared_files: list[tuple[dict, SlackResponse]] = upload_files_to_slack(
+        [(info, None) for info in work_schedule_info_list]
+    )
+    uploaded_files: list[str] = [
+        info["object_name"] for info, _ in shared_files
+    ]
+
+    # 月次集計の取得
+    user_id: Optional[str] = (
+        event.get("work_info", {}).get("result", {}).get("user_id")
+    )
+    summaries: dict[str, dict[str, int]] = get_monthly_summaries(
+        os.environ.get("TABLE_NAME"),
+        user_id,
+        [info["work_month"] for info in work_schedule_info_list],
+    )
+
+    # ファイルをまとめてチャンネルに共有
+    share_files_to_channel(shared_files, slack_info, summaries)
+
+    # 同じ内容のファイルが再びアップロードされた場合に備えて結果を記録
+    upload_hash: Optional[str] = event.get("upload_hash")
+    if upload_hash and user_id:
+        record_upload(
+            os.environ.get("TABLE_NAME"),
+            slack_info["user_id"],
+            upload_hash,
+            user_id,
+            work_schedule_info_list,
         )
-        # ファイルをチャンネルに共有
-        share_file_to_channel(work_schedule_info, slack_info, uploaded_file)
 
+    logger.info(
+        "slack delivery", stats=get_slack_scheduler(SLACK_BOT_TOKEN).stats
+    )
     res: dict = create_response(slack_info, uploaded_files)
 
     return res
@@ -106,7 +150,8 @@ def get_object_info(work_schedule_info: dict) -> bytes:
     """
     try:
         work_schedule: bytes = (
-            s3.get_object(
+            get_client("s3")
+            .get_object(
                 Bucket=work_schedule_info["bucket_name"],
                 Key=f"work_schedule/{work_schedule_info['object_name']}",
             )
@@ -115,14 +160,46 @@ def get_object_info(work_schedule_info: dict) -> bytes:
         )
 
     except Exception as err:
-        logger.error(f"ファイルの取得に失敗しました\n{err}")
+        logger.error("ファイルの取得に失敗しました", error=err)
         raise WorkforceBuddyException
 
     return work_schedule
 
 
+def upload_files_to_slack(
+    work_schedules: list[tuple[dict, Optional[bytes]]],
+) -> list[tuple[dict, SlackResponse]]:
+    """
+    勤務表をファイルごとにSlackへアップロードする
+
+    ファイルごとの送信を上限付きの並行数で行い、レート制限(429)や
+    一時的なエラーはファイルごとに再試行する
+
+    Args:
+        work_schedules (list[tuple[dict, Optional[bytes]]]):
+            勤務表の情報とファイルコンテンツ(Noneの場合はS3から取得する)のリスト
+
+    Returns:
+        list[tuple[dict, SlackResponse]]:
+            勤務表の情報とSlackへアップロードされたファイルの情報のリスト
+    """
+
+    def deliver(
+        work_schedule: tuple[dict, Optional[bytes]],
+    ) -> tuple[dict, SlackResponse]:
+        work_schedule_info, content = work_schedule
+        if content is None:
+            content = get_object_info(work_schedule_info)
+        return (
+            work_schedule_info,
+            upload_file_to_slack(work_schedule_info, content),
+        )
+
+    return get_slack_scheduler(SLACK_BOT_TOKEN).map(deliver, work_schedules)
+
+
 def upload_file_to_slack(
-    work_schedule_info: dict, content: bytes, uploaded_files: list[str]
+    work_schedule_info: dict, content: bytes
 ) -> SlackResponse:
     """
     Slackへファイルをアップロードする
@@ -131,61 +208,220 @@ def upload_file_to_slack(
         work_schedule_info (dict):
             object_name (str): ファイル名
         content (bytes): ファイルコンテンツ
-        uploaded_files (list[str]): アップロードされたファイルのリスト
 
     Returns:
         SlackResponse: Slackへアップロードされたファイルの情報
     """
     object_name = work_schedule_info["object_name"]
+    scheduler = get_slack_scheduler(SLACK_BOT_TOKEN)
 
     try:
         # ファイルアップロード
-        uploaded_file = slack.files_upload_v2(
-            title=object_name,
-            filename=object_name,
-            content=content,
+        uploaded_file = scheduler.call(
+            UPLOAD_METHODS,
+            lambda: scheduler.client.files_upload_v2(
+                title=object_name,
+                filename=object_name,
+                content=content,
+            ),
         )
-        logger.info(f"uploaded_file: {uploaded_file}")
-
-        # アップロード成功ファイルのリストアップ
-        uploaded_files.append(object_name)
+        logger.info(
+            "uploaded_file",
+            object_name=object_name,
+            file_id=uploaded_file.get("file", {}).get("id"),
+        )
+        logger.debug("uploaded_file", uploaded_file=uploaded_file)
 
     except Exception as err:
-        logger.error(f"ファイルのアップロードに失敗しました\n{err}")
+        logger.error("ファイルのアップロードに失敗しました", error=err)
         raise WorkforceBuddyException
 
     return uploaded_file
 
 
-def share_file_to_channel(
-    work_schedule_info: dict, slack_info: dict, uploaded_file: SlackResponse
+def get_monthly_summaries(
+    table_name: Optional[str], user_id: Optional[str], work_months: list[str]
+) -> dict[str, dict[str, int]]:
+    """
+    勤務月ごとの月次集計(Summary#yyyy-mm)をDBから取得する
+
+    集計は返信に添えるだけのため、取得できない場合は空とする
+
+    Args:
+        table_name (Optional[str]): テーブル名
+        user_id (Optional[str]): 社員番号
+        work_months (list[str]): 勤務月のリスト(ex: ['2023-07'])
+
+    Returns:
+        dict[str, dict[str, int]]: 勤務月ごとの集計(分)
+    """
+    summaries: dict[str, dict[str, int]] = {}
+    if not table_name or not user_id:
+        return summaries
+
+    for work_month in work_months:
+        try:
+            item: Optional[dict] = (
+                get_client("dynamodb")
+                .get_item(
+                    TableName=table_name,
+                    Key={
+                        "id": {"S": user_id},
+                        "SK": {"S": f"Summary#{work_month}"},
+                    },
+                )
+                .get("Item")
+            )
+        except Exception as err:
+            logger.warning("月次集計の取得に失敗しました", error=err)
+            continue
+
+        if item:
+            summaries[work_month] = {
+                field: int(item[field]["N"])
+                for field in SUMMARY_LABELS
+                if field in item
+            }
+
+    return summaries
+
+
+def format_summary(summary: dict[str, int]) -> str:
+    """
+    月次集計を表示用の文字列に変換する
+
+    Args:
+        summary (dict[str, int]): 月次集計(分)
+
+    Returns:
+        str: 表示用の文字列(ex: '勤務時間 160:00 / 深夜時間 0:00 / 休憩時間 20:00')
+    """
+    return " / ".join(
+        f"{label} {summary[field] // 60}:{summary[field] % 60:02}"
+        for field, label in SUMMARY_LABELS.items()
+        if field in summary
+    )
+
+
+def share_files_to_channel(
+    shared_files: list[tuple[dict, SlackResponse]],
+    slack_info: dict,
+    summaries: Optional[dict[str, dict[str, int]]] = None,
 ) -> None:
     """
-    Slackにアップロードされているファイルをチャンネルに共有する
+    Slackにアップロードされているファイルを1件のメッセージでチャンネルに共有する
 
     Args:
-        work_schedule_info (dict): 勤務月(ex: '2023-07')
+        shared_files (list[tuple[dict, SlackResponse]]):
+            勤務表の情報とSlackへアップロードされたファイルの情報のリスト
         slack_info (dit): アップロード先のSlack情報
-        uploaded_file (SlackResponse): Slackへアップロードされたファイルの情報
+        summaries (Optional[dict[str, dict[str, int]]]): 勤務月ごとの月次集計
     """
-    # 勤務した月の変換
-    work_month: datetime = datetime.strptime(
-        work_schedule_info["work_month"], "%Y-%m"
-    )
-    year: str = str(work_month.year)
-    month: str = str(work_month.month)
+    if not shared_files:
+        return None
 
     try:
-        file_url: str = uploaded_file["file"]["permalink"]
-        slack.chat_postMessage(
-            channel=slack_info["channel_id"],
-            text=f"<@{slack_info['user_id']}>\n{year}年{month}月の勤務表ができました！:\n{file_url}",
+        user: str = f"<@{slack_info['user_id']}>"
+        links: list[tuple[str, str]] = []
+        for work_schedule_info, uploaded_file in shared_files:
+            # 勤務した月の変換
+            work_month: datetime = datetime.strptime(
+                work_schedule_info["work_month"], "%Y-%m"
+            )
+            year: str = str(work_month.year)
+            month: str = str(work_month.month)
+            file_url: str = uploaded_file["file"]["permalink"]
+
+            # 月次集計があれば添える
+            summary: Optional[dict] = (summaries or {}).get(
+                work_schedule_info["work_month"]
+            )
+            link: str = file_url
+            if summary:
+                link = f"{file_url}\n{format_summary(summary)}"
+            links.append((f"{year}年{month}月", link))
+
+        if len(links) == 1:
+            year_month, link = links[0]
+            text: str = f"{user}\n{year_month}の勤務表ができました！:\n{link}"
+        else:
+            text = f"{user}\n勤務表ができました！\n" + "\n".join(
+                f"{year_month}: {link}" for year_month, link in links
+            )
+
+        scheduler = get_slack_scheduler(SLACK_BOT_TOKEN)
+        # 投稿済みの場合があるため、5xx・通信エラーでは再試行しない
+        scheduler.call(
+            ["chat.postMessage"],
+            lambda: scheduler.client.chat_postMessage(
+                channel=slack_info["channel_id"], text=text
+            ),
+            idempotent=False,
         )
     except Exception as err:
-        logger.error(f"ファイルの共有に失敗しました\n{err}")
+        logger.error("ファイルの共有に失敗しました", error=err)
         raise WorkforceBuddyException
 
 
+def record_upload(
+    table_name: Optional[str],
+    slack_user_id: str,
+    upload_hash: str,
+    user_id: str,
+    work_schedule_info_list: list[dict],
+) -> None:
+    """
+    アップロードされたファイルの内容のハッシュと、作成した勤務表を索引に記録する
+
+    索引は同じ内容のアップロードの処理を省くためのものであるため、
+    記録できない場合も処理は続ける
+
+    Args:
+        table_name (Optional[str]): テーブル名
+        slack_user_id (str): SlackのユーザID
+        upload_hash (str): アップロード全体の内容のハッシュ
+        user_id (str): 社員番号
+        work_schedule_info_list (list[dict]): 作成した勤務表の情報
+    """
+    if not table_name:
+        return None
+    if not all(info.get("etag") for info in work_schedule_info_list):
+        return None
+
+    created_at: str = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    item: dict = {
+        "id": {"S": slack_user_id},
+        "SK": {"S": f"{UPLOAD_INDEX_PREFIX}{upload_hash}"},
+        "user_id": {"S": user_id},
+        "work_months": {
+            "L": [
+                {"S": info["work_month"]} for info in work_schedule_info_list
+            ]
+        },
+        "work_schedules": {
+            "L": [
+                {
+                    "M": {
+                        key: {"S": info[key]}
+                        for key in (
+                            "work_month",
+                            "bucket_name",
+                            "object_name",
+                            "etag",
+                        )
+                    }
+                }
+                for info in work_schedule_info_list
+            ]
+        },
+        "created_at": {"S": created_at},
+    }
+    try:
+        get_client("dynamodb").put_item(TableName=table_name, Item=item)
+    except Exception as err:
+        logger.warning("アップロードの記録に失敗しました", error=err)
+
+
 def create_response(slack_info: dict, uploaded_files: list[str]) -> dict:
     """
     関数の返却値を生成する
@@ -1,51 +1,39 @@
 import io
 import json
-import logging
 import os
 from typing import Optional
 
-import boto3
 import numpy as np
 import pandas as pd
 
+from workforce_buddy_core import (
+    WORK_FILE_ENCODING,
+    WORK_FILE_FIELDS,
+    WorkforceBuddyException,
+    get_client,
+    get_logger,
+    get_resource,
+)
+
 # ロギングの初期設定
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
-s3 = boto3.client("s3")
-dynamodb = boto3.resource("dynamodb")
 
+# 月次集計の項目(集計項目名: 勤務データの項目名)
+SUMMARY_FIELDS: dict[str, str] = {
+    "work_minutes": "work_hours",
+    "night_minutes": "night_hours",
+    "break_minutes": "break_hours",
+}
 
-# カスタムエラーを定義
-class WorkforceBuddyException(Exception):
-    pass
+# 1トランザクションで書き込める最大件数
+MAX_TRANSACT_ITEMS: int = 100
 
+# 1回のBatchGetItemで取得できる最大件数
+MAX_BATCH_GET_ITEMS: int = 100
 
-# アップロードされた勤務ファイルのヘッダー
-FILE_HEADERS: list[str] = [
-    "id",
-    "name",
-    "date",
-    "work_num",
-    "date_code",
-    "date_type",
-    "work_code",
-    "work_type",
-    "start_time",
-    "end_time",
-    "start_time_round",
-    "end_time_round",
-    "break_hours",
-    "work_hours",
-    "night_hours",
-    "memo",
-    "approver",
-    "approval_datetime",
-    "second_approver",
-    "second_approval_datetime",
-    "third_approver",
-    "third_approval_datetime",
-]
+# 同時更新により書き込めなかった場合の最大試行回数
+MAX_STORE_ATTEMPTS: int = 3
 
 # 必要な勤務ファイルのヘッダー
 WORK_FILE_HEADER: list[str] = [
@@ -75,14 +63,14 @@ def lambda_handler(event: dict, context: dict) -> dict:
         dict: レスポンス
     """
     try:
-        logger.info(f"event: {event}")
+        logger.log_event(event, context)
         res: dict = logic(event)
 
     except WorkforceBuddyException:
         raise WorkforceBuddyException
 
     except Exception as err:
-        logger.error(f"想定外のエラーが発生しました\n{err}")
+        logger.error("想定外のエラーが発生しました", error=err)
         raise WorkforceBuddyException
 
     return res
@@ -100,31 +88,72 @@ def logic(event: dict) -> dict:
     """
     # 環境情報の読み出し
     try:
-        file_name: str = event["file_info"]["result"]["file_name"]
+        file_info: dict = event["file_info"]["result"]
+        file_names: list[str] = file_info.get("file_names") or [
+            file_info["file_name"]
+        ]
         bucket_name: str = os.environ["BUCKET_NAME"]
 
     except Exception:
         logger.error("環境情報の読み出しに失敗しました")
         raise WorkforceBuddyException
 
-    # 勤務データファイルの取得
-    work_file: Optional[bytes] = None
-    try:
-        work_file = (
-            s3.get_object(Bucket=bucket_name, Key=f"raw/{file_name}")
-            .get("Body")
-            .read()
-        )
-
-    except Exception:
-        logger.error("ファイルの取得に失敗しました")
+    work_data_list: list[pd.DataFrame] = []
+    converted_work_json: list[dict] = []
+    for file_name in file_names:
+        # 勤務データファイルの取得
+        work_file: Optional[bytes] = None
+        try:
+            work_file = (
+                get_client("s3")
+                .get_object(Bucket=bucket_name, Key=f"raw/{file_name}")
+                .get("Body")
+                .read()
+            )
+
+        except Exception:
+            logger.error("ファイルの取得に失敗しました")
+            raise WorkforceBuddyException
+
+        # ファイルを取得できなかった場合
+        if not work_file:
+            logger.error("ファイルの取得に失敗しました")
+            raise WorkforceBuddyException
+
+        # ファイルの読み込み・加工
+        file_work_data: pd.DataFrame
+        file_work_json: list[dict]
+        file_work_data, file_work_json = parse_work_file(work_file)
+        work_data_list.append(file_work_data)
+        converted_work_json.extend(file_work_json)
+
+    # まとめてアップロードされたファイルは同じ社員のものに限る
+    # (GetWorkDataで他の社員のファイルは除外済み)
+    work_data: pd.DataFrame = pd.concat(work_data_list, ignore_index=True)
+    if work_data["id"].nunique() > 1:
+        logger.error("複数の社員の勤務データが含まれています")
         raise WorkforceBuddyException
 
-    # ファイルを取得できなかった場合
-    if not work_file:
-        logger.error("ファイルの取得に失敗しました")
-        raise WorkforceBuddyException
+    # データの登録
+    store_work_data(converted_work_json)
+
+    # データから返却情報を生成
+    res = create_response(work_data)
+
+    return res
 
+
+def parse_work_file(work_file: bytes) -> tuple[pd.DataFrame, list[dict]]:
+    """
+    勤務データファイルを読み込み、DBへ登録する形へ変換する
+
+    Args:
+        work_file (bytes): 勤務データファイル(バイナリ)
+
+    Returns:
+        tuple[pd.DataFrame, list[dict]]:
+            ファイル内の勤務データ, DBへ登録する勤務データのリスト
+    """
     # ファイルの読み込み
     work_data: pd.DataFrame = load_work_data(work_file)
 
@@ -136,13 +165,7 @@ def logic(event: dict) -> dict:
         converted_work_data.to_json(orient="table", index=False)
     ).get("data")
 
-    # データの登録
-    store_work_data(converted_work_json)
-
-    # データから返却情報を生成
-    res = create_response(work_data)
-
-    return res
+    return work_data, converted_work_json
 
 
 def load_work_data(work_file: bytes) -> pd.DataFrame:
@@ -158,9 +181,9 @@ def load_work_data(work_file: bytes) -> pd.DataFrame:
     try:
         work_data = pd.read_csv(
             io.BytesIO(work_file),
-            encoding="Shift-JIS",
+            encoding=WORK_FILE_ENCODING,
             delimiter="\t",
-            names=FILE_HEADERS,
+            names=WORK_FILE_FIELDS,
             index_col=None,
             skiprows=[0],
             dtype=str,
@@ -168,7 +191,7 @@ def load_work_data(work_file: bytes) -> pd.DataFrame:
         )
 
     except Exception as err:
-        logger.error(f"データの読み込みに失敗しました\n{err}")
+        logger.error("データの読み込みに失敗しました", error=err)
         raise WorkforceBuddyException
 
     return work_data
@@ -238,7 +261,11 @@ def time_paser(time: str) -> pd.Timedelta:
 
 def store_work_data(work_data: list[dict]) -> None:
     """
-    勤務データ(pd.DataFrame)をDynamoDBへ登録する
+    勤務データをDynamoDBへ登録し、月次集計(Summary#yyyy-mm)を更新する
+
+    登録済みの勤務データとの差分だけを月次集計に加算する
+    勤務データと月次集計は同じトランザクションで書き込み、
+    登録済みの勤務データが読み込み後に変更されていた場合は再試行する
 
     Args:
         work_data (list[dict]): 登録する勤務データのリスト
@@ -246,19 +273,279 @@ def store_work_data(work_data: list[dict]) -> None:
     # DynamoDBテーブル名の取得
     table_name = os.environ["TABLE_NAME"]
 
-    # DynamoDBテーブルの取得
-    table = dynamodb.Table(table_name)
+    # 同じキーの勤務データは後のものを優先する
+    pending: list[dict] = list(
+        {(item["id"], item["SK"]): item for item in work_data}.values()
+    )
+
+    for _ in range(MAX_STORE_ATTEMPTS):
+        # 登録済みの勤務データを取得
+        stored_rows: dict[tuple[str, str], dict] = get_stored_rows(
+            table_name, pending
+        )
+
+        conflicted: list[dict] = []
+        for rows in chunk_rows_by_month(pending):
+            if not write_rows_with_summary(table_name, rows, stored_rows):
+                conflicted.extend(rows)
+
+        if not conflicted:
+            return None
+        pending = conflicted
+
+    logger.error("勤務データが同時に更新されたため、登録できませんでした")
+    raise WorkforceBuddyException
+
+
+def get_stored_rows(
+    table_name: str, work_data: list[dict]
+) -> dict[tuple[str, str], dict]:
+    """
+    登録済みの勤務データをDynamoDBから取得する
+
+    Args:
+        table_name (str): テーブル名
+        work_data (list[dict]): 登録する勤務データのリスト
+
+    Returns:
+        dict[tuple[str, str], dict]: (社員番号, ソートキー)ごとの勤務データ
+    """
+    keys: list[dict] = [
+        {"id": item["id"], "SK": item["SK"]} for item in work_data
+    ]
+    stored_rows: dict[tuple[str, str], dict] = {}
+    try:
+        for i in range(0, len(keys), MAX_BATCH_GET_ITEMS):
+            request: dict = {
+                table_name: {
+                    "Keys": keys[i : i + MAX_BATCH_GET_ITEMS],
+                    "ConsistentRead": True,
+                }
+            }
+            while request:
+                res: dict = get_resource(
+                    "dynamodb"
+                ).meta.client.batch_get_item(RequestItems=request)
+                for item in res["Responses"].get(table_name, []):
+                    stored_rows[(item["id"], item["SK"])] = item
+                request = res.get("UnprocessedKeys") or {}
+
+    except Exception as err:
+        logger.error("登録済みの勤務データの取得に失敗しました", error=err)
+        raise WorkforceBuddyException
+
+    return stored_rows
+
+
+def chunk_rows_by_month(work_data: list[dict]) -> list[list[dict]]:
+    """
+    勤務データを社員・勤務月ごとに、1トランザクションで書き込める件数に分割する
+
+    Args:
+        work_data (list[dict]): 勤務データのリスト
+
+    Returns:
+        list[list[dict]]: 分割した勤務データのリスト
+    """
+    rows_by_month: dict[tuple[str, str], list[dict]] = {}
+    for item in work_data:
+        rows_by_month.setdefault(
+            (item["id"], get_work_month(item["SK"])), []
+        ).append(item)
+
+    # 月次集計の更新分を除いた件数で分割する
+    chunk_size: int = MAX_TRANSACT_ITEMS - 1
+    chunks: list[list[dict]] = []
+    for rows in rows_by_month.values():
+        for i in range(0, len(rows), chunk_size):
+            chunks.append(rows[i : i + chunk_size])
+
+    return chunks
+
+
+def write_rows_with_summary(
+    table_name: str,
+    rows: list[dict],
+    stored_rows: dict[tuple[str, str], dict],
+) -> bool:
+    """
+    同じ社員・勤務月の勤務データと月次集計の差分を1トランザクションで書き込む
+
+    Args:
+        table_name (str): テーブル名
+        rows (list[dict]): 同じ社員・勤務月の勤務データのリスト
+        stored_rows (dict[tuple[str, str], dict]): 登録済みの勤務データ
+
+    Returns:
+        bool: 登録済みの勤務データが変更されていて書き込めなかった場合False
+    """
+    # 登録済みの内容から変更がない勤務データは書き込まない
+    changed_rows: list[dict] = [
+        item
+        for item in rows
+        if stored_rows.get((item["id"], item["SK"])) != item
+    ]
+    if not changed_rows:
+        return True
+
+    old_rows: list[dict] = [
+        stored_rows[(item["id"], item["SK"])]
+        for item in changed_rows
+        if (item["id"], item["SK"]) in stored_rows
+    ]
+
+    # 月次集計の差分(新しい勤務データの集計 - 登録済みの勤務データの集計)
+    user_id: str = changed_rows[0]["id"]
+    work_month: str = get_work_month(changed_rows[0]["SK"])
+    new_summary: dict = summarize_work_data(changed_rows).get(work_month, {})
+    old_summary: dict = summarize_work_data(old_rows).get(work_month, {})
+    delta: dict[str, int] = {
+        field: new_summary.get(field, 0) - old_summary.get(field, 0)
+        for field in SUMMARY_FIELDS
+    }
+
+    transact_items: list[dict] = [
+        {
+            "Put": {
+                "TableName": table_name,
+                "Item": item,
+                **create_row_condition(
+                    stored_rows.get((item["id"], item["SK"]))
+                ),
+            }
+        }
+        for item in changed_rows
+    ]
+    transact_items.append(
+        {
+            "Update": {
+                "TableName": table_name,
+                "Key": {"id": user_id, "SK": f"Summary#{work_month}"},
+                # 勤務月ごとのユーザ一覧(InvertedIndex)のキーも設定する
+                "UpdateExpression": "ADD "
+                + ", ".join(f"{field} :{field}" for field in SUMMARY_FIELDS)
+                + " SET index_pk = :index_pk, index_sk = :index_sk",
+                "ExpressionAttributeValues": {
+                    **{f":{field}": value for field, value in delta.items()},
+                    ":index_pk": f"Month#{work_month}",
+                    ":index_sk": user_id,
+                },
+            }
+        }
+    )
 
-    # DynamoDBへレコードの書き込み
+    client = get_resource("dynamodb").meta.client
     try:
-        with table.batch_writer() as batch:
-            for item in work_data:
-                batch.put_item(Item=item)
+        client.transact_write_items(TransactItems=transact_items)
+
+    except client.exceptions.TransactionCanceledException as err:
+        reasons: list[dict] = err.response.get("CancellationReasons", [])
+        if any(r.get("Code") == "ConditionalCheckFailed" for r in reasons):
+            logger.info(
+                "勤務データが同時に更新されました", work_month=work_month
+            )
+            return False
+        logger.error("DynamoDBへの登録が失敗しました", error=err)
+        raise WorkforceBuddyException
 
     except Exception as err:
-        logger.error(f"DynamoDBへの登録が失敗しました\n{err}")
+        logger.error("DynamoDBへの登録が失敗しました", error=err)
         raise WorkforceBuddyException
 
+    return True
+
+
+def create_row_condition(stored_row: Optional[dict]) -> dict:
+    """
+    読み込んだ時点から勤務データが変更されていないことを確認する条件を作成する
+
+    Args:
+        stored_row (Optional[dict]): 登録済みの勤務データ(未登録の場合はNone)
+
+    Returns:
+        dict: ConditionExpressionと関連するパラメータ
+    """
+    if stored_row is None:
+        return {"ConditionExpression": "attribute_not_exists(id)"}
+
+    conditions: list[str] = []
+    names: dict[str, str] = {}
+    values: dict[str, object] = {}
+    for column in SUMMARY_FIELDS.values():
+        names[f"#{column}"] = column
+        value = stored_row.get(column)
+        if value is None:
+            conditions.append(
+                f"(attribute_not_exists(#{column}) "
+                f"OR attribute_type(#{column}, :null_type))"
+            )
+            values[":null_type"] = "NULL"
+        else:
+            conditions.append(f"#{column} = :{column}")
+            values[f":{column}"] = value
+
+    return {
+        "ConditionExpression": " AND ".join(conditions),
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": values,
+    }
+
+
+def summarize_work_data(work_data: list[dict]) -> dict[str, dict[str, int]]:
+    """
+    勤務データを勤務月ごとに集計する
+
+    Args:
+        work_data (list[dict]): 勤務データのリスト
+
+    Returns:
+        dict[str, dict[str, int]]: 勤務月ごとの集計(分)
+            ex: {'2023-07': {'work_minutes': 9600, ...}}
+    """
+    summaries: dict[str, dict[str, int]] = {}
+    for item in work_data:
+        summary: dict[str, int] = summaries.setdefault(
+            get_work_month(item["SK"]), dict.fromkeys(SUMMARY_FIELDS, 0)
+        )
+        for field, column in SUMMARY_FIELDS.items():
+            summary[field] += hours_to_minutes(item.get(column))
+
+    return summaries
+
+
+def hours_to_minutes(hours: Optional[str]) -> int:
+    """
+    'h:mm'形式の時間を分に変換する
+
+    Args:
+        hours (Optional[str]): 'h:mm'形式の時間(ex: '8:00')
+
+    Returns:
+        int: 分(未入力の場合は0)
+    """
+    if not hours:
+        return 0
+
+    try:
+        h, m = str(hours).split(":")
+        return int(h) * 60 + int(m)
+    except Exception as err:
+        logger.error("時間の形式が不正です", hours=hours, error=err)
+        raise WorkforceBuddyException
+
+
+def get_work_month(sort_key: str) -> str:
+    """
+    勤務データのソートキーから勤務月を取り出す
+
+    Args:
+        sort_key (str): ソートキー(ex: 'WorkData#2023-05-10#01')
+
+    Returns:
+        str: 勤務月(ex: '2023-05')
+    """
+    return sort_key.split("#")[1][:7]
+
 
 def create_response(work_data: pd.DataFrame) -> dict:
     """
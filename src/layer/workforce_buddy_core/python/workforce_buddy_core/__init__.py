@@ -0,0 +1,59 @@
+"""
+WorkforceBuddyのLambda関数で共通して使用する処理
+
+Lambdaレイヤ(src/layer/workforce_buddy_core)として各関数に追加する
+"""
+
+from workforce_buddy_core.clients import (
+    HTTP_TIMEOUT,
+    get_client,
+    get_http_session,
+    get_resource,
+    get_slack_client,
+    get_slack_scheduler,
+    register_client,
+    reset_clients,
+)
+from workforce_buddy_core.errors import WorkforceBuddyException
+from workforce_buddy_core.item_codec import (
+    decode_item,
+    decode_string_columns,
+    decode_value,
+)
+from workforce_buddy_core.log import get_logger
+from workforce_buddy_core.timing import measure
+from workforce_buddy_core.user_config import (
+    USER_CONFIG_LATEST_SK,
+    get_latest_user_config,
+)
+from workforce_buddy_core.work_file import (
+    WORK_FILE_ENCODING,
+    WORK_FILE_FIELDS,
+    check_work_file_header,
+    check_work_file_row,
+    get_work_file_user_ids,
+)
+
+__all__ = [
+    "HTTP_TIMEOUT",
+    "USER_CONFIG_LATEST_SK",
+    "WORK_FILE_ENCODING",
+    "WORK_FILE_FIELDS",
+    "WorkforceBuddyException",
+    "check_work_file_header",
+    "check_work_file_row",
+    "decode_item",
+    "decode_string_columns",
+    "decode_value",
+    "get_client",
+    "get_http_session",
+    "get_latest_user_config",
+    "get_logger",
+    "get_resource",
+    "get_slack_client",
+    "get_slack_scheduler",
+    "get_work_file_user_ids",
+    "measure",
+    "register_client",
+    "reset_clients",
+]
@@ -0,0 +1,235 @@
+"""
+AWS・Slackのクライアント、Slackへの送信スケジューラと、ファイル取得用のHTTPセッション
+
+いずれも初回の使用時に作成してモジュール内に保持し、ウォームコンテナでは
+接続プールごと再利用する
+"""
+
+import os
+import threading
+from typing import Any, Optional
+
+import boto3
+from botocore.config import Config
+
+# AWSへの接続・読み込みのタイムアウト(秒)
+AWS_CONNECT_TIMEOUT: float = float(os.environ.get("AWS_CONNECT_TIMEOUT", 3))
+AWS_READ_TIMEOUT: float = float(os.environ.get("AWS_READ_TIMEOUT", 20))
+
+# クライアントごとの接続プールの最大数
+MAX_POOL_CONNECTIONS: int = int(os.environ.get("MAX_POOL_CONNECTIONS", 16))
+
+# AWSの呼び出しの最大試行回数(初回を含む)
+AWS_MAX_ATTEMPTS: int = 5
+
+# AWSクライアントの設定
+# 送信レートを自動で調整するadaptiveモードで再試行し、TCP keep-aliveを有効にする
+BOTO_CONFIG: Config = Config(
+    connect_timeout=AWS_CONNECT_TIMEOUT,
+    read_timeout=AWS_READ_TIMEOUT,
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"max_attempts": AWS_MAX_ATTEMPTS, "mode": "adaptive"},
+    tcp_keepalive=True,
+)
+
+# Slack Web APIのタイムアウト(秒)
+SLACK_TIMEOUT: int = 10
+
+# Slackのレート制限(429)による再試行回数
+SLACK_RATE_LIMIT_RETRIES: int = 2
+
+# ファイル取得の(接続, 読み込み)タイムアウト(秒)
+HTTP_TIMEOUT: tuple[float, float] = (3.0, 30.0)
+
+# ファイル取得の再試行回数
+HTTP_RETRIES: int = 2
+
+_lock = threading.Lock()
+_clients: dict[str, Any] = {}
+_resources: dict[str, Any] = {}
+_slack_clients: dict[tuple[str, int], Any] = {}
+_slack_schedulers: dict[str, Any] = {}
+_http_session: Optional[Any] = None
+
+
+def get_client(service_name: str) -> Any:
+    """
+    AWSのクライアントを取得する(初回のみ作成)
+
+    Args:
+        service_name (str): サービス名(ex: 's3', 'dynamodb')
+
+    Returns:
+        Any: boto3のクライアント
+    """
+    client: Any = _clients.get(service_name)
+    if client is not None:
+        return client
+
+    # boto3のデフォルトセッションはスレッドセーフではないため、作成時はロックする
+    with _lock:
+        client = _clients.get(service_name)
+        if client is None:
+            client = boto3.client(service_name, config=BOTO_CONFIG)
+            _clients[service_name] = client
+
+    return client
+
+
+def get_resource(service_name: str) -> Any:
+    """
+    AWSのリソース(boto3のリソース層)を取得する(初回のみ作成)
+
+    Args:
+        service_name (str): サービス名(ex: 'dynamodb')
+
+    Returns:
+        Any: boto3のリソース
+    """
+    resource: Any = _resources.get(service_name)
+    if resource is not None:
+        return resource
+
+    with _lock:
+        resource = _resources.get(service_name)
+        if resource is None:
+            resource = boto3.resource(service_name, config=BOTO_CONFIG)
+            _resources[service_name] = resource
+
+    return resource
+
+
+def get_slack_client(
+    token: str, rate_limit_retries: int = SLACK_RATE_LIMIT_RETRIES
+) -> Any:
+    """
+    Slack Web APIのクライアントを取得する(トークンごとに初回のみ作成)
+
+    環境変数SLACK_API_URLが設定されている場合は、そのURLへ接続する
+
+    Args:
+        token (str): アクセストークン
+        rate_limit_retries (int): レート制限(429)による再試行回数
+
+    Returns:
+        Any: slack_sdkのWebClient
+    """
+    key: tuple[str, int] = (token, rate_limit_retries)
+    client: Any = _slack_clients.get(key)
+    if client is not None:
+        return client
+
+    from slack_sdk import WebClient
+    from slack_sdk.http_retry.builtin_handlers import (
+        RateLimitErrorRetryHandler,
+    )
+
+    with _lock:
+        client = _slack_clients.get(key)
+        if client is None:
+            client = WebClient(
+                token=token,
+                base_url=os.environ.get("SLACK_API_URL", WebClient.BASE_URL),
+                timeout=SLACK_TIMEOUT,
+            )
+            if rate_limit_retries > 0:
+                client.retry_handlers.append(
+                    RateLimitErrorRetryHandler(
+                        max_retry_count=rate_limit_retries
+                    )
+                )
+            _slack_clients[key] = client
+
+    return client
+
+
+def get_slack_scheduler(token: str) -> Any:
+    """
+    Slackへの送信をレート制限内で行うスケジューラを取得する
+    (トークンごとに初回のみ作成し、コンテナ内の送信で共有する)
+
+    429はスケジューラが再試行するため、クライアントでは再試行しない
+
+    Args:
+        token (str): アクセストークン
+
+    Returns:
+        Any: SlackDeliveryScheduler
+    """
+    scheduler: Any = _slack_schedulers.get(token)
+    if scheduler is not None:
+        return scheduler
+
+    from workforce_buddy_core.slack_delivery import SlackDeliveryScheduler
+
+    client = get_slack_client(token, rate_limit_retries=0)
+    with _lock:
+        scheduler = _slack_schedulers.get(token)
+        if scheduler is None:
+            scheduler = SlackDeliveryScheduler(client)
+            _slack_schedulers[token] = scheduler
+
+    return scheduler
+
+
+def get_http_session() -> Any:
+    """
+    ファイル取得用のHTTPセッションを取得する(初回のみ作成)
+
+    同じホストへの接続を使い回し、接続エラー・一時的なエラーは再試行する
+
+    Returns:
+        Any: requestsのSession
+    """
+    global _http_session
+    if _http_session is not None:
+        return _http_session
+
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    with _lock:
+        if _http_session is None:
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=0.2,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"],
+            )
+            adapter = HTTPAdapter(
+                pool_maxsize=MAX_POOL_CONNECTIONS, max_retries=retry
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+
+    return _http_session
+
+
+def register_client(service_name: str, client: Any) -> None:
+    """
+    AWSのクライアントを差し替える(ローカル実行用)
+
+    Args:
+        service_name (str): サービス名
+        client (Any): 代わりに使用するクライアント
+    """
+    with _lock:
+        _clients[service_name] = client
+
+
+def reset_clients() -> None:
+    """
+    保持しているクライアントとHTTPセッションを全て破棄する
+    """
+    global _http_session
+    with _lock:
+        _clients.clear()
+        _resources.clear()
+        _slack_clients.clear()
+        _slack_schedulers.clear()
+        if _http_session is not None:
+            _http_session.close()
+        _http_session = None
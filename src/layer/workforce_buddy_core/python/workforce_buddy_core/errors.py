@@ -0,0 +1,3 @@
+# カスタムエラーを定義
+class WorkforceBuddyException(Exception):
+    pass
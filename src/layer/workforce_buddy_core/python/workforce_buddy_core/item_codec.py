@@ -0,0 +1,100 @@
+"""
+低レベルクライアントが返すDynamoDB形式の項目の変換
+
+boto3のリソース層(TypeDeserializer)と異なり、数値はDecimalではなく
+intまたはfloatとする
+"""
+
+from typing import Any, Iterable, Optional, Union
+
+from workforce_buddy_core.errors import WorkforceBuddyException
+
+
+def decode_item(item: dict) -> dict:
+    """
+    DynamoDB形式の項目(ユーザ設定・テンプレート設定など)を変換する
+
+    Args:
+        item (dict): DynamoDB形式の項目
+
+    Returns:
+        dict: 変換した項目
+    """
+    return {key: decode_value(value) for key, value in item.items()}
+
+
+def decode_value(value: dict) -> Any:
+    """
+    DynamoDB形式の値を変換する
+
+    Args:
+        value (dict): DynamoDB形式の値(ex: {'S': 'T0001'})
+
+    Returns:
+        Any: 変換した値
+    """
+    ((type_name, data),) = value.items()
+    if type_name == "S":
+        return data
+    if type_name == "N":
+        return decode_number(data)
+    if type_name == "NULL":
+        return None
+    if type_name == "BOOL":
+        return data
+    if type_name == "M":
+        return decode_item(data)
+    if type_name == "L":
+        return [decode_value(v) for v in data]
+    if type_name == "SS":
+        return set(data)
+    if type_name == "NS":
+        return {decode_number(v) for v in data}
+    if type_name == "B":
+        return data
+    if type_name == "BS":
+        return set(data)
+
+    raise WorkforceBuddyException(f"対応していない型です: {type_name}")
+
+
+def decode_number(data: str) -> Union[int, float]:
+    """
+    DynamoDB形式の数値(文字列)をintまたはfloatに変換する
+
+    Args:
+        data (str): 数値の文字列(ex: '15', '7.5')
+
+    Returns:
+        Union[int, float]: 数値
+    """
+    try:
+        return int(data)
+    except ValueError:
+        return float(data)
+
+
+def decode_string_columns(
+    items: list[dict], columns: Iterable[str]
+) -> dict[str, list]:
+    """
+    文字列(またはNULL)のみの項目のリストを、項目名ごとの値のリストに変換する
+
+    型ごとの変換を行わずに'S'の値を直接取り出す(DataFrameの作成用)
+
+    Args:
+        items (list[dict]): DynamoDB形式の項目のリスト
+        columns (Iterable[str]): 取り出す項目名
+
+    Returns:
+        dict[str, list]: 項目名ごとの値のリスト(存在しない値はNone)
+    """
+    decoded: dict[str, list] = {}
+    for column in columns:
+        values: list = []
+        for item in items:
+            value: Optional[dict] = item.get(column)
+            values.append(None if value is None else value.get("S"))
+        decoded[column] = values
+
+    return decoded
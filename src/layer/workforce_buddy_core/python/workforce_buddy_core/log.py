@@ -0,0 +1,340 @@
+"""
+Lambda関数の構造化ログ
+
+ログは1行のJSON(level, message, request_id と任意の項目)で出力する
+(関数ごとにロググループが分かれるため、ロガー名は含めない)
+項目(イベント・Slackの応答など)はログを出力する場合にのみ変換し、
+- トークン・署名などの秘匿情報を伏せる
+- 長い文字列・要素の多いリストを切り詰める
+- 変換後も大きい項目は、一部の呼び出し(サンプリング)を除いて概要のみにする
+
+出力するレベルは関数ごとに環境変数LOG_LEVELで指定する(既定はINFO)
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import sys
+from functools import lru_cache
+from typing import Any, MutableMapping, Optional
+
+# 出力するレベル(関数ごとの環境変数で指定する)
+LOG_LEVEL: str = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# 1つの項目の出力の上限(バイト, 超える場合はサンプリングした呼び出しのみ出力する)
+LOG_PAYLOAD_MAX_BYTES: int = int(os.environ.get("LOG_PAYLOAD_MAX_BYTES", 2048))
+
+# 上限を超える項目をそのまま出力する割合
+LOG_PAYLOAD_SAMPLE_RATE: float = float(
+    os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.05)
+)
+
+# 文字列の最大文字数
+LOG_STRING_MAX_CHARS: int = 512
+
+# リスト・辞書の最大要素数
+LOG_COLLECTION_MAX_ITEMS: int = 50
+
+# 概要にする場合の文字列の最大文字数
+LOG_SUMMARY_MAX_CHARS: int = 64
+
+# 入れ子の最大の深さ
+LOG_MAX_DEPTH: int = 8
+
+# 値を伏せるキー(部分一致, 大文字小文字を区別しない)
+REDACTED_KEY_PATTERN: re.Pattern = re.compile(
+    r"token|secret|password|authorization|signature|cookie", re.IGNORECASE
+)
+
+# 値を伏せる文字列(SlackのトークンとBearerの認証情報)
+REDACTED_VALUE_PATTERN: re.Pattern = re.compile(
+    r"xox[a-z]-[0-9A-Za-z-]+|Bearer\s+\S+"
+)
+
+REDACTED: str = "***"
+
+# LogRecordの属性名(項目を格納する)
+FIELDS_ATTRIBUTE: str = "fields"
+
+# Lambdaのリクエストごとの識別子(ログに付与する)
+_request_id: Optional[str] = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    LogRecordを1行のJSONに変換する
+
+    Args:
+        max_payload_bytes (int): 1つの項目の出力の上限(バイト)
+        sample_rate (float): 上限を超える項目をそのまま出力する割合
+    """
+
+    def __init__(
+        self,
+        max_payload_bytes: int = LOG_PAYLOAD_MAX_BYTES,
+        sample_rate: float = LOG_PAYLOAD_SAMPLE_RATE,
+    ) -> None:
+        super().__init__()
+        self.max_payload_bytes = max_payload_bytes
+        self.sample_rate = sample_rate
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict = {
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if _request_id:
+            entry["request_id"] = _request_id
+
+        fields: dict = getattr(record, FIELDS_ATTRIBUTE, None) or {}
+        if fields:
+            sampled: bool = random.random() < self.sample_rate
+            for key, value in fields.items():
+                entry[key] = self.format_field(key, value, sampled)
+            if sampled:
+                entry["sampled"] = True
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+    def format_field(self, key: str, value: Any, sampled: bool) -> Any:
+        """
+        項目を出力する形に変換する
+
+        秘匿情報を伏せて切り詰めた後も上限を超える場合は、サンプリングした
+        呼び出しを除いて概要のみにする(上限を超えた時点で変換を打ち切る)
+        """
+        if is_redacted_key(key):
+            return REDACTED
+        if sampled:
+            return sanitize(value)
+
+        try:
+            return sanitize(value, PayloadBudget(self.max_payload_bytes))
+        except PayloadTooLarge:
+            return summarize(value)
+
+
+class PayloadTooLarge(Exception):
+    """
+    変換中の項目が出力の上限を超えた
+    """
+
+
+class PayloadBudget:
+    """
+    項目の出力の残りのバイト数(文字数による概算)
+
+    Args:
+        remaining (int): 出力の上限(バイト)
+    """
+
+    def __init__(self, remaining: int) -> None:
+        self.remaining = remaining
+
+    def spend(self, size: int) -> None:
+        self.remaining -= size
+        if self.remaining < 0:
+            raise PayloadTooLarge
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    キーワード引数を項目として受け取るロガー
+
+    項目はレベルが有効な場合にのみ、出力時に変換される
+    (メッセージは固定の文言とし、値はf文字列に埋め込まず項目として渡す)
+
+        logger.info("event", event=event)
+        logger.info("timings", timings=timings)
+        logger.error("設定の取得に失敗しました", config_id=config_id, error=err)
+    """
+
+    def process(
+        self, msg: Any, kwargs: MutableMapping[str, Any]
+    ) -> tuple[Any, MutableMapping[str, Any]]:
+        fields: dict = {
+            key: kwargs.pop(key)
+            for key in list(kwargs)
+            if key not in ("exc_info", "stack_info", "stacklevel", "extra")
+        }
+        if fields:
+            kwargs["extra"] = {
+                **(kwargs.get("extra") or {}),
+                FIELDS_ATTRIBUTE: fields,
+            }
+        return msg, kwargs
+
+    def log_event(self, event: Any, context: Any) -> None:
+        """
+        Lambda関数の呼び出しを記録する
+
+        以降のログにリクエストの識別子を付与し、イベントを出力する
+        """
+        global _request_id
+        _request_id = getattr(context, "aws_request_id", None)
+        self.info("event", event=event)
+
+
+def get_logger(name: str) -> StructuredLogger:
+    """
+    Lambda関数のロガーを取得する
+
+    Lambda上では構造化ログを標準出力へ書き出すハンドラを設定する
+    (それ以外の環境では、利用する側のハンドラの設定に従う)
+
+    Args:
+        name (str): ロガー名(モジュール名)
+
+    Returns:
+        StructuredLogger: ロガー
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(LOG_LEVEL)
+    if "AWS_LAMBDA_FUNCTION_NAME" in os.environ and not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(StructuredFormatter())
+        logger.addHandler(handler)
+        # ランタイムのルートロガーへは渡さない(二重に出力しない)
+        logger.propagate = False
+
+    return StructuredLogger(logger, {})
+
+
+def sanitize(
+    value: Any, budget: Optional[PayloadBudget] = None, depth: int = 0
+) -> Any:
+    """
+    秘匿情報を伏せ、長い文字列・要素の多いコレクションを切り詰める
+
+    Args:
+        value (Any): 変換する値
+        budget (Optional[PayloadBudget]): 出力の上限(超えるとPayloadTooLarge)
+        depth (int): 入れ子の深さ
+
+    Returns:
+        Any: JSONに変換できる値
+    """
+    if isinstance(value, str):
+        value = redact_text(value)
+        if len(value) > LOG_STRING_MAX_CHARS:
+            omitted = len(value) - LOG_STRING_MAX_CHARS
+            value = f"{value[:LOG_STRING_MAX_CHARS]}...(+{omitted} chars)"
+        if budget is not None:
+            budget.spend(len(value) + 2)
+        return value
+
+    if isinstance(value, dict):
+        if depth >= LOG_MAX_DEPTH:
+            return sanitize(f"<dict of {len(value)} keys>", budget, depth)
+        sanitized: dict = {}
+        for i, (key, item) in enumerate(value.items()):
+            if i >= LOG_COLLECTION_MAX_ITEMS:
+                sanitized["..."] = f"+{len(value) - i} keys"
+                break
+            key = str(key)
+            if budget is not None:
+                budget.spend(len(key) + 4)
+            sanitized[key] = (
+                REDACTED
+                if is_redacted_key(key)
+                else sanitize(item, budget, depth + 1)
+            )
+        return sanitized
+
+    if value is None or isinstance(value, (bool, int, float)):
+        if budget is not None:
+            budget.spend(8)
+        return value
+
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items: list = list(value)
+        if depth >= LOG_MAX_DEPTH:
+            return sanitize(f"<list of {len(items)} items>", budget, depth)
+        sanitized_items: list = [
+            sanitize(item, budget, depth + 1)
+            for item in items[:LOG_COLLECTION_MAX_ITEMS]
+        ]
+        if len(items) > LOG_COLLECTION_MAX_ITEMS:
+            sanitized_items.append(
+                f"...(+{len(items) - LOG_COLLECTION_MAX_ITEMS} items)"
+            )
+        return sanitized_items
+
+    if isinstance(value, (bytes, bytearray)):
+        return sanitize(f"<{len(value)} bytes>", budget, depth)
+
+    # SlackResponseなど、応答の本体をdataに持つオブジェクト
+    data: Any = getattr(value, "data", None)
+    if isinstance(data, dict):
+        return sanitize(data, budget, depth)
+
+    return sanitize(str(value), budget, depth)
+
+
+@lru_cache(maxsize=1024)
+def is_redacted_key(key: str) -> bool:
+    """
+    値を伏せるキーか(キーは繰り返し現れるため結果を保持する)
+    """
+    return REDACTED_KEY_PATTERN.search(key) is not None
+
+
+def redact_text(text: str) -> str:
+    """
+    文字列に含まれるトークン・認証情報を伏せる
+    """
+    if "xox" not in text and "Bearer" not in text:
+        return text
+    return REDACTED_VALUE_PATTERN.sub(REDACTED, text)
+
+
+def summarize(value: Any) -> Any:
+    """
+    上限を超える項目の概要
+
+    辞書は先頭の階層の短い値(IDなど)を残し、入れ子の値は型と要素数にする
+    """
+    data: Any = getattr(value, "data", None)
+    if isinstance(data, dict):
+        value = data
+
+    if isinstance(value, dict):
+        summary: dict = {"truncated": True}
+        for key, item in list(value.items())[:LOG_COLLECTION_MAX_ITEMS]:
+            key = str(key)
+            summary[key] = REDACTED if is_redacted_key(key) else describe(item)
+        return summary
+
+    if isinstance(value, (list, tuple)):
+        return {
+            "truncated": True,
+            "items": len(value),
+            "head": [describe(item) for item in value[:3]],
+        }
+
+    return describe(value)
+
+
+def describe(value: Any) -> Any:
+    """
+    短い値はそのまま(秘匿情報は伏せる)、それ以外は型と大きさを返す
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return f"<dict of {len(value)} keys>"
+    if isinstance(value, (list, tuple)):
+        return f"<list of {len(value)} items>"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+
+    text: str = redact_text(str(value))
+    if len(text) > LOG_SUMMARY_MAX_CHARS:
+        omitted = len(text) - LOG_SUMMARY_MAX_CHARS
+        return f"{text[:LOG_SUMMARY_MAX_CHARS]}...(+{omitted} chars)"
+    return text
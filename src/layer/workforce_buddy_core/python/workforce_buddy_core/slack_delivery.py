@@ -0,0 +1,323 @@
+"""
+Slackへの送信をメソッドごとのレート制限内で行うスケジューラ
+
+Slack Web APIはメソッドごとに1分あたりの呼び出し数(Tier)が決まっており、
+超えると429(Retry-After付き)を返す
+メソッドごとのトークンバケットで送信間隔を保ち、429を受けた場合は
+Retry-Afterの間そのメソッドの送信を止めてから再試行する
+上限は全てのコンテナで共有されるため、429を受けるたびにコンテナ内の送信レートを
+半分に下げ、成功するごとに少しずつ戻す
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence, TypeVar
+
+from slack_sdk.errors import SlackApiError, SlackClientError
+
+T = TypeVar("T")
+
+# メソッドごとの1分あたりの呼び出し上限
+# (chat.postMessage: 1秒に1件程度, files.*: Tier 4)
+# 環境変数SLACK_RATE_LIMITS(JSON)で上書きできる
+DEFAULT_SLACK_RATE_LIMITS: dict[str, int] = {
+    "chat.postMessage": 60,
+    "files.getUploadURLExternal": 100,
+    "files.completeUploadExternal": 100,
+}
+SLACK_RATE_LIMITS: dict[str, int] = {
+    **DEFAULT_SLACK_RATE_LIMITS,
+    **json.loads(os.environ.get("SLACK_RATE_LIMITS") or "{}"),
+}
+
+# 待たずに連続して呼び出せる数
+SLACK_RATE_BURST: int = 3
+
+# 429を受けた際に下げられる送信レートの下限(上限に対する割合)
+SLACK_RATE_MIN_RATIO: float = 0.05
+
+# 成功ごとに戻す送信レート(上限に対する割合)
+SLACK_RATE_RECOVERY_RATIO: float = 0.05
+
+# ファイルごとの送信を並行して行う数
+SLACK_DELIVERY_CONCURRENCY: int = int(
+    os.environ.get("SLACK_DELIVERY_CONCURRENCY", 4)
+)
+
+# 1件の送信の最大試行回数(初回を含む)
+SLACK_DELIVERY_ATTEMPTS: int = int(
+    os.environ.get("SLACK_DELIVERY_ATTEMPTS", 8)
+)
+
+# 1件の送信で再試行を待つ時間(Retry-After・バックオフ)の合計の上限
+# (秒, Lambdaのタイムアウトより短くする)
+SLACK_DELIVERY_MAX_WAIT_SECONDS: float = float(
+    os.environ.get("SLACK_DELIVERY_MAX_WAIT_SECONDS", 40)
+)
+
+# 一時的なエラー(5xx, 通信エラー)の再試行間隔の基準(秒)
+SLACK_DELIVERY_BACKOFF_SECONDS: float = 0.5
+
+
+class TokenBucket:
+    """
+    一定の間隔で補充されるトークンを1件の呼び出しごとに消費する
+
+    補充の間隔は429を受けると広げ(throttle)、成功すると元に戻していく(recover)
+
+    Args:
+        rate_per_minute (float): 1分あたりの補充数の上限
+        capacity (int): 溜められるトークンの上限
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: int) -> None:
+        self.max_rate: float = rate_per_minute / 60
+        self.rate: float = self.max_rate
+        self.capacity: int = capacity
+        self._tokens: float = capacity
+        self._updated_at: float = time.monotonic()
+        self._paused_until: float = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        トークンを1つ取得する(なければ補充されるまで待つ)
+
+        Returns:
+            float: 待った時間(秒)
+        """
+        waited: float = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated_at) * self.rate,
+                )
+                self._updated_at = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = max(
+                    self._paused_until - now, (1 - self._tokens) / self.rate
+                )
+            time.sleep(wait)
+            waited += wait
+
+    def throttle(self, seconds: float) -> None:
+        """
+        指定時間トークンを払い出さず(Retry-Afterに従う)、補充を遅くする
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+            self._updated_at = now
+            self.rate = max(
+                self.max_rate * SLACK_RATE_MIN_RATIO, self.rate / 2
+            )
+
+    def recover(self) -> None:
+        """
+        補充の速さを上限に向けて戻す
+        """
+        with self._lock:
+            self.rate = min(
+                self.max_rate,
+                self.rate + self.max_rate * SLACK_RATE_RECOVERY_RATIO,
+            )
+
+
+class SlackDeliveryScheduler:
+    """
+    Slack Web APIの呼び出しをメソッドごとのレート制限内で行う
+
+    - 呼び出し前にメソッドごとのトークンバケットからトークンを取得する
+    - 429を受けた場合はRetry-Afterの間そのメソッドを止めて送信レートを下げ、
+      再試行する
+    - 5xx・通信エラーは、繰り返しても結果が変わらない処理のみ間隔を空けて
+      再試行する
+    - ファイルごとの送信は上限付きの並行数で実行する
+
+    Args:
+        client (Any): slack_sdkのWebClient(429を自身で再試行しないもの)
+        rate_limits (dict[str, int]): メソッドごとの1分あたりの呼び出し上限
+        concurrency (int): ファイルごとの送信を並行して行う数
+        max_attempts (int): 1件の送信の最大試行回数
+        max_wait_seconds (float): 1件の送信で再試行を待つ時間の合計の上限(秒)
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        rate_limits: Optional[dict[str, int]] = None,
+        concurrency: int = SLACK_DELIVERY_CONCURRENCY,
+        max_attempts: int = SLACK_DELIVERY_ATTEMPTS,
+        max_wait_seconds: float = SLACK_DELIVERY_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.client = client
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.max_wait_seconds = max_wait_seconds
+        self.buckets: dict[str, TokenBucket] = {
+            method: TokenBucket(limit, min(SLACK_RATE_BURST, limit))
+            for method, limit in (rate_limits or SLACK_RATE_LIMITS).items()
+        }
+        self.stats: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def call(
+        self,
+        methods: Sequence[str],
+        func: Callable[[], T],
+        idempotent: bool = True,
+    ) -> T:
+        """
+        Slack Web APIを呼び出す処理をレート制限内で実行する
+
+        429は処理されずに拒否されたものとして常に再試行する
+        5xx・通信エラーはSlack側で処理済みの場合があるため、繰り返しても
+        結果が変わらない処理(アップロードの各段階・読み込み)のみ再試行する
+
+        Args:
+            methods (Sequence[str]): 処理の中で呼び出すメソッド名
+                (ex: files_upload_v2 は files.getUploadURLExternal と
+                files.completeUploadExternal)
+            func (Callable[[], T]): 呼び出す処理
+            idempotent (bool): 5xx・通信エラーで再試行してよい処理か
+                (chat.postMessage などはFalseとし、重複して投稿しない)
+
+        Returns:
+            T: 処理の戻り値
+        """
+        retry_wait: float = 0.0
+        for attempt in range(1, self.max_attempts + 1):
+            waited: float = sum(
+                self.buckets[method].acquire()
+                for method in methods
+                if method in self.buckets
+            )
+            self._count("waited_seconds", waited)
+            self._count("calls")
+            try:
+                result = func()
+                for method in methods:
+                    if method in self.buckets:
+                        self.buckets[method].recover()
+                return result
+
+            except SlackApiError as err:
+                status: int = err.response.status_code
+                if status == 429:
+                    self._count("rate_limited")
+                    delay = retry_after(err.response)
+                    # 止めたメソッドの待機はトークンの取得時に行う
+                    sleep = (
+                        0.0 if self._throttle(err, methods, delay) else delay
+                    )
+                elif status >= 500 and idempotent:
+                    delay = sleep = backoff(attempt)
+                else:
+                    raise
+                error: Exception = err
+
+            except (SlackClientError, OSError) as err:
+                if not idempotent:
+                    raise
+                delay = sleep = backoff(attempt)
+                error = err
+
+            retry_wait += delay
+            if (
+                attempt == self.max_attempts
+                or retry_wait > self.max_wait_seconds
+            ):
+                raise error
+            self._count("retries")
+            time.sleep(sleep)
+
+        raise RuntimeError("unreachable")
+
+    def reset_stats(self) -> None:
+        """
+        送信の集計(呼び出し数・429の数・再試行数・待った時間)を0に戻す
+
+        スケジューラはコンテナ内で共有されるため、呼び出しごとの集計を
+        出力する場合は関数の開始時に戻す
+        """
+        with self._lock:
+            self.stats = {
+                "calls": 0,
+                "rate_limited": 0,
+                "retries": 0,
+                "waited_seconds": 0.0,
+            }
+
+    def map(self, func: Callable[[Any], T], items: Sequence[Any]) -> list[T]:
+        """
+        各要素の送信を上限付きの並行数で実行する
+
+        全ての送信が終わってから、失敗した送信があれば最初の例外を送出する
+
+        Returns:
+            list[T]: 要素の順に並べた戻り値
+        """
+        if len(items) <= 1 or self.concurrency <= 1:
+            return [func(item) for item in items]
+
+        workers = min(self.concurrency, len(items))
+        with ThreadPoolExecutor(workers) as executor:
+            futures = [executor.submit(func, item) for item in items]
+        errors = [f.exception() for f in futures if f.exception()]
+        if errors:
+            raise errors[0]
+        return [f.result() for f in futures]
+
+    def _throttle(
+        self, err: SlackApiError, methods: Sequence[str], delay: float
+    ) -> bool:
+        """
+        429を返したメソッドのトークンの払い出しを止め、送信レートを下げる
+
+        Returns:
+            bool: トークンバケットを止めた場合True
+        """
+        method: str = (err.response.api_url or "").rsplit("/", 1)[-1]
+        targets = [method] if method in self.buckets else list(methods)
+        paused = False
+        for target in targets:
+            if target in self.buckets:
+                self.buckets[target].throttle(delay)
+                paused = True
+        return paused
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+
+def retry_after(response: Any) -> float:
+    """
+    429の応答から再試行までの秒数(Retry-After)を取得する
+    """
+    for key, value in (response.headers or {}).items():
+        if key.lower() == "retry-after":
+            value = value[0] if isinstance(value, list) else value
+            return float(value) + random.random()
+    return 1 + random.random()
+
+
+def backoff(attempt: int) -> float:
+    """
+    一時的なエラーの再試行までの秒数(指数バックオフ, ジッター付き)
+    """
+    return (
+        SLACK_DELIVERY_BACKOFF_SECONDS
+        * 2 ** (attempt - 1)
+        * (0.5 + random.random())
+    )
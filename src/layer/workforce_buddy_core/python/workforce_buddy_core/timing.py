@@ -0,0 +1,19 @@
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+
+@contextmanager
+def measure(timings: dict[str, float], stage: str) -> Iterator[None]:
+    """
+    処理時間を計測し、ステージ名をキーに記録する
+
+    Args:
+        timings (dict[str, float]): 処理時間(秒)の記録先
+        stage (str): ステージ名
+    """
+    start: float = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round(time.perf_counter() - start, 3)
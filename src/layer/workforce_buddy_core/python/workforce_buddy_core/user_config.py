@@ -0,0 +1,60 @@
+"""
+ユーザ設定(UserConfig#)の取得
+
+CreateWorkSchedule・RunWorkSchedule・CreateTeamReportで共通して使用する
+"""
+
+from typing import Optional
+
+from workforce_buddy_core.clients import get_client
+from workforce_buddy_core.errors import WorkforceBuddyException
+from workforce_buddy_core.log import get_logger
+
+logger = get_logger(__name__)
+
+# 最新のユーザ設定の項目のソートキー
+# 最新の版の内容に、版のソートキー(version_sk)・バージョン(version)・
+# テンプレートごとのユーザ一覧(InvertedIndex)のキーを加えた項目
+# 版(UserConfig#<作成日時>)と同じトランザクションで書き込む
+USER_CONFIG_LATEST_SK: str = "UserConfig#LATEST"
+
+
+def get_latest_user_config(table_name: str, user_id: str) -> Optional[dict]:
+    """
+    最新のユーザ設定(UserConfig#LATEST)を1回のGetItemで取得する
+
+    UserConfig#LATEST がない(移行前の)ユーザは、最新の版を1件だけ取得する
+
+    Args:
+        table_name (str): テーブル名
+        user_id (str): 社員番号
+
+    Returns:
+        Optional[dict]: DynamoDB形式のユーザ設定(存在しない場合はNone)
+    """
+    dynamodb = get_client("dynamodb")
+    try:
+        item: Optional[dict] = dynamodb.get_item(
+            TableName=table_name,
+            Key={"id": {"S": user_id}, "SK": {"S": USER_CONFIG_LATEST_SK}},
+        ).get("Item")
+        if item is None:
+            items: list[dict] = dynamodb.query(
+                TableName=table_name,
+                KeyConditionExpression="id = :id AND begins_with(SK, :sk)",
+                ExpressionAttributeValues={
+                    ":id": {"S": user_id},
+                    ":sk": {"S": "UserConfig#"},
+                },
+                ScanIndexForward=False,
+                Limit=1,
+            )["Items"]
+            item = items[0] if items else None
+
+    except Exception as err:
+        logger.error(
+            "ユーザ設定の取得に失敗しました", user_id=user_id, error=err
+        )
+        raise WorkforceBuddyException
+
+    return item
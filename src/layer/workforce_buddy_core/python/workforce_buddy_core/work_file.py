@@ -0,0 +1,163 @@
+"""
+勤務データファイル(勤怠システムのエクスポート)の形式
+
+Shift-JISのタブ区切りで、1行目が見出し行、2行目以降が勤務データとなる
+GetWorkData(ダウンロード中の検証)とStoreWorkData(読み込み)で共通して使用する
+
+見出し行の文言は既定では照合せず、列数と文字コードのみを検証する
+(実際のエクスポートの見出しを環境変数WORK_FILE_LABELSに指定した場合のみ照合する)
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Optional
+
+# 読み込み後の項目名(ファイルの列の順)
+WORK_FILE_FIELDS: list[str] = [
+    "id",
+    "name",
+    "date",
+    "work_num",
+    "date_code",
+    "date_type",
+    "work_code",
+    "work_type",
+    "start_time",
+    "end_time",
+    "start_time_round",
+    "end_time_round",
+    "break_hours",
+    "work_hours",
+    "night_hours",
+    "memo",
+    "approver",
+    "approval_datetime",
+    "second_approver",
+    "second_approval_datetime",
+    "third_approver",
+    "third_approval_datetime",
+]
+
+# 照合する見出し行の各列の見出し(JSONの配列, 未指定の場合は照合しない)
+WORK_FILE_LABELS: Optional[list[str]] = json.loads(
+    os.environ.get("WORK_FILE_LABELS") or "null"
+)
+if WORK_FILE_LABELS is not None and len(WORK_FILE_LABELS) != len(
+    WORK_FILE_FIELDS
+):
+    raise ValueError(
+        f"WORK_FILE_LABELS must have {len(WORK_FILE_FIELDS)} labels"
+    )
+
+# 勤務データファイルの文字コード
+WORK_FILE_ENCODING: str = "shift_jis"
+
+# 勤務データファイルの区切り文字
+WORK_FILE_DELIMITER: str = "\t"
+
+
+def split_work_file_line(line: bytes) -> tuple[Optional[list[str]], str]:
+    """
+    勤務データファイルの1行を列に分割する
+
+    Args:
+        line (bytes): 1行(改行を含まない)
+
+    Returns:
+        tuple[Optional[list[str]], str]:
+            各列の値と、分割できない場合の理由(分割できた場合は空文字)
+    """
+    try:
+        values: list[str] = (
+            line.rstrip(b"\r")
+            .decode(WORK_FILE_ENCODING)
+            .split(WORK_FILE_DELIMITER)
+        )
+    except UnicodeDecodeError:
+        return None, "文字コードがShift-JISではありません"
+
+    if len(values) != len(WORK_FILE_FIELDS):
+        return None, f"列数が勤務データと一致しません({len(values)}列)"
+
+    return values, ""
+
+
+def check_work_file_header(header: bytes) -> Optional[str]:
+    """
+    見出し行が勤務データファイルのものかを検証する
+
+    列数と文字コードを検証し、WORK_FILE_LABELSを指定した場合は見出しも照合する
+
+    Args:
+        header (bytes): 見出し行(改行を含まない)
+
+    Returns:
+        Optional[str]: 勤務データファイルではない理由(一致する場合はNone)
+    """
+    labels, reason = split_work_file_line(header)
+    if labels is None:
+        return reason
+
+    if WORK_FILE_LABELS is not None:
+        for i, (label, expected) in enumerate(zip(labels, WORK_FILE_LABELS)):
+            if label.strip() != expected:
+                return (
+                    f"{i + 1}列目の見出しが勤務データと一致しません({label})"
+                )
+
+    return None
+
+
+def check_work_file_row(row: bytes) -> Optional[str]:
+    """
+    勤務データの行(見出し行の次の行)を読み込めるかを検証する
+
+    StoreWorkDataでの読み込みに必要な項目(社員番号・日付・勤務番号・時刻)を
+    検証する
+
+    Args:
+        row (bytes): 勤務データの行(改行を含まない)
+
+    Returns:
+        Optional[str]: 読み込めない理由(読み込める場合はNone)
+    """
+    values, reason = split_work_file_line(row)
+    if values is None:
+        return f"勤務データの行: {reason}"
+    fields: dict[str, str] = dict(zip(WORK_FILE_FIELDS, values))
+
+    if not fields["id"] or not fields["work_num"]:
+        return "勤務データの行に社員番号・勤務番号がありません"
+
+    try:
+        datetime.strptime(fields["date"], "%Y%m%d")
+    except ValueError:
+        return f"日付を読み込めません({fields['date']})"
+
+    for name in ["start_time", "end_time"]:
+        value: str = fields[name]
+        hours, _, minutes = value.partition(":")
+        if value and not (hours.isdigit() and minutes.isdigit()):
+            return f"時刻を読み込めません({value})"
+
+    return None
+
+
+def get_work_file_user_ids(content: bytes) -> set[str]:
+    """
+    勤務データファイルに含まれる社員番号を取得する
+
+    Args:
+        content (bytes): 勤務データファイル(見出し行・最初の行は検証済み)
+
+    Returns:
+        set[str]: 社員番号
+    """
+    user_ids: set[str] = set()
+    for line in content.split(b"\n")[1:]:
+        values, _ = split_work_file_line(line)
+        if values is not None and values[0]:
+            user_ids.add(values[0])
+
+    return user_ids
@@ -0,0 +1,428 @@
+"""
+過去の勤務データファイル(勤怠システムのエクスポート)をまとめて取り込む
+
+ファイルの読み込み・変換(store_work_data.load_work_data, convert_work_data)は
+プロセスプールで並行して行い、DynamoDBへの書き込みは社員・勤務月ごとに
+並行して行う
+取り込みが完了したファイルはチェックポイントに記録し、中断した場合は
+同じコマンドで再開できる(記録済みのファイルは読み飛ばす)
+
+    python -m tools.backfill.backfill_work_data --source ./exports \\
+        --table WorkScheduleTable
+    python -m tools.backfill.backfill_work_data \\
+        --source s3://workschedule-bucket/exports/ --table WorkScheduleTable \\
+        --render --render-function CreateWorkSchedule
+    # motoとSlackのスタンドイン上で、生成したエクスポートを取り込む
+    python -m tools.backfill.backfill_work_data --local --sample-users 20 \\
+        --sample-years 2 --render
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+import warnings
+from collections import deque
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from pathlib import Path
+from typing import Any, Optional
+
+from tools.backfill.sources import (
+    ExportFile,
+    list_export_files,
+    read_export_file,
+)
+from tools.backfill.writer import Checkpoint, KeyedParallelWriter, Progress
+from tools.local_pipeline.pipeline import (
+    add_lambda_paths,
+    make_sample_work_file,
+)
+
+
+def init_parser() -> None:
+    """
+    ファイルを変換するプロセスの初期化
+    """
+    add_lambda_paths()
+    # 勤務データの変換で大量に出力されるpandasの警告は表示しない
+    from pandas.errors import SettingWithCopyWarning
+
+    warnings.simplefilter("ignore", SettingWithCopyWarning)
+
+
+def parse_export(content: bytes) -> tuple[list[dict], float]:
+    """
+    勤務データファイルをDBへ登録する形へ変換する(プロセスプールで実行する)
+
+    Returns:
+        tuple[list[dict], float]: 登録する勤務データのリスト, 変換にかかった時間(秒)
+    """
+    store_work_data = importlib.import_module(
+        "store_work_data.store_work_data"
+    )
+    start = time.perf_counter()
+    _, rows = store_work_data.parse_work_file(content)
+    return rows, time.perf_counter() - start
+
+
+def backfill(
+    files: list[ExportFile],
+    checkpoint: Checkpoint,
+    s3: Any,
+    processes: int,
+    writers: int,
+) -> tuple[Progress, dict[str, set[str]], list]:
+    """
+    勤務データファイルを読み込み・変換し、DynamoDBへ書き込む
+
+    ファイルの変換はファイルの順に受け取り、書き込みを受け付ける
+    (同じ社員・勤務日のデータは後のファイルが優先される)
+
+    Args:
+        files (list[ExportFile]): 取り込むファイル(取り込み済みのものを除く)
+        checkpoint (Checkpoint): チェックポイント
+        s3 (Any): S3クライアント
+        processes (int): ファイルを変換するプロセス数
+        writers (int): 並行して書き込むスレッド数
+
+    Returns:
+        tuple[Progress, dict[str, set[str]], list]:
+            進捗, 社員ごとの書き込んだ勤務月, 書き込みのエラー
+    """
+    store_work_data = importlib.import_module(
+        "store_work_data.store_work_data"
+    )
+    progress = Progress(len(files))
+    written_months: dict[str, set[str]] = {}
+    writer = KeyedParallelWriter(
+        store_work_data.store_work_data, writers, max_pending=writers * 4
+    )
+    window_size: int = processes * 2
+    lock = threading.Lock()
+
+    # 読み込み・書き込みのスレッドを持つプロセスをforkしないようにspawnする
+    with ProcessPoolExecutor(
+        processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_parser,
+    ) as parse_pool, ThreadPoolExecutor(
+        window_size, thread_name_prefix="BackfillReader"
+    ) as read_pool:
+
+        def read_and_parse(file: ExportFile) -> tuple[list[dict], float]:
+            content: bytes = read_export_file(file, s3)
+            return parse_pool.submit(parse_export, content).result()
+
+        def accept(file: ExportFile, future: Future) -> None:
+            try:
+                rows, parse_seconds = future.result()
+            except Exception as err:
+                print(f"failed to parse {file.uri}: {err!r}")
+                progress.add(files_failed=1)
+                return
+            progress.add(rows_parsed=len(rows), parse_seconds=parse_seconds)
+            submit_rows(file, rows)
+
+        def submit_rows(file: ExportFile, rows: list[dict]) -> None:
+            chunks: dict[tuple[str, str], list[dict]] = {}
+            for row in rows:
+                key = (row["id"], store_work_data.get_work_month(row["SK"]))
+                chunks.setdefault(key, []).append(row)
+                written_months.setdefault(key[0], set()).add(key[1])
+            if not chunks:
+                checkpoint.record(file, 0)
+                progress.add(files_done=1)
+                return
+
+            # 全ての社員・勤務月を書き込めたらファイルの完了を記録する
+            state = {"remaining": len(chunks), "failed": False}
+
+            def on_done(ok: bool) -> None:
+                with lock:
+                    state["remaining"] -= 1
+                    state["failed"] = state["failed"] or not ok
+                    finished = state["remaining"] == 0
+                if not finished:
+                    return
+                if state["failed"]:
+                    progress.add(files_failed=1)
+                else:
+                    checkpoint.record(file, len(rows))
+                    progress.add(files_done=1)
+
+            for key, chunk in chunks.items():
+                writer.submit(key, chunk, on_done)
+
+        window: deque[tuple[ExportFile, Future]] = deque()
+        for file in files:
+            window.append((file, read_pool.submit(read_and_parse, file)))
+            if len(window) >= window_size:
+                accept(*window.popleft())
+        while window:
+            accept(*window.popleft())
+
+    writer.join()
+    writer.shutdown()
+    progress.rows_written = writer.rows_written
+    return progress, written_months, writer.errors
+
+
+def render_work_schedules(
+    lambda_client: Any,
+    function_name: str,
+    table_name: str,
+    written_months: dict[str, set[str]],
+    concurrency: int,
+) -> tuple[int, list[tuple[str, str, str]]]:
+    """
+    書き込んだ社員・勤務月の勤務表をCreateWorkScheduleで作成する
+
+    ユーザ設定がない社員はデフォルト設定から作成する(WorkScheduleMakerと同じ)
+
+    Returns:
+        tuple[int, list[tuple[str, str, str]]]:
+            作成した勤務表の数, 作成に失敗した社員・勤務月とエラー
+    """
+    run_work_schedule = importlib.import_module(
+        "run_work_schedule.run_work_schedule"
+    )
+    core = importlib.import_module("workforce_buddy_core")
+
+    payloads: list[tuple[str, str, dict]] = []
+    for user_id, months in sorted(written_months.items()):
+        user_config: dict = run_work_schedule.get_user_config(
+            table_name, user_id
+        )
+        template_item: dict = run_work_schedule.get_template_config(
+            table_name,
+            core.decode_item(user_config)["template_id"],
+        )
+        for work_month in sorted(months):
+            payloads.append(
+                (
+                    user_id,
+                    work_month,
+                    {
+                        "work_months": work_month,
+                        # 最新の版(移行前の設定は項目自身)のキー
+                        "user_config_key": {
+                            "id": user_config["id"]["S"],
+                            "SK": user_config.get(
+                                "version_sk", user_config["SK"]
+                            )["S"],
+                        },
+                        "template_ref": {
+                            key: template_item[key]
+                            for key in ("id", "version")
+                            if key in template_item
+                        },
+                    },
+                )
+            )
+
+    def render(payload: dict) -> None:
+        res = lambda_client.invoke(
+            FunctionName=function_name,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(payload),
+        )
+        if res.get("FunctionError"):
+            raise RuntimeError(res["Payload"].read().decode())
+
+    errors: list[tuple[str, str, str]] = []
+    with ThreadPoolExecutor(concurrency) as executor:
+        futures = [
+            (user_id, work_month, executor.submit(render, payload))
+            for user_id, work_month, payload in payloads
+        ]
+    for user_id, work_month, future in futures:
+        if future.exception():
+            errors.append((user_id, work_month, repr(future.exception())))
+
+    return len(payloads) - len(errors), errors
+
+
+def put_sample_exports(
+    s3: Any, bucket: str, prefix: str, users: int, years: int
+) -> str:
+    """
+    社員ごと・年ごとの勤務データファイルを生成し、S3へ格納する
+
+    Returns:
+        str: 格納先(s3://バケット/プレフィックス)
+    """
+    first_year: int = 2024 - years
+    for n in range(users):
+        user_id = f"{9000000 + n:07}"
+        for year in range(first_year, first_year + years):
+            lines: list[bytes] = []
+            for month in range(1, 13):
+                file = make_sample_work_file(
+                    user_id, f"取込 {n}", f"{year}-{month:02}"
+                ).splitlines(keepends=True)
+                lines.extend(file if not lines else file[1:])
+            s3.put_object(
+                Bucket=bucket,
+                Key=f"{prefix}{year}/{user_id}.tsv",
+                Body=b"".join(lines),
+            )
+    return f"s3://{bucket}/{prefix}"
+
+
+def run(
+    args: argparse.Namespace, s3: Any, lambda_client: Optional[Any]
+) -> None:
+    """
+    取り込みを実行し、結果を表示する
+    """
+    os.environ["TABLE_NAME"] = args.table
+    add_lambda_paths()
+    init_parser()
+
+    checkpoint = Checkpoint(args.checkpoint)
+    all_files: list[ExportFile] = list_export_files(
+        args.source, args.pattern, s3
+    )
+    files = [f for f in all_files if not checkpoint.done(f)]
+    imported: int = len(all_files) - len(files)
+    if args.max_files is not None:
+        files = files[: args.max_files]
+    print(
+        f"{len(all_files)} files, {imported} already imported, "
+        f"importing {len(files)} "
+        f"({args.processes} processes, {args.writers} writers)"
+    )
+
+    progress, written_months, errors = backfill(
+        files, checkpoint, s3, args.processes, args.writers
+    )
+    elapsed = progress.elapsed
+    user_months = sum(len(months) for months in written_months.values())
+    print(
+        f"files: {progress.files_done} imported, {progress.files_failed} failed"
+    )
+    parse_rate = progress.rows_parsed / max(progress.parse_seconds, 1e-9)
+    print(
+        f"rows: {progress.rows_written} written ({user_months} user-months) "
+        f"in {elapsed:.1f}s, {progress.rows_written / max(elapsed, 1e-9):.0f}"
+        f" rows/s (parse {parse_rate:.0f} rows/s per process)"
+    )
+    for key, err in errors[:10]:
+        print(f"write error {key}: {err!r}")
+
+    if args.render and lambda_client is not None:
+        start = time.perf_counter()
+        rendered, render_errors = render_work_schedules(
+            lambda_client,
+            args.render_function,
+            args.table,
+            written_months,
+            args.render_concurrency,
+        )
+        render_elapsed = time.perf_counter() - start
+        print(
+            f"rendered: {rendered} work schedules in {render_elapsed:.1f}s, "
+            f"{len(render_errors)} failed"
+        )
+        for user_id, work_month, err in render_errors[:10]:
+            print(f"render error {user_id} {work_month}: {err}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--source", help="ディレクトリ、またはs3://バケット/プレフィックス"
+    )
+    parser.add_argument(
+        "--pattern", default="*.tsv", help="ファイル名のパターン"
+    )
+    parser.add_argument("--table", help="DynamoDBのテーブル名")
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        help="チェックポイントファイル(ex: backfill.checkpoint.jsonl)",
+    )
+    parser.add_argument(
+        "--max-files", type=int, help="1回の実行で取り込むファイル数の上限"
+    )
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="取り込んだ勤務月の勤務表を作成する",
+    )
+    parser.add_argument("--render-function", default="CreateWorkSchedule")
+    parser.add_argument("--render-concurrency", type=int, default=10)
+    parser.add_argument(
+        "--local",
+        action="store_true",
+        help="motoとSlackのスタンドイン上で実行する",
+    )
+    parser.add_argument(
+        "--sample-users",
+        type=int,
+        default=0,
+        help="生成してS3へ格納する社員数(--localのみ)",
+    )
+    parser.add_argument(
+        "--sample-years",
+        type=int,
+        default=2,
+        help="生成する年数(社員ごと・年ごとに1ファイル)",
+    )
+    args = parser.parse_args()
+
+    if not args.local:
+        if not args.source or not args.table:
+            parser.error("--source and --table are required")
+        import boto3
+
+        run(args, boto3.client("s3"), boto3.client("lambda"))
+        return
+
+    from tools.load_test.harness import (
+        LocalLambdaService,
+        light_transaction_snapshots,
+        serialize_moto,
+    )
+    from tools.local_pipeline.pipeline import (
+        BUCKET_NAME,
+        TABLE_NAME,
+        LocalPipeline,
+    )
+
+    with serialize_moto(), light_transaction_snapshots():
+        with LocalPipeline() as pipeline:
+            import boto3
+
+            s3 = boto3.client("s3")
+            args.table = TABLE_NAME
+            if args.sample_users:
+                args.source = put_sample_exports(
+                    s3,
+                    BUCKET_NAME,
+                    "exports/",
+                    args.sample_users,
+                    args.sample_years,
+                )
+            if not args.source:
+                parser.error("--source or --sample-users is required")
+            lambda_service = LocalLambdaService(
+                pipeline.functions, args.render_concurrency
+            )
+            try:
+                run(args, s3, lambda_service)
+            finally:
+                lambda_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
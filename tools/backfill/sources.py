@@ -0,0 +1,85 @@
+"""
+取り込む勤務データファイル(過去の勤怠システムのエクスポート)の一覧と読み込み
+
+ローカルのディレクトリ、またはS3のプレフィックス(s3://バケット/プレフィックス)
+を指定する
+"""
+
+import fnmatch
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+
+@dataclass(frozen=True)
+class ExportFile:
+    """
+    取り込む勤務データファイル
+
+    Attributes:
+        uri (str): ファイルの場所(ローカルのパス、またはs3://バケット/キー)
+        version (str): ファイルの版(ローカルはサイズと更新日時、S3はETag)
+            チェックポイントで取り込み済みかを判定する際に使用する
+    """
+
+    uri: str
+    version: str
+
+
+def list_export_files(
+    source: str, pattern: str = "*.tsv", s3: Any = None
+) -> list[ExportFile]:
+    """
+    取り込む勤務データファイルを名前順に列挙する
+
+    同じ社員・勤務日のデータを含むファイルは後のものを優先するため、
+    エクスポートの日付順に並ぶ名前を付けておく
+
+    Args:
+        source (str): ディレクトリ、またはs3://バケット/プレフィックス
+        pattern (str): ファイル名のパターン
+        s3 (Any): S3クライアント(S3を指定した場合のみ使用)
+
+    Returns:
+        list[ExportFile]: 勤務データファイルのリスト
+    """
+    if source.startswith("s3://"):
+        return sorted(_list_s3_files(source, pattern, s3), key=lambda f: f.uri)
+
+    files: list[ExportFile] = []
+    for path in Path(source).rglob(pattern):
+        if path.is_file():
+            stat = path.stat()
+            files.append(
+                ExportFile(str(path), f"{stat.st_size}-{stat.st_mtime_ns}")
+            )
+    return sorted(files, key=lambda f: f.uri)
+
+
+def _list_s3_files(source: str, pattern: str, s3: Any) -> Iterator[ExportFile]:
+    bucket, prefix = split_s3_uri(source)
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if fnmatch.fnmatch(obj["Key"].rsplit("/", 1)[-1], pattern):
+                yield ExportFile(
+                    f"s3://{bucket}/{obj['Key']}", obj["ETag"].strip('"')
+                )
+
+
+def read_export_file(file: ExportFile, s3: Any = None) -> bytes:
+    """
+    勤務データファイルを読み込む
+    """
+    if file.uri.startswith("s3://"):
+        bucket, key = split_s3_uri(file.uri)
+        return s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+    return Path(file.uri).read_bytes()
+
+
+def split_s3_uri(uri: str) -> tuple[str, str]:
+    """
+    s3://バケット/キー をバケットとキーに分ける
+    """
+    bucket, _, key = uri[len("s3://") :].partition("/")
+    return bucket, key
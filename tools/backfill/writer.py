@@ -0,0 +1,179 @@
+"""
+勤務データを並行してDynamoDBへ書き込むライタと、取り込みのチェックポイント
+
+書き込みはstore_work_data.store_work_dataを社員・勤務月ごとに呼び出す
+(勤務データと月次集計を同じトランザクションで書き込み、登録済みの内容との
+差分だけを集計に加算するため、同じファイルを再び取り込んでも集計は変わらない)
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+from tools.backfill.sources import ExportFile
+
+
+class Checkpoint:
+    """
+    取り込みが完了したファイルを1行ずつ記録するファイル(JSON Lines)
+
+    中断した取り込みを再開する際は、記録済みのファイル(場所と版が一致する
+    もの)を読み飛ばす
+    途中まで書き込んだファイルは記録されないため、再開時にもう一度取り込む
+
+    Args:
+        path (Optional[Path]): チェックポイントファイル(Noneの場合は記録しない)
+    """
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self.completed: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        if path is not None and path.exists():
+            for line in path.read_text().splitlines():
+                if line.strip():
+                    entry: dict = json.loads(line)
+                    self.completed.add((entry["uri"], entry["version"]))
+
+    def done(self, file: ExportFile) -> bool:
+        return (file.uri, file.version) in self.completed
+
+    def record(self, file: ExportFile, rows: int) -> None:
+        """
+        ファイルの取り込みの完了を記録する(書き込むごとにディスクへ反映する)
+        """
+        with self._lock:
+            self.completed.add((file.uri, file.version))
+            if self.path is None:
+                return
+            entry = {"uri": file.uri, "version": file.version, "rows": rows}
+            with self.path.open("a") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class KeyedParallelWriter:
+    """
+    キー(社員・勤務月)ごとの書き込みを並行して行う
+
+    異なるキーは並行して書き込み、同じキーの書き込みは受け付けた順に行う
+    (同じ社員・勤務日のデータを含むファイルは、後のファイルが優先される)
+
+    Args:
+        write (Callable[[list[dict]], None]): 同じキーの勤務データを書き込む処理
+        workers (int): 並行して書き込むスレッド数
+        max_pending (int): 書き込み待ちの上限(超えると受け付けを待たせる)
+    """
+
+    def __init__(
+        self,
+        write: Callable[[list[dict]], None],
+        workers: int,
+        max_pending: int,
+    ) -> None:
+        self.write = write
+        self.rows_written: int = 0
+        self.errors: list[tuple[tuple[str, str], Exception]] = []
+        self._executor = ThreadPoolExecutor(
+            workers, thread_name_prefix="BackfillWriter"
+        )
+        self._queues: dict[tuple[str, str], deque] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: int = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def submit(
+        self,
+        key: tuple[str, str],
+        rows: list[dict],
+        on_done: Callable[[bool], None],
+    ) -> None:
+        """
+        書き込みを受け付ける
+
+        Args:
+            key (tuple[str, str]): 社員番号と勤務月
+            rows (list[dict]): 書き込む勤務データ
+            on_done (Callable[[bool], None]): 書き込み後に呼び出す処理
+                (成功した場合True)
+        """
+        self._slots.acquire()
+        with self._lock:
+            self._pending += 1
+            queue = self._queues.get(key)
+            if queue is not None:
+                # 同じキーの書き込み中であれば、その後に続けて書き込む
+                queue.append((rows, on_done))
+                return
+            self._queues[key] = deque([(rows, on_done)])
+        self._executor.submit(self._drain, key)
+
+    def join(self) -> None:
+        """
+        受け付けた書き込みが全て終わるまで待つ
+        """
+        with self._idle:
+            while self._pending:
+                self._idle.wait()
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+    def _drain(self, key: tuple[str, str]) -> None:
+        while True:
+            with self._lock:
+                queue = self._queues[key]
+                if not queue:
+                    del self._queues[key]
+                    return
+                rows, on_done = queue[0]
+
+            ok = True
+            try:
+                self.write(rows)
+            except Exception as err:
+                ok = False
+                with self._lock:
+                    self.errors.append((key, err))
+
+            with self._lock:
+                queue.popleft()
+                if ok:
+                    self.rows_written += len(rows)
+            on_done(ok)
+            self._slots.release()
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+
+class Progress:
+    """
+    取り込みの進捗(ファイル数・行数・経過時間)を集計する
+    """
+
+    def __init__(self, total_files: int) -> None:
+        self.total_files = total_files
+        self.files_done: int = 0
+        self.files_failed: int = 0
+        self.rows_parsed: int = 0
+        self.rows_written: int = 0
+        self.parse_seconds: float = 0.0
+        self.started_at: float = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, **values: float) -> None:
+        with self._lock:
+            for key, value in values.items():
+                setattr(self, key, getattr(self, key) + value)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
@@ -0,0 +1,281 @@
+"""
+Slackの再送・重複イベントで勤務表の作成が重複しないことの確認
+
+ユーザごとに1件の勤務データをアップロードし、file_sharedイベントを以下のように
+重複して handle_workforce_buddy へ送る
+
+- 初回の配信と同時に、応答の遅れによるSlackの再送(同じイベントID)を送る
+- 同じファイルについて、異なるイベントIDのイベントを送る
+- 先頭の数件は勤務表作成の開始(ステートマシン・RunWorkSchedule)を失敗させ、
+  Lazy Listenerの非同期呼び出しの再試行で処理し直させる
+
+ファイルごとの勤務表作成の開始回数と、送信された勤務表の件数がそれぞれ1件で
+あることを確認する
+
+    python -m tools.load_test.check_duplicate_events --users 20
+    python -m tools.load_test.check_duplicate_events --users 20 --route runner
+"""
+
+import argparse
+import importlib
+import json
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from tools.load_test.harness import (
+    LocalAsyncStepFunctionsClient,
+    LocalLambdaService,
+    TooManyRequestsException,
+    make_file_shared_body,
+    make_function_url_event,
+    serialize_moto,
+)
+from tools.load_test.upload_burst import COMPLETED_TEXT, MENTION_PATTERN
+from tools.local_pipeline.pipeline import (
+    SLACK_SIGNING_SECRET,
+    LocalPipeline,
+    make_sample_work_file,
+)
+
+# 勤務表作成を開始するLambda関数
+RUNNER_NAME: str = "RunWorkSchedule"
+
+
+class FlakyStarts:
+    """
+    勤務表作成の開始を記録し、先頭の指定件数を失敗させる
+
+    Args:
+        failures (int): 失敗させる件数
+    """
+
+    def __init__(self, failures: int) -> None:
+        self.failures = failures
+        self.failed = 0
+        self.started: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def start(self, req: dict) -> None:
+        with self._lock:
+            if self.failed < self.failures:
+                self.failed += 1
+                raise RuntimeError("ThrottlingException")
+            file_id: str = req["slack_info"]["file_id"]
+            self.started[file_id] = self.started.get(file_id, 0) + 1
+
+
+class FlakyStepFunctionsClient:
+    """
+    start_executionの開始を記録・失敗させるStep Functionsクライアント
+    """
+
+    def __init__(
+        self, client: LocalAsyncStepFunctionsClient, starts: FlakyStarts
+    ) -> None:
+        self.client = client
+        self.starts = starts
+
+    def start_execution(self, stateMachineArn: str, input: str) -> dict:
+        self.starts.start(json.loads(input))
+        return self.client.start_execution(
+            stateMachineArn=stateMachineArn, input=input
+        )
+
+
+class FlakyLambdaClient:
+    """
+    RunWorkScheduleの呼び出しを記録・失敗させるLambdaクライアント
+    (Lazy Listenerの呼び出しはそのまま処理する)
+    """
+
+    def __init__(
+        self, service: LocalLambdaService, starts: FlakyStarts
+    ) -> None:
+        self.service = service
+        self.starts = starts
+
+    def invoke(self, FunctionName: str, **kwargs: Any) -> dict:
+        if FunctionName.rsplit(":", 1)[-1] == RUNNER_NAME:
+            self.starts.start(json.loads(kwargs["Payload"]))
+        return self.service.invoke(FunctionName=FunctionName, **kwargs)
+
+
+def run(pipeline: LocalPipeline, args: argparse.Namespace) -> dict:
+    core = importlib.import_module("workforce_buddy_core")
+    handler = importlib.import_module(
+        "handle_workforce_buddy.handle_workforce_buddy"
+    )
+
+    functions = dict(pipeline.functions)
+    functions["HandleWorkforceBuddy"] = handler.lambda_handler
+    lambda_service = LocalLambdaService(
+        functions, args.concurrency, retry_delay=args.async_retry_delay
+    )
+    for name in list(pipeline.functions):
+        pipeline.functions[name] = (
+            lambda event, context, name=name: lambda_service.call(name, event)
+        )
+    step_functions = LocalAsyncStepFunctionsClient(pipeline.execute)
+    starts = FlakyStarts(args.fail_starts)
+    core.register_client("lambda", FlakyLambdaClient(lambda_service, starts))
+    core.register_client(
+        "stepfunctions", FlakyStepFunctionsClient(step_functions, starts)
+    )
+    if args.route == "runner":
+        os.environ["WORKSCHEDULE_RUNNER_KEY"] = RUNNER_NAME
+
+    # ユーザごとのファイルと、重複して送るイベント(イベントID, 再送回数)
+    deliveries: list[tuple[str, int]] = []
+    file_users: dict[str, str] = {}
+    for n in range(1, args.users + 1):
+        user_id = f"U{n:06}"
+        file_id = pipeline.slack.add_file(
+            f"work_data_{n}.tsv",
+            make_sample_work_file(
+                f"{1000000 + n}", f"重複 {n}", args.work_month
+            ),
+        )
+        file_users[file_id] = user_id
+        for event_id, retry_num in [
+            (f"Ev{n:08}", 0),
+            (f"Ev{n:08}", 1),
+            (f"Ev{n:08}", 2),
+            (f"EvDup{n:08}", 0),
+        ]:
+            body = make_file_shared_body(event_id, file_id, user_id, "C0")
+            deliveries.append((body, retry_num))
+
+    def deliver(delivery: tuple[str, int]) -> int:
+        body, retry_num = delivery
+        # スロットリングされた場合はSlackの再送として送り直す
+        while True:
+            event = make_function_url_event(
+                SLACK_SIGNING_SECRET, body, retry_num
+            )
+            try:
+                res = lambda_service.call("HandleWorkforceBuddy", event)
+                return res["statusCode"]
+            except TooManyRequestsException:
+                retry_num += 1
+                time.sleep(0.1)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as executor:
+            statuses = list(executor.map(deliver, deliveries))
+
+        deadline = time.perf_counter() + args.timeout_seconds
+        while time.perf_counter() < deadline:
+            time.sleep(0.1)
+            if lambda_service.idle() and step_functions.idle():
+                break
+        elapsed = time.perf_counter() - start
+    finally:
+        os.environ.pop("WORKSCHEDULE_RUNNER_KEY", None)
+        lambda_service.shutdown()
+        step_functions.shutdown()
+
+    completed: dict[str, int] = dict.fromkeys(file_users.values(), 0)
+    for message in pipeline.slack.state.messages:
+        text: str = message.get("text") or ""
+        if COMPLETED_TEXT not in text:
+            continue
+        for user_id in MENTION_PATTERN.findall(text):
+            if user_id in completed:
+                completed[user_id] += 1
+
+    return {
+        "elapsed": elapsed,
+        "deliveries": len(deliveries),
+        "acked": sum(status == 200 for status in statuses),
+        "starts": starts,
+        "file_users": file_users,
+        "completed": completed,
+        "lambda": lambda_service,
+        "executions": step_functions.reports,
+    }
+
+
+def print_report(result: dict, args: argparse.Namespace) -> bool:
+    starts: FlakyStarts = result["starts"]
+    file_users: dict[str, str] = result["file_users"]
+    completed: dict[str, int] = result["completed"]
+    lambda_service: LocalLambdaService = result["lambda"]
+    handler_stats = lambda_service.stats["HandleWorkforceBuddy"]
+
+    started_counts = [starts.started.get(f, 0) for f in file_users]
+    duplicated_starts = sum(count > 1 for count in started_counts)
+    missing_starts = sum(count == 0 for count in started_counts)
+    duplicated_schedules = sum(count > 1 for count in completed.values())
+    missing_schedules = sum(count == 0 for count in completed.values())
+
+    print(
+        f"{args.users} files, {result['deliveries']} deliveries "
+        f"(route={args.route}, failed starts={starts.failed}), "
+        f"elapsed {result['elapsed']:.1f}s"
+    )
+    print(f"  acknowledged          {result['acked']}/{result['deliveries']}")
+    print(
+        f"  lazy listener runs    {handler_stats.invocations} "
+        f"(errors {handler_stats.errors}, "
+        f"async retries {handler_stats.async_retries})"
+    )
+    print(f"  starts                {sum(started_counts)}")
+    print(f"  files started twice   {duplicated_starts}")
+    print(f"  files never started   {missing_starts}")
+    print(f"  executions            {len(result['executions'])}")
+    print(f"  schedules sent        {sum(completed.values())}")
+    print(f"  users sent twice      {duplicated_schedules}")
+    print(f"  users never sent      {missing_schedules}")
+
+    ok = not (
+        duplicated_starts
+        or missing_starts
+        or duplicated_schedules
+        or missing_schedules
+    )
+    print("OK" if ok else "NG")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--work-month", default="2023-07")
+    parser.add_argument(
+        "--route", choices=["statemachine", "runner"], default="statemachine"
+    )
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--fail-starts",
+        type=int,
+        default=3,
+        help="失敗させる勤務表作成の開始の件数",
+    )
+    parser.add_argument(
+        "--async-retry-delay",
+        type=float,
+        default=0.5,
+        help="Lambdaの非同期呼び出しを再試行するまでの時間(秒)",
+    )
+    parser.add_argument("--timeout-seconds", type=float, default=300)
+    args = parser.parse_args()
+
+    # 勤務表作成で大量に出力されるpandasの警告は表示しない
+    from pandas.errors import SettingWithCopyWarning
+
+    warnings.simplefilter("ignore", SettingWithCopyWarning)
+
+    with serialize_moto():
+        with LocalPipeline() as pipeline:
+            result = run(pipeline, args)
+    if not print_report(result, args):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+負荷試験用のローカル実行基盤
+
+- Lambdaの同時実行数の上限とスロットリングを模擬するLambdaクライアント
+- ステートマシンを非同期で実行するStep Functionsクライアント
+- 署名付きのSlackイベント(Function URLの形式)の生成
+- AWSの再試行回数の集計
+"""
+
+import hashlib
+import hmac
+import io
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+# LambdaのARN(関数名の前に付ける)
+FUNCTION_ARN_PREFIX: str = (
+    "arn:aws:lambda:ap-northeast-1:000000000000:function:"
+)
+
+# 非同期呼び出しの再試行回数をデフォルト(2回)から変更している関数
+# (lib/construct/workschedule/lambda.ts の retryAttempts と合わせる)
+RETRY_ATTEMPTS: dict[str, int] = {"RunWorkSchedule": 0}
+
+
+@contextmanager
+def serialize_moto() -> Iterator[None]:
+    """
+    motoのバックエンドはスレッドセーフではないため、AWSの呼び出しを1件ずつ処理する
+    """
+    from moto.core.botocore_stubber import BotocoreStubber
+
+    lock = threading.RLock()
+    original = BotocoreStubber.__call__
+
+    def locked_call(self: Any, *args: Any, **kwargs: Any) -> Any:
+        with lock:
+            return original(self, *args, **kwargs)
+
+    BotocoreStubber.__call__ = locked_call
+    try:
+        yield
+    finally:
+        BotocoreStubber.__call__ = original
+
+
+@contextmanager
+def light_transaction_snapshots() -> Iterator[None]:
+    """
+    motoのTransactWriteItemsは巻き戻しに備えて操作ごとにテーブル全体をdeepcopyし、
+    テーブルの項目数に比例して遅くなるため、項目の入れ物だけをコピーする
+    スナップショットに置き換える
+    (失敗時に追加・削除は巻き戻るが、既存の項目への更新は巻き戻らない)
+    """
+    import copy
+    import types
+    from collections import defaultdict
+
+    import moto.dynamodb.models as models
+    from moto.dynamodb.models.table import Table
+
+    def deepcopy(value: Any, *args: Any) -> Any:
+        if not isinstance(value, Table):
+            return copy.deepcopy(value, *args)
+        snapshot = copy.copy(value)
+        snapshot.items = defaultdict(dict)
+        for key, items in value.items.items():
+            snapshot.items[key] = (
+                dict(items) if isinstance(items, dict) else items
+            )
+        return snapshot
+
+    original = models.copy
+    models.copy = types.SimpleNamespace(deepcopy=deepcopy, copy=copy.copy)
+    try:
+        yield
+    finally:
+        models.copy = original
+
+
+@dataclass
+class LambdaContext:
+    """
+    Lambdaのcontextオブジェクトのうち、Slack Boltが参照する属性
+    """
+
+    function_name: str
+    invoked_function_arn: str
+    aws_request_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+
+class TooManyRequestsException(Exception):
+    """
+    同時実行数の上限による同期呼び出しのスロットリング
+    """
+
+
+@dataclass
+class FunctionStats:
+    """
+    関数ごとの呼び出し回数・スロットリング回数・エラー回数・同時実行数の最大値
+    ・非同期呼び出しの再試行回数・待ち時間(秒)
+    """
+
+    invocations: int = 0
+    throttles: int = 0
+    errors: int = 0
+    async_retries: int = 0
+    max_concurrency: int = 0
+    queued_seconds: list[float] = field(default_factory=list)
+
+
+class LocalLambdaService:
+    """
+    Lambdaの呼び出しをプロセス内で処理するクライアント
+
+    関数ごとに同時実行数の上限を持つ
+    同期呼び出しは上限に達していればスロットリングし、非同期呼び出し(Event)は
+    スロットリングとして数えたうえでキューに積み、空きを待って実行する
+    (同期・非同期の呼び出しで同じ上限を共有する)
+    非同期呼び出しがエラーになった場合は、Lambdaと同じく関数ごとの回数まで
+    同じイベントで再試行する
+
+    Args:
+        functions (dict[str, Callable]): 関数名とハンドラの対応
+        concurrency (int): 関数ごとの同時実行数の上限
+        retry_attempts (dict[str, int]): 関数ごとの非同期呼び出しの再試行回数
+            (省略した場合はRETRY_ATTEMPTS, 含まれない関数はデフォルトの2回)
+        retry_delay (float): 非同期呼び出しを再試行するまでの時間(秒)
+    """
+
+    def __init__(
+        self,
+        functions: dict[str, Callable[[dict, Any], Any]],
+        concurrency: int,
+        retry_attempts: Optional[dict[str, int]] = None,
+        retry_delay: float = 0.0,
+    ) -> None:
+        self.functions = functions
+        self.concurrency = concurrency
+        self.retry_attempts = (
+            RETRY_ATTEMPTS if retry_attempts is None else retry_attempts
+        )
+        self.retry_delay = retry_delay
+        self.stats: dict[str, FunctionStats] = {
+            name: FunctionStats() for name in functions
+        }
+        self.errors: list[tuple[str, str]] = []
+        self._active: dict[str, int] = dict.fromkeys(functions, 0)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._executors: dict[str, ThreadPoolExecutor] = {
+            name: ThreadPoolExecutor(concurrency, thread_name_prefix=name)
+            for name in functions
+        }
+        self._pending: set[Future] = set()
+
+    # --------------------------------------------------------------
+    # boto3のLambdaクライアント互換
+
+    def invoke(
+        self,
+        FunctionName: str,
+        InvocationType: str = "RequestResponse",
+        Payload: Any = b"{}",
+    ) -> dict:
+        name = FunctionName.rsplit(":", 1)[-1]
+        event = json.loads(Payload)
+        if InvocationType == "Event":
+            self.submit(name, event)
+            return {"StatusCode": 202}
+
+        result = self.call(name, event)
+        return {
+            "StatusCode": 200,
+            "Payload": io.BytesIO(json.dumps(result).encode()),
+        }
+
+    # --------------------------------------------------------------
+    # 呼び出し
+
+    def call(self, name: str, event: dict) -> Any:
+        """
+        同期呼び出し(同時実行数が上限に達していればスロットリング)
+        """
+        with self._lock:
+            if self._active[name] >= self.concurrency:
+                self.stats[name].throttles += 1
+                raise TooManyRequestsException(name)
+            self._enter(name)
+        return self._run(name, event)
+
+    def submit(self, name: str, event: dict) -> None:
+        """
+        非同期呼び出し(Event)
+        """
+        queued_at = time.perf_counter()
+        with self._lock:
+            if self._active[name] >= self.concurrency:
+                self.stats[name].throttles += 1
+
+        def run() -> None:
+            for attempt in range(self.retry_attempts.get(name, 2) + 1):
+                if attempt:
+                    time.sleep(self.retry_delay)
+                    with self._lock:
+                        self.stats[name].async_retries += 1
+                with self._released:
+                    while self._active[name] >= self.concurrency:
+                        self._released.wait()
+                    self._enter(name)
+                    self.stats[name].queued_seconds.append(
+                        time.perf_counter() - queued_at
+                    )
+                try:
+                    self._run(name, event)
+                    return
+                except Exception:
+                    continue
+
+        future = self._executors[name].submit(run)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+
+    def idle(self) -> bool:
+        """
+        実行中・実行待ちの非同期呼び出しがなければTrue
+        """
+        with self._lock:
+            return not self._pending
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _enter(self, name: str) -> None:
+        stats = self.stats[name]
+        self._active[name] += 1
+        stats.invocations += 1
+        stats.max_concurrency = max(stats.max_concurrency, self._active[name])
+
+    def _run(self, name: str, event: dict) -> Any:
+        context = LambdaContext(name, f"{FUNCTION_ARN_PREFIX}{name}")
+        try:
+            return self.functions[name](event, context)
+        except Exception as err:
+            with self._lock:
+                self.stats[name].errors += 1
+                self.errors.append((name, repr(err)))
+            raise
+        finally:
+            with self._released:
+                self._active[name] -= 1
+                self._released.notify_all()
+
+    def _discard(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+
+class LocalAsyncStepFunctionsClient:
+    """
+    start_executionを受け付けてすぐに返し、別スレッドでステートマシンを実行する
+
+    Args:
+        execute (Callable): ステートマシンを実行する関数(入力, ステートマシン名)
+        max_workers (int): 同時に実行するステートマシンの最大数
+    """
+
+    def __init__(
+        self, execute: Callable[[Any, str], Any], max_workers: int = 64
+    ) -> None:
+        self.execute = execute
+        self.reports: list[Any] = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="StepFunctions"
+        )
+        self._pending: set[Future] = set()
+
+    def start_execution(self, stateMachineArn: str, input: str) -> dict:
+        name = stateMachineArn.rsplit(":", 1)[-1]
+
+        def run() -> None:
+            report = self.execute(json.loads(input), name)
+            with self._lock:
+                self.reports.append(report)
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._discard)
+        return {
+            "executionArn": f"arn:aws:states:local:execution:{name}",
+            "startDate": time.time(),
+        }
+
+    def idle(self) -> bool:
+        with self._lock:
+            return not self._pending
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _discard(self, future: Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+
+
+class AwsRetryCounter:
+    """
+    AWSの呼び出しごとの再試行回数(ResponseMetadata.RetryAttempts)を集計する
+
+    boto3のデフォルトセッションに登録するため、登録後に作成した
+    クライアントが対象となる
+    """
+
+    def __init__(self) -> None:
+        self.calls: dict[str, int] = {}
+        self.retries: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def register(self) -> "AwsRetryCounter":
+        import boto3
+
+        session = boto3._get_default_session()
+        session.events.register("after-call", self._after_call)
+        return self
+
+    def _after_call(self, parsed: Any, model: Any, **kwargs: Any) -> None:
+        name = f"{model.service_model.service_name}.{model.name}"
+        attempts = (
+            (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        )
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if attempts:
+                self.retries[name] = self.retries.get(name, 0) + attempts
+
+
+def sign_slack_request(secret: str, timestamp: str, body: str) -> str:
+    """
+    Slackのリクエスト署名(X-Slack-Signature)を作成する
+    """
+    base = f"v0:{timestamp}:{body}".encode()
+    digest = hmac.new(secret.encode(), base, hashlib.sha256).hexdigest()
+    return f"v0={digest}"
+
+
+def make_file_shared_body(
+    event_id: str, file_id: str, user_id: str, channel_id: str
+) -> str:
+    """
+    file_sharedイベントのリクエストボディ(Events API)を作成する
+    """
+    now = int(time.time())
+    return json.dumps(
+        {
+            "token": "local",
+            "team_id": "TLOCAL",
+            "api_app_id": "ALOCAL",
+            "type": "event_callback",
+            "event_id": event_id,
+            "event_time": now,
+            "event": {
+                "type": "file_shared",
+                "file_id": file_id,
+                "file": {"id": file_id},
+                "user_id": user_id,
+                "channel_id": channel_id,
+                "event_ts": f"{now}.000000",
+            },
+        }
+    )
+
+
+def make_function_url_event(
+    secret: str, body: str, retry_num: int = 0
+) -> dict:
+    """
+    Slackからの署名付きリクエストをLambda関数URLのイベントの形式で作成する
+
+    Args:
+        secret (str): 署名シークレット
+        body (str): リクエストボディ
+        retry_num (int): Slackによる再送の回数(0の場合は初回)
+    """
+    timestamp = str(int(time.time()))
+    headers: dict = {
+        "content-type": "application/json",
+        "x-slack-request-timestamp": timestamp,
+        "x-slack-signature": sign_slack_request(secret, timestamp, body),
+    }
+    if retry_num:
+        headers["x-slack-retry-num"] = str(retry_num)
+        headers["x-slack-retry-reason"] = "http_timeout"
+
+    return {
+        "version": "2.0",
+        "rawPath": "/",
+        "headers": headers,
+        "requestContext": {"http": {"method": "POST", "path": "/"}},
+        "body": body,
+        "isBase64Encoded": False,
+    }
@@ -0,0 +1,448 @@
+"""
+Slackへのファイルアップロードの集中を模擬する負荷試験
+
+指定した人数のユーザが時間枠内のランダムなタイミングで勤務データを
+アップロードし、署名付きのfile_sharedイベントを handle_workforce_buddy へ送る
+Lazy Listeners・RunWorkSchedule・ステートマシンと各Lambda関数はローカルで実行し、
+以下を集計する
+
+- ack(Slackへの応答)の待ち時間の分布
+- アップロードから勤務表の送信までの時間と処理件数
+- Lambdaのスロットリング・Slackのレート制限・AWSの再試行の回数
+
+    python -m tools.load_test.upload_burst --users 200 --window-seconds 60
+    python -m tools.load_test.upload_burst --users 50 --window-seconds 10 \\
+        --route runner --concurrency 10 --slack-limit chat.postMessage=50
+"""
+
+import argparse
+import importlib
+import os
+import random
+import re
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from tools.load_test.harness import (
+    AwsRetryCounter,
+    LocalAsyncStepFunctionsClient,
+    LocalLambdaService,
+    TooManyRequestsException,
+    light_transaction_snapshots,
+    make_file_shared_body,
+    make_function_url_event,
+    serialize_moto,
+)
+from tools.local_pipeline.fake_slack import FakeSlackServer
+from tools.local_pipeline.pipeline import (
+    SLACK_SIGNING_SECRET,
+    LocalPipeline,
+    make_sample_work_file,
+)
+
+# Slackが応答を待つ時間(秒, 超えると再送される)
+ACK_TIMEOUT_SECONDS: float = 3.0
+
+# アップロードを受け付けた・勤務表を送信した・読み込めなかったことを示すメッセージ
+ACCEPTED_TEXT: str = "勤務データを受け付けました"
+COMPLETED_TEXT: str = "勤務表ができました"
+REJECTED_TEXT: str = "勤務データとして読み込めない"
+
+MENTION_PATTERN: re.Pattern = re.compile(r"<@(U[0-9A-Z]+)>")
+
+
+@dataclass
+class Upload:
+    """
+    1ユーザのアップロードと、その処理の経過
+    """
+
+    user_id: str
+    channel_id: str
+    file_id: str
+    body: str
+    sent_at: float = 0.0
+    ack_seconds: list[float] = field(default_factory=list)
+    throttled: int = 0
+    ack_failures: int = 0
+    acked: bool = False
+    accepted_at: Optional[float] = None
+    completed_at: Optional[float] = None
+    rejected: bool = False
+
+    @property
+    def done(self) -> bool:
+        return self.completed_at is not None or self.rejected
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    最近傍順位法による百分位数
+    """
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+def parse_limits(values: list[str]) -> dict[str, int]:
+    """
+    'メソッド名=1分あたりの上限' の一覧を変換する
+    """
+    limits: dict[str, int] = {}
+    for value in values:
+        method, _, limit = value.partition("=")
+        limits[method] = int(limit)
+    return limits
+
+
+class UploadBurst:
+    """
+    アップロードの送信・Slackによる再送・完了の検出を行う
+
+    Args:
+        pipeline (LocalPipeline): ローカル実行環境
+        lambda_service (LocalLambdaService): Lambdaのスタンドイン
+        retry_delays (list[float]): Slackによる再送の間隔(秒)
+    """
+
+    def __init__(
+        self,
+        pipeline: LocalPipeline,
+        lambda_service: LocalLambdaService,
+        retry_delays: list[float],
+    ) -> None:
+        self.pipeline = pipeline
+        self.lambda_service = lambda_service
+        self.retry_delays = retry_delays
+        self.uploads: dict[str, Upload] = {}
+        self.deliveries = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._senders = ThreadPoolExecutor(64, thread_name_prefix="Slack")
+        self._read_messages = 0
+
+    def prepare(self, users: int, channels: int, work_month: str) -> None:
+        """
+        ユーザごとの勤務データをSlackのスタンドインへ登録する
+        """
+        for n in range(1, users + 1):
+            user_id = f"U{n:06}"
+            channel_id = f"C{n % channels:06}"
+            content = make_sample_work_file(
+                f"{1000000 + n}", f"負荷 {n}", work_month
+            )
+            file_id = self.pipeline.slack.add_file(
+                f"work_data_{n}.tsv", content
+            )
+            self.uploads[user_id] = Upload(
+                user_id=user_id,
+                channel_id=channel_id,
+                file_id=file_id,
+                body=make_file_shared_body(
+                    f"Ev{n:08}", file_id, user_id, channel_id
+                ),
+            )
+
+    def send(self, upload: Upload) -> None:
+        upload.sent_at = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        self._senders.submit(self._deliver, upload, 0)
+
+    def _deliver(self, upload: Upload, retry_num: int) -> None:
+        """
+        イベントを送り、応答がなければSlackと同じく間隔を空けて再送する
+        """
+        event = make_function_url_event(
+            SLACK_SIGNING_SECRET, upload.body, retry_num
+        )
+        start = time.perf_counter()
+        throttled = False
+        try:
+            res: Any = self.lambda_service.call("HandleWorkforceBuddy", event)
+            ok = res["statusCode"] == 200
+        except TooManyRequestsException:
+            ok, throttled = False, True
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+
+        # 再送を待つ間も送信中として数える
+        with self._lock:
+            self.deliveries += 1
+            if throttled:
+                upload.throttled += 1
+            else:
+                upload.ack_seconds.append(elapsed)
+            if ok and elapsed <= ACK_TIMEOUT_SECONDS:
+                upload.acked = True
+                self._in_flight -= 1
+                return
+            upload.ack_failures += 1
+            if retry_num >= len(self.retry_delays):
+                self._in_flight -= 1
+                return
+
+        def retry() -> None:
+            self._senders.submit(self._deliver, upload, retry_num + 1)
+
+        timer = threading.Timer(self.retry_delays[retry_num], retry)
+        timer.daemon = True
+        timer.start()
+
+    def poll_messages(self) -> None:
+        """
+        Slackのスタンドインに届いたメッセージから処理の経過を記録する
+        """
+        now = time.perf_counter()
+        messages = self.pipeline.slack.state.messages
+        with self.pipeline.slack.state.lock:
+            new_messages = messages[self._read_messages :]
+            self._read_messages = len(messages)
+
+        for message in new_messages:
+            text: str = message.get("text") or ""
+            for user_id in MENTION_PATTERN.findall(text):
+                upload = self.uploads.get(user_id)
+                if upload is None:
+                    continue
+                if ACCEPTED_TEXT in text and upload.accepted_at is None:
+                    upload.accepted_at = now
+                elif COMPLETED_TEXT in text and upload.completed_at is None:
+                    upload.completed_at = now
+                elif REJECTED_TEXT in text:
+                    upload.rejected = True
+
+    def busy(self, step_functions: LocalAsyncStepFunctionsClient) -> bool:
+        """
+        送信中(再送待ちを含む)・実行中の処理があればTrue
+        """
+        with self._lock:
+            in_flight = self._in_flight
+        return (
+            in_flight > 0
+            or not self.lambda_service.idle()
+            or not step_functions.idle()
+        )
+
+    def shutdown(self) -> None:
+        self._senders.shutdown(wait=False, cancel_futures=True)
+
+
+def run(pipeline: LocalPipeline, args: argparse.Namespace) -> dict:
+    """
+    アップロードを時間枠内に送信し、全ての処理が終わるまで待つ
+    """
+    retry_counter = AwsRetryCounter().register()
+    core = importlib.import_module("workforce_buddy_core")
+    handler = importlib.import_module(
+        "handle_workforce_buddy.handle_workforce_buddy"
+    )
+    handler.UPLOAD_COALESCE_WINDOW_SECONDS = args.coalesce_seconds
+
+    # ステートマシン内のLambda関数も同時実行数の上限の対象とする
+    functions = dict(pipeline.functions)
+    functions["HandleWorkforceBuddy"] = handler.lambda_handler
+    lambda_service = LocalLambdaService(functions, args.concurrency)
+    for name in list(pipeline.functions):
+        pipeline.functions[name] = (
+            lambda event, context, name=name: lambda_service.call(name, event)
+        )
+    step_functions = LocalAsyncStepFunctionsClient(pipeline.execute)
+    core.register_client("lambda", lambda_service)
+    core.register_client("stepfunctions", step_functions)
+    if args.route == "runner":
+        os.environ["WORKSCHEDULE_RUNNER_KEY"] = "RunWorkSchedule"
+
+    burst = UploadBurst(pipeline, lambda_service, args.slack_retry_delays)
+    burst.prepare(args.users, args.channels, args.work_month)
+    rng = random.Random(args.seed)
+    offsets = sorted(
+        rng.uniform(0, args.window_seconds) for _ in range(args.users)
+    )
+
+    try:
+        start = time.perf_counter()
+        for upload, offset in zip(burst.uploads.values(), offsets):
+            time.sleep(max(0.0, start + offset - time.perf_counter()))
+            burst.send(upload)
+            burst.poll_messages()
+
+        deadline = time.perf_counter() + args.timeout_seconds
+        while time.perf_counter() < deadline:
+            time.sleep(0.05)
+            burst.poll_messages()
+            if all(u.done for u in burst.uploads.values()):
+                break
+            if not burst.busy(step_functions):
+                break
+        burst.poll_messages()
+        elapsed = time.perf_counter() - start
+    finally:
+        os.environ.pop("WORKSCHEDULE_RUNNER_KEY", None)
+        burst.shutdown()
+        lambda_service.shutdown()
+        step_functions.shutdown()
+
+    return {
+        "start": start,
+        "elapsed": elapsed,
+        "uploads": list(burst.uploads.values()),
+        "deliveries": burst.deliveries,
+        "lambda": lambda_service,
+        "executions": step_functions.reports,
+        "slack": pipeline.slack.state,
+        "aws": retry_counter,
+    }
+
+
+def print_report(result: dict, args: argparse.Namespace) -> None:
+    uploads: list[Upload] = result["uploads"]
+    ack_ms = [s * 1000 for u in uploads for s in u.ack_seconds]
+    completed = [u for u in uploads if u.completed_at is not None]
+    latencies = [u.completed_at - u.sent_at for u in completed]
+    lambda_service: LocalLambdaService = result["lambda"]
+
+    print(
+        f"{args.users} uploads in {args.window_seconds:.0f}s "
+        f"(route={args.route}, concurrency={args.concurrency}, "
+        f"coalesce={args.coalesce_seconds}s), elapsed {result['elapsed']:.1f}s"
+    )
+
+    print("\nack")
+    throttled = sum(u.throttled for u in uploads)
+    print(
+        f"  deliveries {result['deliveries']} "
+        f"(Slack retries {result['deliveries'] - len(uploads)}), "
+        f"throttled {throttled}, failed or over {ACK_TIMEOUT_SECONDS:.0f}s "
+        f"{sum(u.ack_failures for u in uploads) - throttled}"
+    )
+    print(f"  never acknowledged {sum(not u.acked for u in uploads)}")
+    print(
+        "  ms   "
+        + "  ".join(f"p{p} {percentile(ack_ms, p):.1f}" for p in [50, 90, 99])
+        + f"  max {max(ack_ms, default=float('nan')):.1f}"
+    )
+
+    print("\nend to end")
+    accepted = sum(u.accepted_at is not None for u in uploads)
+    rejected = sum(u.rejected for u in uploads)
+    print(
+        f"  accepted {accepted}, completed {len(completed)}/{len(uploads)}, "
+        f"rejected {rejected}"
+    )
+    if completed:
+        span = max(u.completed_at for u in completed) - result["start"]
+        print(
+            "  s    "
+            + "  ".join(
+                f"p{p} {percentile(latencies, p):.2f}" for p in [50, 90, 99]
+            )
+            + f"  max {max(latencies):.2f}"
+        )
+        print(f"  throughput {len(completed) / span * 60:.1f} uploads/min")
+    failed_executions = [
+        r for r in result["executions"] if r.status != "SUCCEEDED"
+    ]
+    print(
+        f"  state machine executions {len(result['executions'])}, "
+        f"failed {len(failed_executions)}"
+    )
+
+    print("\nlambda")
+    print(
+        f"  {'function':<22} {'invocations':>11} {'throttles':>9} "
+        f"{'errors':>6} {'retries':>7} {'max conc':>8} {'queue p90 s':>11}"
+    )
+    for name, stats in lambda_service.stats.items():
+        if not stats.invocations and not stats.throttles:
+            continue
+        print(
+            f"  {name:<22} {stats.invocations:>11} {stats.throttles:>9} "
+            f"{stats.errors:>6} {stats.async_retries:>7} "
+            f"{stats.max_concurrency:>8} "
+            f"{percentile(stats.queued_seconds, 90):>11.2f}"
+        )
+    for name, error in lambda_service.errors[:5]:
+        print(f"  ! {name}: {error[:100]}")
+
+    slack = result["slack"]
+    print("\nslack")
+    for method, calls in sorted(slack.calls.items()):
+        limited = slack.rate_limited.get(method, 0)
+        print(f"  {method:<30} {calls:>6} calls {limited:>5} rate limited")
+
+    aws: AwsRetryCounter = result["aws"]
+    print("\naws")
+    print(
+        f"  calls {sum(aws.calls.values())}, "
+        f"retries {sum(aws.retries.values())}"
+    )
+    for name, retries in sorted(aws.retries.items()):
+        print(f"  {name:<30} {retries:>6} retries")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument(
+        "--window-seconds",
+        type=float,
+        default=60,
+        help="アップロードが集中する時間枠(秒)",
+    )
+    parser.add_argument("--channels", type=int, default=1)
+    parser.add_argument("--work-month", default="2023-07")
+    parser.add_argument(
+        "--route", choices=["statemachine", "runner"], default="statemachine"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=100,
+        help="関数ごとの同時実行数の上限",
+    )
+    parser.add_argument(
+        "--coalesce-seconds",
+        type=int,
+        default=0,
+        help="連続アップロードをまとめる待機時間(UPLOAD_COALESCE_WINDOW_SECONDS)",
+    )
+    parser.add_argument(
+        "--slack-limit",
+        action="append",
+        default=[],
+        metavar="METHOD=N",
+        help="Slack APIのメソッドごとの1分あたりの上限(ex: chat.postMessage=60)",
+    )
+    parser.add_argument(
+        "--slack-retry-delays",
+        type=float,
+        nargs="*",
+        default=[0, 60, 300],
+        help="応答がない場合のSlackによる再送の間隔(秒)",
+    )
+    parser.add_argument("--timeout-seconds", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # 勤務表作成で大量に出力されるpandasの警告は表示しない
+    from pandas.errors import SettingWithCopyWarning
+
+    warnings.simplefilter("ignore", SettingWithCopyWarning)
+
+    slack = FakeSlackServer(rate_limits=parse_limits(args.slack_limit))
+    with serialize_moto(), light_transaction_snapshots():
+        with LocalPipeline(slack) as pipeline:
+            result = run(pipeline, args)
+    print_report(result, args)
+
+
+if __name__ == "__main__":
+    main()
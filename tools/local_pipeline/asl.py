@@ -0,0 +1,663 @@
+"""
+Amazon States Language(ASL)のローカルインタープリタ
+
+src/stepfunctions 配下の定義で使用している範囲(Parallel, Map, Choice, Pass,
+Task, Wait, Succeed, Fail, Catch, Retry, JSONPath, 組み込み関数)を解釈して実行し、
+ステートごとの処理時間とペイロードサイズを記録する
+"""
+
+import copy
+import json
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+# タスクの実行関数(resource, parameters) -> result
+TaskHandler = Callable[[str, Any], Any]
+
+
+class StatesError(Exception):
+    """
+    ステートマシン内で発生したエラー(ErrorEquals で判定する)
+    """
+
+    def __init__(self, error: str, cause: str = "") -> None:
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+@dataclass
+class StateTiming:
+    """
+    ステートごとの実行記録
+    """
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    max_input_bytes: int = 0
+    max_output_bytes: int = 0
+
+    def add(self, elapsed: float, input_bytes: int, output_bytes: int) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.max_input_bytes = max(self.max_input_bytes, input_bytes)
+        self.max_output_bytes = max(self.max_output_bytes, output_bytes)
+
+
+@dataclass
+class ExecutionReport:
+    """
+    実行結果とステートごとの処理時間
+    """
+
+    status: str
+    output: Any
+    elapsed: float
+    timings: dict[str, StateTiming] = field(default_factory=dict)
+    error: Optional[StatesError] = None
+
+    def format(self) -> str:
+        """
+        ステートごとの処理時間を表形式の文字列にする
+        """
+        lines: list[str] = [
+            f"status: {self.status}  elapsed: {self.elapsed:.3f}s",
+            f"{'state':<48}{'count':>6}{'total(s)':>10}"
+            f"{'max(s)':>10}{'max in':>9}{'max bytes':>11}",
+        ]
+        for name, timing in sorted(
+            self.timings.items(), key=lambda x: -x[1].total
+        ):
+            lines.append(
+                f"{name:<48}{timing.count:>6}{timing.total:>10.3f}"
+                f"{timing.max:>10.3f}{timing.max_input_bytes:>9}"
+                f"{timing.max_output_bytes:>11}"
+            )
+        if self.error is not None:
+            lines.append(f"error: {self.error.error} {self.error.cause}")
+
+        return "\n".join(lines)
+
+
+# ------------------------------------------------------------------
+# JSONPath
+
+
+_PATH_TOKEN = re.compile(r"\.([^.\[\]]+)|\[(\d+|\*)\]")
+
+
+def _parse_path(path: str) -> tuple[bool, list[str]]:
+    """
+    JSONPathを(コンテキストオブジェクトか, トークン列)に分解する
+    """
+    if path.startswith("$$"):
+        is_context, rest = True, path[2:]
+    elif path.startswith("$"):
+        is_context, rest = False, path[1:]
+    else:
+        raise StatesError("States.Runtime", f"Invalid path: {path}")
+
+    tokens: list[str] = []
+    pos = 0
+    while pos < len(rest):
+        match = _PATH_TOKEN.match(rest, pos)
+        if match is None:
+            raise StatesError("States.Runtime", f"Invalid path: {path}")
+        tokens.append(
+            match.group(1)
+            if match.group(1) is not None
+            else f"[{match.group(2)}]"
+        )
+        pos = match.end()
+
+    return is_context, tokens
+
+
+def read_path(data: Any, path: str, context: dict) -> Any:
+    """
+    JSONPathで値を読み出す
+    ワイルドカード([*])を含む場合はリストを返す
+    """
+    is_context, tokens = _parse_path(path)
+    values: list[Any] = [context if is_context else data]
+    wildcard = False
+    for token in tokens:
+        next_values: list[Any] = []
+        for value in values:
+            if token == "[*]":
+                wildcard = True
+                if isinstance(value, list):
+                    next_values.extend(value)
+                elif isinstance(value, dict):
+                    next_values.extend(value.values())
+            elif token.startswith("["):
+                index = int(token[1:-1])
+                if isinstance(value, list) and index < len(value):
+                    next_values.append(value[index])
+                elif not wildcard:
+                    raise StatesError(
+                        "States.Runtime", f"Path not found: {path}"
+                    )
+            elif isinstance(value, dict) and token in value:
+                next_values.append(value[token])
+            elif not wildcard:
+                raise StatesError("States.Runtime", f"Path not found: {path}")
+        values = next_values
+
+    return values if wildcard else values[0]
+
+
+def path_exists(data: Any, path: str, context: dict) -> bool:
+    """
+    JSONPathが指す値が存在するか判定する
+    """
+    try:
+        read_path(data, path, context)
+    except StatesError:
+        return False
+    return True
+
+
+def write_path(data: Any, path: Optional[str], value: Any) -> Any:
+    """
+    ResultPathに従って結果を入力へ書き込む
+    """
+    if path is None:
+        return data
+    _, tokens = _parse_path(path)
+    if not tokens:
+        return value
+
+    data = data if isinstance(data, dict) else {}
+    target = data
+    for token in tokens[:-1]:
+        if not isinstance(target.get(token), dict):
+            target[token] = {}
+        target = target[token]
+    target[tokens[-1]] = value
+
+    return data
+
+
+# ------------------------------------------------------------------
+# 組み込み関数
+
+
+_INTRINSIC_TOKEN = re.compile(
+    r"\s*(?:(?P<string>'(?:\\.|[^'\\])*')"
+    r"|(?P<number>-?\d+(?:\.\d+)?)"
+    r"|(?P<func>States\.[A-Za-z]+)\("
+    r"|(?P<path>\$\$?[^,()\s]*)"
+    r"|(?P<literal>null|true|false)"
+    r"|(?P<comma>,)|(?P<close>\)))"
+)
+
+
+def evaluate_intrinsic(expression: str, data: Any, context: dict) -> Any:
+    """
+    組み込み関数(States.Format など)を評価する
+    """
+    value, pos = _parse_intrinsic(expression, 0, data, context)
+    if expression[pos:].strip():
+        raise StatesError(
+            "States.Runtime", f"Invalid intrinsic function: {expression}"
+        )
+    return value
+
+
+def _parse_intrinsic(
+    expression: str, pos: int, data: Any, context: dict
+) -> tuple[Any, int]:
+    match = _INTRINSIC_TOKEN.match(expression, pos)
+    if match is None:
+        raise StatesError(
+            "States.Runtime", f"Invalid intrinsic function: {expression}"
+        )
+    pos = match.end()
+
+    if match.group("string") is not None:
+        raw = match.group("string")[1:-1]
+        return re.sub(r"\\(.)", r"\1", raw), pos
+    if match.group("number") is not None:
+        number = match.group("number")
+        return (float(number) if "." in number else int(number)), pos
+    if match.group("path") is not None:
+        return read_path(data, match.group("path"), context), pos
+    if match.group("literal") is not None:
+        return {"null": None, "true": True, "false": False}[
+            match.group("literal")
+        ], pos
+    if match.group("func") is None:
+        raise StatesError(
+            "States.Runtime", f"Invalid intrinsic function: {expression}"
+        )
+
+    # 引数の解析
+    name: str = match.group("func")
+    args: list[Any] = []
+    while True:
+        close = _INTRINSIC_TOKEN.match(expression, pos)
+        if close is not None and close.group("close") is not None:
+            pos = close.end()
+            break
+        arg, pos = _parse_intrinsic(expression, pos, data, context)
+        args.append(arg)
+        sep = _INTRINSIC_TOKEN.match(expression, pos)
+        if sep is not None and sep.group("comma") is not None:
+            pos = sep.end()
+
+    return _call_intrinsic(name, args), pos
+
+
+def _call_intrinsic(name: str, args: list[Any]) -> Any:
+    if name == "States.Format":
+        template, values = args[0], list(args[1:])
+
+        def replace(_: re.Match) -> str:
+            value = values.pop(0)
+            return value if isinstance(value, str) else json.dumps(value)
+
+        return re.sub(r"\{\}", replace, template)
+    if name == "States.StringSplit":
+        return [s for s in re.split(f"[{re.escape(args[1])}]", args[0]) if s]
+    if name == "States.ArrayGetItem":
+        return args[0][int(args[1])]
+    if name == "States.ArrayLength":
+        return len(args[0])
+    if name == "States.ArrayUnique":
+        unique: list[Any] = []
+        for value in args[0]:
+            if value not in unique:
+                unique.append(value)
+        return unique
+    if name == "States.ArrayContains":
+        return args[1] in args[0]
+    if name == "States.Array":
+        return list(args)
+    if name == "States.JsonMerge":
+        merged = dict(args[0])
+        merged.update(args[1])
+        return merged
+    if name == "States.StringToJson":
+        return json.loads(args[0])
+    if name == "States.JsonToString":
+        return json.dumps(args[0], separators=(",", ":"))
+    if name == "States.UUID":
+        return str(uuid.uuid4())
+    if name == "States.MathAdd":
+        return args[0] + args[1]
+
+    raise StatesError("States.Runtime", f"Unsupported function: {name}")
+
+
+def resolve_template(template: Any, data: Any, context: dict) -> Any:
+    """
+    Parameters/ResultSelector/ItemSelector のテンプレートを解決する
+    """
+    if isinstance(template, dict):
+        resolved: dict = {}
+        for key, value in template.items():
+            if key.endswith(".$"):
+                if value.startswith("States."):
+                    resolved[key[:-2]] = evaluate_intrinsic(
+                        value, data, context
+                    )
+                else:
+                    resolved[key[:-2]] = read_path(data, value, context)
+            else:
+                resolved[key] = resolve_template(value, data, context)
+        return resolved
+    if isinstance(template, list):
+        return [resolve_template(v, data, context) for v in template]
+
+    return template
+
+
+# ------------------------------------------------------------------
+# Choice
+
+
+_COMPARATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "Equals": lambda a, b: a == b,
+    "LessThan": lambda a, b: a < b,
+    "GreaterThan": lambda a, b: a > b,
+    "LessThanEquals": lambda a, b: a <= b,
+    "GreaterThanEquals": lambda a, b: a >= b,
+}
+_TYPES: dict[str, type] = {
+    "String": str,
+    "Numeric": (int, float),
+    "Boolean": bool,
+    "Timestamp": str,
+}
+
+
+def evaluate_choice(rule: dict, data: Any, context: dict) -> bool:
+    """
+    Choiceルールを評価する
+    """
+    if "And" in rule:
+        return all(evaluate_choice(r, data, context) for r in rule["And"])
+    if "Or" in rule:
+        return any(evaluate_choice(r, data, context) for r in rule["Or"])
+    if "Not" in rule:
+        return not evaluate_choice(rule["Not"], data, context)
+
+    variable: str = rule["Variable"]
+    if "IsPresent" in rule:
+        return path_exists(data, variable, context) == rule["IsPresent"]
+    if not path_exists(data, variable, context):
+        return False
+    value = read_path(data, variable, context)
+    if "IsNull" in rule:
+        return (value is None) == rule["IsNull"]
+    for type_name, expected_type in [
+        ("IsString", str),
+        ("IsNumeric", (int, float)),
+        ("IsBoolean", bool),
+    ]:
+        if type_name in rule:
+            return isinstance(value, expected_type) == rule[type_name]
+
+    for key, expected in rule.items():
+        for type_name, expected_type in _TYPES.items():
+            if not key.startswith(type_name):
+                continue
+            operator = key[len(type_name) :]
+            if operator.endswith("Path"):
+                operator = operator[:-4]
+                expected = read_path(data, expected, context)
+            if operator not in _COMPARATORS:
+                continue
+            if not isinstance(value, expected_type):
+                return False
+            return _COMPARATORS[operator](value, expected)
+
+    raise StatesError("States.Runtime", f"Unsupported choice rule: {rule}")
+
+
+# ------------------------------------------------------------------
+# ステートマシン
+
+
+def _error_matches(error_equals: list[str], error: StatesError) -> bool:
+    for name in error_equals:
+        if name == "States.ALL" or name == error.error:
+            return True
+        if name == "States.TaskFailed" and not error.error.startswith(
+            "States."
+        ):
+            return True
+    return False
+
+
+def _now() -> str:
+    return (
+        datetime.now(timezone.utc).isoformat(timespec="milliseconds")[:-6]
+        + "Z"
+    )
+
+
+class LocalStateMachine:
+    """
+    ASL定義をローカルで実行するステートマシン
+
+    Args:
+        definition (dict): ASL定義
+        task_handler (TaskHandler): Taskステートのリソースを実行する関数
+        name (str): ステートマシン名
+    """
+
+    def __init__(
+        self, definition: dict, task_handler: TaskHandler, name: str = "local"
+    ) -> None:
+        self.definition = definition
+        self.task_handler = task_handler
+        self.name = name
+        self._lock = threading.Lock()
+        self._timings: dict[str, StateTiming] = {}
+
+    def execute(self, execution_input: Any) -> ExecutionReport:
+        """
+        ステートマシンを実行する
+
+        Args:
+            execution_input (Any): 実行時の入力
+
+        Returns:
+            ExecutionReport: 実行結果
+        """
+        self._timings = {}
+        context: dict = {
+            "Execution": {
+                "Id": f"{self.name}:{uuid.uuid4()}",
+                "Input": copy.deepcopy(execution_input),
+                "StartTime": _now(),
+            },
+            "StateMachine": {"Name": self.name},
+        }
+        start = time.perf_counter()
+        try:
+            output = self._run(self.definition, execution_input, context, "")
+            status, error = "SUCCEEDED", None
+        except StatesError as err:
+            output, status, error = None, "FAILED", err
+
+        return ExecutionReport(
+            status=status,
+            output=output,
+            elapsed=time.perf_counter() - start,
+            timings=self._timings,
+            error=error,
+        )
+
+    def _record(
+        self, name: str, elapsed: float, input_bytes: int, output: Any
+    ) -> None:
+        output_bytes = len(json.dumps(output, default=str))
+        with self._lock:
+            self._timings.setdefault(name, StateTiming()).add(
+                elapsed, input_bytes, output_bytes
+            )
+
+    def _run(
+        self, machine: dict, data: Any, context: dict, prefix: str
+    ) -> Any:
+        state_name: Optional[str] = machine["StartAt"]
+        while state_name is not None:
+            state: dict = machine["States"][state_name]
+            state_path = f"{prefix}{state_name}"
+            state_context = dict(context)
+            state_context["State"] = {
+                "Name": state_name,
+                "EnteredTime": _now(),
+            }
+            input_bytes = len(json.dumps(data, default=str))
+            start = time.perf_counter()
+            try:
+                data, state_name = self._run_state(
+                    state, data, state_context, state_path
+                )
+            finally:
+                self._record(
+                    state_path, time.perf_counter() - start, input_bytes, data
+                )
+            if state_name == "__end__":
+                state_name = None
+
+        return data
+
+    def _run_state(
+        self, state: dict, data: Any, context: dict, path: str
+    ) -> tuple[Any, Optional[str]]:
+        state_type: str = state["Type"]
+        next_state: str = state.get("Next", "__end__")
+
+        if state_type == "Succeed":
+            return data, "__end__"
+        if state_type == "Fail":
+            raise StatesError(
+                state.get("Error", "States.Fail"), state.get("Cause", "")
+            )
+        if state_type == "Choice":
+            for rule in state.get("Choices", []):
+                if evaluate_choice(rule, data, context):
+                    return data, rule["Next"]
+            if "Default" not in state:
+                raise StatesError("States.NoChoiceMatched", path)
+            return data, state["Default"]
+        if state_type == "Wait":
+            seconds = (
+                read_path(data, state["SecondsPath"], context)
+                if "SecondsPath" in state
+                else state.get("Seconds", 0)
+            )
+            time.sleep(max(float(seconds), 0.0))
+            return data, "__end__" if state.get("End") else next_state
+
+        # InputPath, Parameters
+        effective = data
+        if "InputPath" in state:
+            effective = (
+                {}
+                if state["InputPath"] is None
+                else read_path(data, state["InputPath"], context)
+            )
+
+        try:
+            if state_type == "Pass":
+                if "Parameters" in state:
+                    result = resolve_template(
+                        state["Parameters"], effective, context
+                    )
+                else:
+                    result = state.get("Result", effective)
+            elif state_type == "Task":
+                result = self._run_task(state, effective, context)
+            elif state_type == "Parallel":
+                result = self._run_parallel(state, effective, context, path)
+            elif state_type == "Map":
+                result = self._run_map(state, effective, context, path)
+            else:
+                raise StatesError(
+                    "States.Runtime", f"Unsupported state type: {state_type}"
+                )
+
+            if "ResultSelector" in state:
+                result = resolve_template(
+                    state["ResultSelector"], result, context
+                )
+        except StatesError as err:
+            for catcher in state.get("Catch", []):
+                if _error_matches(catcher["ErrorEquals"], err):
+                    error_output = {"Error": err.error, "Cause": err.cause}
+                    return (
+                        write_path(
+                            copy.deepcopy(data),
+                            catcher.get("ResultPath", "$"),
+                            error_output,
+                        ),
+                        catcher["Next"],
+                    )
+            raise
+
+        # ResultPath, OutputPath
+        output = write_path(
+            copy.deepcopy(data), state.get("ResultPath", "$"), result
+        )
+        if "OutputPath" in state:
+            output = (
+                {}
+                if state["OutputPath"] is None
+                else read_path(output, state["OutputPath"], context)
+            )
+        if state.get("End"):
+            return output, "__end__"
+
+        return output, next_state
+
+    def _run_task(self, state: dict, data: Any, context: dict) -> Any:
+        parameters = resolve_template(
+            state.get("Parameters", data), data, context
+        )
+        retriers: list[dict] = state.get("Retry", [])
+        attempts: dict[int, int] = {}
+        while True:
+            try:
+                # 実際のサービス同様にJSONとして受け渡す
+                return json.loads(
+                    json.dumps(
+                        self.task_handler(
+                            state["Resource"],
+                            json.loads(json.dumps(parameters)),
+                        ),
+                        default=str,
+                    )
+                )
+            except Exception as err:
+                if not isinstance(err, StatesError):
+                    err = StatesError(type(err).__name__, str(err))
+                for i, retrier in enumerate(retriers):
+                    if not _error_matches(retrier["ErrorEquals"], err):
+                        continue
+                    attempts[i] = attempts.get(i, 0) + 1
+                    if attempts[i] <= retrier.get("MaxAttempts", 3):
+                        break
+                else:
+                    raise err
+
+    def _run_parallel(
+        self, state: dict, data: Any, context: dict, path: str
+    ) -> list[Any]:
+        branches: list[dict] = state["Branches"]
+        with ThreadPoolExecutor(max_workers=len(branches)) as executor:
+            futures = [
+                executor.submit(
+                    self._run,
+                    branch,
+                    copy.deepcopy(data),
+                    context,
+                    f"{path}/",
+                )
+                for branch in branches
+            ]
+            return [f.result() for f in futures]
+
+    def _run_map(
+        self, state: dict, data: Any, context: dict, path: str
+    ) -> list[Any]:
+        items: list[Any] = read_path(
+            data, state.get("ItemsPath", "$"), context
+        )
+        processor: dict = state.get("ItemProcessor") or state["Iterator"]
+        selector: Optional[dict] = state.get("ItemSelector") or state.get(
+            "Parameters"
+        )
+
+        def run_item(index: int, item: Any) -> Any:
+            item_context = dict(context)
+            item_context["Map"] = {"Item": {"Index": index, "Value": item}}
+            item_input = (
+                resolve_template(selector, data, item_context)
+                if selector is not None
+                else item
+            )
+            return self._run(processor, item_input, context, f"{path}/")
+
+        max_concurrency: int = state.get("MaxConcurrency", 0) or len(items)
+        with ThreadPoolExecutor(
+            max_workers=max(max_concurrency, 1)
+        ) as executor:
+            futures = [
+                executor.submit(run_item, i, item)
+                for i, item in enumerate(items)
+            ]
+            return [f.result() for f in futures]
@@ -0,0 +1,208 @@
+"""
+クライアント再利用のベンチマーク
+
+呼び出しごとにクライアント・接続を作成する場合と、workforce_buddy_coreの
+クライアントを再利用する場合で、新しい接続の数と処理時間を比較する
+
+- AWS: Step Functions(start_execution)のスタンドイン
+- Slack Web API: files.info
+- ファイル取得: url_private_download
+
+    python -m tools.local_pipeline.bench_clients
+    # 接続ごとに30msの確立時間(TLSハンドシェイク相当)を加える
+    python -m tools.local_pipeline.bench_clients --calls 50 --connect-ms 30
+"""
+
+import argparse
+import importlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable
+
+from tools.local_pipeline.fake_slack import FakeSlackServer
+from tools.local_pipeline.pipeline import add_lambda_paths
+
+TOKEN: str = "xoxb-local"
+
+
+class AwsStandIn:
+    """
+    JSONプロトコルのAWS APIに固定の応答を返すHTTPサーバ
+
+    Args:
+        connect_delay (float): 新しい接続ごとの待ち時間(秒)
+    """
+
+    def __init__(self, connect_delay: float) -> None:
+        self.connections = 0
+        self.connect_delay = connect_delay
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # ヘッダーと本文を別々に送信するため、Nagleアルゴリズムによる遅延を避ける
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+                time.sleep(stand_in.connect_delay)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                body = json.dumps(
+                    {
+                        "executionArn": "arn:aws:states:local:execution:x",
+                        "startDate": 0,
+                    }
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-amz-json-1.0")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        ).start()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def run(
+    calls: int, call: Callable[[], Any], count: Callable[[], int]
+) -> tuple[int, float]:
+    """
+    指定回数呼び出し、新しい接続の数と1回あたりの処理時間(ミリ秒)を返す
+    """
+    before = count()
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    elapsed = time.perf_counter() - start
+    return count() - before, elapsed / calls * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument(
+        "--connect-ms",
+        type=float,
+        default=0,
+        help="新しい接続ごとに加える確立時間(ミリ秒)",
+    )
+    args = parser.parse_args()
+
+    import boto3
+    import requests
+    from slack_sdk import WebClient
+
+    connect_delay = args.connect_ms / 1000
+    aws = AwsStandIn(connect_delay)
+    slack = FakeSlackServer(connect_delay=connect_delay).start()
+    file_id = slack.add_file("work_data.tsv", b"x" * 4096)
+    download_url = slack.file_info(file_id)["url_private_download"]
+    os.environ.update(
+        {
+            "AWS_DEFAULT_REGION": "ap-northeast-1",
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_ENDPOINT_URL": aws.url,
+            "SLACK_API_URL": slack.api_url,
+        }
+    )
+    add_lambda_paths()
+    core = importlib.import_module("workforce_buddy_core")
+
+    def start_execution(client: Any) -> None:
+        client.start_execution(stateMachineArn="arn:x", input="{}")
+
+    def slack_connections() -> int:
+        return slack.state.connections
+
+    # 初回のクライアント作成(サービス定義の読み込み)は計測から除く
+    start_execution(boto3.client("stepfunctions"))
+    start_execution(core.get_client("stepfunctions"))
+
+    results = [
+        (
+            "aws per call",
+            run(
+                args.calls,
+                lambda: start_execution(boto3.client("stepfunctions")),
+                lambda: aws.connections,
+            ),
+        ),
+        (
+            "aws core",
+            run(
+                args.calls,
+                lambda: start_execution(core.get_client("stepfunctions")),
+                lambda: aws.connections,
+            ),
+        ),
+        (
+            "slack per call",
+            run(
+                args.calls,
+                lambda: WebClient(
+                    token=TOKEN, base_url=slack.api_url
+                ).files_info(file=file_id),
+                slack_connections,
+            ),
+        ),
+        (
+            "slack core",
+            run(
+                args.calls,
+                lambda: core.get_slack_client(TOKEN).files_info(file=file_id),
+                slack_connections,
+            ),
+        ),
+        (
+            "download per call",
+            run(
+                args.calls,
+                lambda: requests.get(download_url).content,
+                slack_connections,
+            ),
+        ),
+        (
+            "download core",
+            run(
+                args.calls,
+                lambda: core.get_http_session()
+                .get(download_url, timeout=core.HTTP_TIMEOUT)
+                .content,
+                slack_connections,
+            ),
+        ),
+    ]
+    core.reset_clients()
+    aws.stop()
+    slack.stop()
+
+    print(f"{'case':<20} {'calls':>6} {'connections':>12} {'ms/call':>8}")
+    for name, (connections, ms) in results:
+        print(f"{name:<20} {args.calls:>6} {connections:>12} {ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
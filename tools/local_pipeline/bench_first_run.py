@@ -0,0 +1,191 @@
+"""
+初回のアップロード(ユーザ設定の作成を含む)の処理時間の比較
+
+現在のWorkScheduleMaker(ステート内でデフォルトのユーザ設定を複製する)と、
+以前の流れ(CreateUserConfigをstartExecution.sync:2で実行し、ユーザ設定を
+取得し直す)を、ユーザ設定のない社員のアップロードで比較する
+
+ローカルのステートマシンには bench_modes と同じく状態遷移とLambdaの呼び出しの
+待ち時間を加え、以前の流れには子の実行の完了を待つ待ち時間を加える
+
+    python -m tools.local_pipeline.bench_first_run
+    python -m tools.local_pipeline.bench_first_run --transition-ms 25 \\
+        --invoke-ms 20 --sync-ms 500 --repeat 10
+"""
+
+import argparse
+import copy
+import statistics
+import time
+import warnings
+from typing import Any
+
+from tools.load_test.harness import serialize_moto
+from tools.local_pipeline.asl import LocalStateMachine
+from tools.local_pipeline.bench_modes import add_service_overhead
+from tools.local_pipeline.pipeline import (
+    TABLE_NAME,
+    LocalPipeline,
+    make_sample_work_file,
+)
+
+WORK_MONTH: str = "2023-07"
+
+# 以前の流れを再現したステートマシンの名前
+NESTED_NAME: str = "WorkScheduleMakerNested"
+
+FLOWS: dict[str, str] = {
+    "inline": "WorkScheduleMaker",
+    "nested": NESTED_NAME,
+}
+
+
+def make_nested_definition(definition: dict) -> dict:
+    """
+    ユーザ設定がない場合にCreateUserConfigを同期実行し、取得し直す定義を作る
+    """
+    nested = copy.deepcopy(definition)
+    states: dict = nested["States"]["Parallel"]["Branches"][0]["States"]
+    for choice in states["ExistenceOfLegacyUserConfig"]["Choices"]:
+        if choice["Next"] == "GetBasicUserConfig":
+            choice["Next"] = "Start CreateUserConfig"
+    states["Start CreateUserConfig"] = {
+        "Type": "Task",
+        "Resource": "arn:aws:states:::states:startExecution.sync:2",
+        "Parameters": {
+            "StateMachineArn": "CreateUserConfig",
+            "Input": {
+                "work_info": {"user_id.$": "$.work_info.result.user_id"}
+            },
+        },
+        "ResultPath": None,
+        "Next": "GetUserConfig",
+    }
+    for name in [
+        "GetBasicUserConfig",
+        "MakeProvisionConfig",
+        "ProvisionConfig",
+        "PutProvisionedUserConfig",
+    ]:
+        del states[name]
+    return nested
+
+
+def add_sync_overhead(machine: LocalStateMachine, sync_ms: float) -> None:
+    """
+    startExecution.sync の子の実行の完了を待つ待ち時間を加える
+    """
+    task_handler = machine.task_handler
+
+    def run_task(resource: str, parameters: Any) -> Any:
+        if ":states:startExecution" in resource:
+            time.sleep(sync_ms / 1000)
+        return task_handler(resource, parameters)
+
+    machine.task_handler = run_task
+
+
+def has_user_config(pipeline: LocalPipeline, user_id: str) -> bool:
+    """
+    UserConfig#LATEST が作成されたかを確認する
+    """
+    dynamodb = pipeline.modules["CreateWorkSchedule"].get_client("dynamodb")
+    res = dynamodb.get_item(
+        TableName=TABLE_NAME,
+        Key={"id": {"S": user_id}, "SK": {"S": "UserConfig#LATEST"}},
+    )
+    return "Item" in res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--transition-ms",
+        type=float,
+        default=25,
+        help="Step Functionsの状態遷移ごとの待ち時間",
+    )
+    parser.add_argument(
+        "--invoke-ms",
+        type=float,
+        default=20,
+        help="Lambdaの呼び出しごとの待ち時間",
+    )
+    parser.add_argument(
+        "--sync-ms",
+        type=float,
+        default=500,
+        help="startExecution.syncで子の実行の完了を知るまでの待ち時間",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="実行の間隔(秒, Slackへの送信レートの制限で待たないようにする)",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # 勤務表作成で大量に出力されるpandasの警告は表示しない
+    from pandas.errors import SettingWithCopyWarning
+
+    warnings.simplefilter("ignore", SettingWithCopyWarning)
+
+    results: dict[str, list[float]] = {flow: [] for flow in FLOWS}
+    counts: dict[str, dict[str, int]] = {}
+    with serialize_moto(), LocalPipeline() as pipeline:
+        nested = LocalStateMachine(
+            make_nested_definition(
+                pipeline.state_machines["WorkScheduleMaker"].definition
+            ),
+            pipeline.run_task,
+            NESTED_NAME,
+        )
+        add_sync_overhead(nested, args.sync_ms)
+        pipeline.state_machines[NESTED_NAME] = nested
+        service_counts = add_service_overhead(
+            pipeline, args.transition_ms, args.invoke_ms
+        )
+
+        for i in range(args.repeat):
+            for n, (flow, name) in enumerate(FLOWS.items()):
+                # 毎回ユーザ設定のない社員としてアップロードする
+                user_id = f"{2000000 + i * len(FLOWS) + n}"
+                execution_input = pipeline.upload(
+                    make_sample_work_file(user_id, "初回 太郎", WORK_MONTH)
+                )
+                time.sleep(args.interval)
+                before = dict(service_counts)
+                start = time.perf_counter()
+                report = pipeline.execute(execution_input, name)
+                results[flow].append(time.perf_counter() - start)
+                counts[flow] = {
+                    key: service_counts[key] - before[key]
+                    for key in service_counts
+                }
+                if report.status != "SUCCEEDED":
+                    raise SystemExit(report.format())
+                if not has_user_config(pipeline, user_id):
+                    raise SystemExit(f"{flow}: no user config for {user_id}")
+
+    print(
+        f"overhead: transition {args.transition_ms:.0f}ms, "
+        f"invoke {args.invoke_ms:.0f}ms, sync {args.sync_ms:.0f}ms, "
+        f"{args.repeat} runs per flow"
+    )
+    print(
+        f"{'flow':<10}{'transitions':>12}{'invocations':>12}"
+        f"{'mean':>12}{'median':>12}{'max':>12}"
+    )
+    for flow, elapsed in results.items():
+        print(
+            f"{flow:<10}{counts[flow]['transitions']:>12}"
+            f"{counts[flow]['invocations']:>12}"
+            f"{statistics.mean(elapsed) * 1000:>10.1f}ms"
+            f"{statistics.median(elapsed) * 1000:>10.1f}ms"
+            f"{max(elapsed) * 1000:>10.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+InvertedIndexのQueryとテーブルのScanの比較ベンチマーク
+
+合成した多数ユーザのテーブルで「勤務月ごとのユーザ一覧」と
+「テンプレートごとのユーザ一覧」を取得し、処理時間と読み込み件数を比較する
+
+    # moto上で実行する
+    python -m tools.local_pipeline.bench_index --users 10000
+    # DynamoDB Localで実行する
+    python -m tools.local_pipeline.bench_index --users 10000 \\
+        --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import os
+import time
+from typing import Any, Optional
+
+from tools.local_pipeline.pipeline import INVERTED_INDEX
+
+TABLE_NAME: str = "WorkScheduleIndexBench"
+WORK_MONTHS: list[str] = ["2023-05", "2023-06", "2023-07"]
+TEMPLATE_IDS: list[str] = ["T0001", "T0002", "T0003", "T0004"]
+
+
+def create_table(dynamodb: Any) -> None:
+    """
+    lib/construct/workschedule/datastore.ts と同じ構成のテーブルを作成する
+    """
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "id", "KeyType": "HASH"},
+            {"AttributeName": "SK", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "SK", "AttributeType": "S"},
+            {"AttributeName": "index_pk", "AttributeType": "S"},
+            {"AttributeName": "index_sk", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[INVERTED_INDEX],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.get_waiter("table_exists").wait(TableName=TABLE_NAME)
+
+
+def make_user_items(
+    n: int, rows_per_month: int, month_ratio: float
+) -> list[dict]:
+    """
+    1ユーザ分のユーザ設定・月次集計・勤務データを生成する
+    """
+    user_id = f"{n:07}"
+    template_id = TEMPLATE_IDS[n % len(TEMPLATE_IDS)]
+    items: list[dict] = [
+        {
+            "id": {"S": user_id},
+            "SK": {"S": "UserConfig#LATEST"},
+            "version_sk": {"S": "UserConfig#2023-01-01 00:00:00"},
+            "version": {"N": "1"},
+            "template_id": {"S": template_id},
+            "time_sharing": {"S": "15"},
+            "user_name": {"S": f"社員 {n}"},
+            "index_pk": {"S": f"Template#{template_id}"},
+            "index_sk": {"S": user_id},
+        }
+    ]
+    for i, work_month in enumerate(WORK_MONTHS):
+        # 一部のユーザは勤務月のデータを持たない
+        if (n * 7 + i) % 100 >= month_ratio * 100:
+            continue
+        items.append(
+            {
+                "id": {"S": user_id},
+                "SK": {"S": f"Summary#{work_month}"},
+                "work_minutes": {"N": str(rows_per_month * 480)},
+                "night_minutes": {"N": "0"},
+                "break_minutes": {"N": str(rows_per_month * 60)},
+                "index_pk": {"S": f"Month#{work_month}"},
+                "index_sk": {"S": user_id},
+            }
+        )
+        for day in range(1, rows_per_month + 1):
+            ymd = f"{work_month}-{day:02}"
+            items.append(
+                {
+                    "id": {"S": user_id},
+                    "SK": {"S": f"WorkData#{ymd}#01"},
+                    "datetime": {"S": ymd},
+                    "work_code": {"S": "01"},
+                    "start_datetime": {"S": f"{ymd} 09:00:00"},
+                    "end_datetime": {"S": f"{ymd} 18:00:00"},
+                    "break_hours": {"S": "1:00"},
+                    "work_hours": {"S": "8:00"},
+                    "night_hours": {"S": "0:00"},
+                }
+            )
+    return items
+
+
+def seed(
+    dynamodb: Any, users: int, rows_per_month: int, month_ratio: float
+) -> int:
+    """
+    合成データを登録する
+
+    Returns:
+        int: 登録した項目数
+    """
+    count = 0
+    batch: list[dict] = []
+    for n in range(1, users + 1):
+        for item in make_user_items(n, rows_per_month, month_ratio):
+            batch.append({"PutRequest": {"Item": item}})
+            if len(batch) == 25:
+                count += write_batch(dynamodb, batch)
+                batch = []
+    if batch:
+        count += write_batch(dynamodb, batch)
+    return count
+
+
+def write_batch(dynamodb: Any, batch: list[dict]) -> int:
+    request: dict = {TABLE_NAME: batch}
+    while request:
+        res = dynamodb.batch_write_item(RequestItems=request)
+        request = res.get("UnprocessedItems") or {}
+    return len(batch)
+
+
+def paginate(dynamodb: Any, operation: str, params: dict) -> dict:
+    """
+    Query/Scanを最後まで実行し、件数と処理時間を集計する
+    """
+    method = getattr(dynamodb, operation)
+    params = {**params, "ReturnConsumedCapacity": "TOTAL"}
+    result = {"items": 0, "scanned": 0, "pages": 0, "capacity": 0.0}
+    user_ids: set[str] = set()
+    start = time.perf_counter()
+    while True:
+        res = method(**params)
+        result["pages"] += 1
+        result["items"] += res["Count"]
+        result["scanned"] += res["ScannedCount"]
+        result["capacity"] += float(
+            (res.get("ConsumedCapacity") or {}).get("CapacityUnits", 0)
+        )
+        user_ids.update(item["id"]["S"] for item in res["Items"])
+        if "LastEvaluatedKey" not in res:
+            break
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+    result["seconds"] = time.perf_counter() - start
+    result["user_ids"] = user_ids
+    return result
+
+
+def scenarios(work_month: str, template_id: str) -> list[tuple]:
+    """
+    比較する取得方法(名前, 操作, パラメータ)の一覧
+    """
+    return [
+        (
+            f"month {work_month} scan",
+            "scan",
+            {
+                "TableName": TABLE_NAME,
+                "FilterExpression": "SK = :sk",
+                "ExpressionAttributeValues": {
+                    ":sk": {"S": f"Summary#{work_month}"}
+                },
+                "ProjectionExpression": "id",
+            },
+        ),
+        (
+            f"month {work_month} query",
+            "query",
+            {
+                "TableName": TABLE_NAME,
+                "IndexName": INVERTED_INDEX["IndexName"],
+                "KeyConditionExpression": "index_pk = :pk",
+                "ExpressionAttributeValues": {
+                    ":pk": {"S": f"Month#{work_month}"}
+                },
+                "ProjectionExpression": "id",
+            },
+        ),
+        (
+            f"template {template_id} scan",
+            "scan",
+            {
+                "TableName": TABLE_NAME,
+                "FilterExpression": (
+                    "begins_with(SK, :user_config) AND template_id = :t"
+                ),
+                "ExpressionAttributeValues": {
+                    ":user_config": {"S": "UserConfig"},
+                    ":t": {"S": template_id},
+                },
+                "ProjectionExpression": "id",
+            },
+        ),
+        (
+            f"template {template_id} query",
+            "query",
+            {
+                "TableName": TABLE_NAME,
+                "IndexName": INVERTED_INDEX["IndexName"],
+                "KeyConditionExpression": "index_pk = :pk",
+                "ExpressionAttributeValues": {
+                    ":pk": {"S": f"Template#{template_id}"}
+                },
+                "ProjectionExpression": "id",
+            },
+        ),
+    ]
+
+
+def run(dynamodb: Any, args: argparse.Namespace) -> None:
+    start = time.perf_counter()
+    create_table(dynamodb)
+    count = seed(dynamodb, args.users, args.rows_per_month, args.month_ratio)
+    print(
+        f"seeded {count} items for {args.users} users "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+    print(
+        f"{'scenario':<24} {'users':>7} {'scanned':>9} {'pages':>6} "
+        f"{'RCU':>8} {'seconds':>8}"
+    )
+    results: dict[str, dict] = {}
+    for name, operation, params in scenarios(WORK_MONTHS[-1], TEMPLATE_IDS[0]):
+        result = paginate(dynamodb, operation, params)
+        results[name] = result
+        print(
+            f"{name:<24} {len(result['user_ids']):>7} {result['scanned']:>9} "
+            f"{result['pages']:>6} {result['capacity']:>8.1f} "
+            f"{result['seconds']:>8.3f}"
+        )
+
+    # Scanと同じユーザ一覧が得られることを確認する
+    names = list(results)
+    for scan_name, query_name in zip(names[::2], names[1::2]):
+        if results[scan_name]["user_ids"] != results[query_name]["user_ids"]:
+            raise SystemExit(f"{query_name}: users differ from {scan_name}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--rows-per-month", type=int, default=5)
+    parser.add_argument(
+        "--month-ratio",
+        type=float,
+        default=0.8,
+        help="勤務月ごとに勤務データを持つユーザの割合",
+    )
+    parser.add_argument("--endpoint-url", help="DynamoDB LocalのURL")
+    args = parser.parse_args()
+
+    import boto3
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+    if args.endpoint_url:
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+        run(boto3.client("dynamodb", endpoint_url=args.endpoint_url), args)
+        return
+
+    from moto import mock_aws
+
+    os.environ.update(
+        {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing"}
+    )
+    mock: Optional[Any] = mock_aws()
+    mock.start()
+    try:
+        run(boto3.client("dynamodb"), args)
+    finally:
+        mock.stop()
+
+
+if __name__ == "__main__":
+    main()
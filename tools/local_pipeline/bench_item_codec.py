@@ -0,0 +1,196 @@
+"""
+DynamoDB項目の変換ベンチマーク
+
+boto3のリソース層(TypeDeserializer, Decimal)による変換と、
+workforce_buddy_core.item_codec の低レベルクライアント用の変換を比較する
+
+    python -m tools.local_pipeline.bench_item_codec
+    python -m tools.local_pipeline.bench_item_codec --repeat 2000 --query-repeat 50
+"""
+
+import argparse
+import calendar
+import time
+from typing import Any, Callable
+
+from tools.local_pipeline.pipeline import TABLE_NAME, LocalPipeline
+
+WORK_MONTH: str = "2023-07"
+USER_ID: str = "1234567"
+
+
+def make_work_items(work_month: str) -> list[dict]:
+    """
+    1か月分の勤務データ(DynamoDB形式)を生成する
+    """
+    year, month = map(int, work_month.split("-"))
+    items: list[dict] = []
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        ymd = f"{work_month}-{day:02}"
+        workday = day % 7 not in (1, 2)
+
+        def s(value: str) -> dict:
+            return {"S": value} if workday else {"NULL": True}
+
+        items.append(
+            {
+                "id": {"S": USER_ID},
+                "SK": {"S": f"WorkData#{ymd}#01"},
+                "datetime": {"S": ymd},
+                "date_code": {"S": "0" if workday else "1"},
+                "work_code": s("01"),
+                "start_datetime": s(f"{ymd} 09:00:00"),
+                "end_datetime": s(f"{ymd} 18:00:00"),
+                "break_hours": s("1:00"),
+                "work_hours": s("8:00"),
+                "night_hours": s("0:00"),
+                "memo": {"NULL": True},
+            }
+        )
+    return items
+
+
+CONFIG_ITEMS: dict[str, dict] = {
+    "UserConfig": {
+        "id": {"S": USER_ID},
+        "SK": {"S": "UserConfig#2023-01-01 00:00:00"},
+        "created_at": {"S": "2023-01-01 00:00:00"},
+        "template_id": {"S": "T0001"},
+        "time_sharing": {"S": "15"},
+        "user_name": {"S": "ローカル 太郎"},
+        "version": {"N": "3"},
+    },
+    "TemplateConfig": {
+        "id": {"S": "T0001"},
+        "SK": {"S": "TemplateConfig"},
+        "name": {"S": "template.xlsx"},
+        "year_month_formats": {"S": '{"year": "{year}", "month": "{month}"}'},
+        "year_month_cells": {"S": '{"year": "A1", "month": "B1"}'},
+        "user_name_cell": {"S": "D1"},
+        "start_cells": {"S": '{"work_day": "A5", "start_time": "C5"}'},
+        "version": {"N": "12"},
+    },
+}
+
+
+def timeit(func: Callable[[], Any], repeat: int) -> float:
+    """
+    1回あたりの処理時間(マイクロ秒)を計測する
+    """
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def bench_decode(
+    codec: Any, module: Any, repeat: int
+) -> list[tuple[str, float, float]]:
+    """
+    通信を含まない変換処理のみを比較する
+    """
+    import pandas as pd
+    from boto3.dynamodb.types import TypeDeserializer
+
+    deserializer = TypeDeserializer()
+    work_items = make_work_items(WORK_MONTH)
+
+    def resource_work() -> Any:
+        rows = [
+            {k: deserializer.deserialize(v) for k, v in item.items()}
+            for item in work_items
+        ]
+        return pd.DataFrame(rows)
+
+    def codec_work() -> Any:
+        return pd.DataFrame(
+            codec.decode_string_columns(work_items, module.WORK_DATA_COLUMNS)
+        )
+
+    # 同じ内容になることを確認する
+    expected = resource_work().sort_index(axis=1)
+    actual = codec_work().sort_index(axis=1)
+    assert expected.equals(actual), "work data differs"
+
+    results = [
+        (
+            f"WorkData x{len(work_items)} -> DataFrame",
+            timeit(resource_work, repeat),
+            timeit(codec_work, repeat),
+        )
+    ]
+    for name, item in CONFIG_ITEMS.items():
+
+        def resource_config(item: dict = item) -> Any:
+            return {k: deserializer.deserialize(v) for k, v in item.items()}
+
+        def codec_config(item: dict = item) -> Any:
+            return codec.decode_item(item)
+
+        assert resource_config() == codec_config(), f"{name} differs"
+        results.append(
+            (
+                name,
+                timeit(resource_config, repeat * 10),
+                timeit(codec_config, repeat * 10),
+            )
+        )
+
+    return results
+
+
+def bench_query(module: Any, repeat: int) -> tuple[str, float, float]:
+    """
+    moto上のテーブルからの取得を含めて比較する
+    """
+    import boto3
+    import pandas as pd
+    from boto3.dynamodb.conditions import Key
+
+    client = boto3.client("dynamodb")
+    for item in make_work_items(WORK_MONTH):
+        client.put_item(TableName=TABLE_NAME, Item=item)
+    table = boto3.resource("dynamodb").Table(TABLE_NAME)
+
+    def resource_query() -> Any:
+        items = table.query(
+            KeyConditionExpression=Key("id").eq(USER_ID)
+            & Key("SK").begins_with(f"WorkData#{WORK_MONTH}")
+        )["Items"]
+        return pd.DataFrame(items)
+
+    def codec_query() -> Any:
+        return module.get_work_data(TABLE_NAME, USER_ID, WORK_MONTH)
+
+    return (
+        "query WorkData (moto)",
+        timeit(resource_query, repeat),
+        timeit(codec_query, repeat),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--query-repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    # motoの起動後にLambdaのモジュールを読み込む
+    with LocalPipeline() as pipeline:
+        from workforce_buddy_core import item_codec
+
+        module = pipeline.modules["CreateWorkSchedule"]
+        results = bench_decode(item_codec, module, args.repeat)
+        results.append(bench_query(module, args.query_repeat))
+
+    print(f"{'case':<32} {'resource us':>12} {'codec us':>10} {'speedup':>8}")
+    for name, resource_us, codec_us in results:
+        print(
+            f"{name:<32} {resource_us:>12.1f} {codec_us:>10.1f} "
+            f"{resource_us / codec_us:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+ステートマシン経由とRunWorkScheduleでの同期実行(direct)の処理時間の比較
+
+ローカルのステートマシンにはStep Functionsの状態遷移の、Lambdaの呼び出しには
+Lambdaの呼び出しの待ち時間を模した待ち時間を加え、同じユーザの1か月分の
+勤務データのアップロードから勤務表の送信までの時間を比較する
+(ユーザ設定の作成を含む初回の実行は除く)
+Slackへの送信レートの制限(1秒に1件程度)で待たないよう、実行の間隔を空ける
+
+    python -m tools.local_pipeline.bench_modes
+    python -m tools.local_pipeline.bench_modes --transition-ms 40 \\
+        --invoke-ms 30 --repeat 20
+"""
+
+import argparse
+import statistics
+import time
+import warnings
+from typing import Any
+
+from tools.load_test.harness import serialize_moto
+from tools.local_pipeline.pipeline import LocalPipeline, make_sample_work_file
+
+USER_ID: str = "1234567"
+WORK_MONTH: str = "2023-07"
+
+MODES: list[str] = ["statemachine", "direct"]
+
+
+def add_service_overhead(
+    pipeline: LocalPipeline, transition_ms: float, invoke_ms: float
+) -> dict[str, int]:
+    """
+    ステートの実行とLambdaの呼び出しに待ち時間を加える
+
+    Returns:
+        dict[str, int]: 状態遷移とLambdaの呼び出しの回数(実行中に加算する)
+    """
+    counts: dict[str, int] = {"transitions": 0, "invocations": 0}
+
+    for machine in pipeline.state_machines.values():
+
+        def run_state(*args: Any, run_state: Any = machine._run_state) -> Any:
+            counts["transitions"] += 1
+            time.sleep(transition_ms / 1000)
+            return run_state(*args)
+
+        machine._run_state = run_state
+
+    for name, function in list(pipeline.functions.items()):
+
+        def invoke(event: Any, context: Any, function: Any = function) -> Any:
+            counts["invocations"] += 1
+            time.sleep(invoke_ms / 1000)
+            return function(event, context)
+
+        pipeline.functions[name] = invoke
+
+    return counts
+
+
+def run_mode(pipeline: LocalPipeline, mode: str, content: bytes) -> float:
+    """
+    アップロードから勤務表の送信までを実行し、経過時間を返す
+    """
+    execution_input = pipeline.upload(content)
+    start = time.perf_counter()
+    if mode == "statemachine":
+        report = pipeline.execute(execution_input)
+        if report.status != "SUCCEEDED":
+            raise SystemExit(report.format())
+    else:
+        res = pipeline.invoke("RunWorkSchedule", execution_input)
+        if res.get("mode") != "direct":
+            raise SystemExit(f"not run directly: {res}")
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--transition-ms",
+        type=float,
+        default=25,
+        help="Step Functionsの状態遷移ごとの待ち時間",
+    )
+    parser.add_argument(
+        "--invoke-ms",
+        type=float,
+        default=20,
+        help="Lambdaの呼び出しごとの待ち時間",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=2.0,
+        help="実行の間隔(秒, Slackへの送信レートの制限で待たないようにする)",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    # 勤務表作成で大量に出力されるpandasの警告は表示しない
+    from pandas.errors import SettingWithCopyWarning
+
+    warnings.simplefilter("ignore", SettingWithCopyWarning)
+
+    results: dict[str, list[float]] = {mode: [] for mode in MODES}
+    counts: dict[str, dict[str, int]] = {}
+    with serialize_moto(), LocalPipeline() as pipeline:
+        # ユーザ設定を作成する(初回の実行は比較に含めない)
+        run_mode(
+            pipeline,
+            "statemachine",
+            make_sample_work_file(USER_ID, "ローカル 太郎", WORK_MONTH),
+        )
+        service_counts = add_service_overhead(
+            pipeline, args.transition_ms, args.invoke_ms
+        )
+
+        for i in range(args.repeat):
+            for mode in MODES:
+                # 前回と同じ内容のアップロードとして扱われないよう終了時刻を変える
+                content = make_sample_work_file(
+                    USER_ID, "ローカル 太郎", WORK_MONTH
+                ).replace(
+                    b"18:00", f"18:{i * 2 + MODES.index(mode):02}".encode()
+                )
+                time.sleep(args.interval)
+                before = dict(service_counts)
+                results[mode].append(run_mode(pipeline, mode, content))
+                counts[mode] = {
+                    key: service_counts[key] - before[key]
+                    for key in service_counts
+                }
+
+    print(
+        f"overhead: transition {args.transition_ms:.0f}ms, "
+        f"invoke {args.invoke_ms:.0f}ms, {args.repeat} runs per mode"
+    )
+    print(
+        f"{'mode':<14}{'transitions':>12}{'invocations':>12}"
+        f"{'mean':>12}{'median':>12}{'max':>12}"
+    )
+    for mode, elapsed in results.items():
+        print(
+            f"{mode:<14}{counts[mode]['transitions']:>12}"
+            f"{counts[mode]['invocations']:>12}"
+            f"{statistics.mean(elapsed) * 1000:>10.1f}ms"
+            f"{statistics.median(elapsed) * 1000:>10.1f}ms"
+            f"{max(elapsed) * 1000:>10.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
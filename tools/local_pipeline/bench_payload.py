@@ -0,0 +1,249 @@
+"""
+ステートのペイロードサイズと処理時間のベンチマーク
+
+設定の参照(キー・バージョン)のみを受け渡す現在のASL定義と、
+ユーザ設定・テンプレート設定の項目全体を受け渡す定義を比較する
+設定の項目に詰め物をして、設定が大きくなった場合の影響も確認する
+
+    python -m tools.local_pipeline.bench_payload
+    python -m tools.local_pipeline.bench_payload --months 3 \\
+        --config-bytes 0 16384 65536 --repeat 5
+"""
+
+import argparse
+import copy
+import json
+import statistics
+from typing import Any
+
+from tools.local_pipeline.asl import ExecutionReport, LocalStateMachine
+from tools.local_pipeline.pipeline import (
+    DEFAULT_TEMPLATE_ID,
+    TABLE_NAME,
+    LocalPipeline,
+    make_sample_work_file,
+)
+
+USER_ID: str = "1234567"
+FIRST_MONTH: tuple[int, int] = (2023, 5)
+
+# Step Functionsのペイロードの上限(バイト)
+PAYLOAD_LIMIT: int = 256 * 1024
+
+# 処理時間を表示するステート
+TIMED_STATES: list[str] = [
+    "Parallel/GetTemplateConfig",
+    "Parallel/Map",
+    "Parallel/Map/CreateWorkSchedule Invoke",
+    "Parallel/SendWorkSchedule Invoke",
+]
+
+
+def embed_configs(definition: dict) -> dict:
+    """
+    設定の項目全体をMapの各反復とSendWorkScheduleへ渡す定義に変換する
+    (参照渡しにする前の定義)
+    """
+    definition = copy.deepcopy(definition)
+    states: dict = definition["States"]["Parallel"]["Branches"][0]["States"]
+
+    for state_name in ["GetUserConfig", "GetTemplateConfig"]:
+        parameters: dict = states[state_name]["Parameters"]
+        parameters.pop("ProjectionExpression", None)
+        parameters.pop("ExpressionAttributeNames", None)
+    states["Map"]["ItemSelector"] = {
+        "work_months.$": "$$.Map.Item.Value",
+        "work_info.$": "$.work_info",
+        "user_config.$": "$.user_config",
+        "template_config.$": "$.template_config",
+    }
+    send: dict = states["SendWorkSchedule Invoke"]["Parameters"]
+    states["SendWorkSchedule Invoke"]["Parameters"] = {
+        "Payload.$": "$",
+        "FunctionName": send["FunctionName"],
+    }
+
+    return definition
+
+
+def make_work_file(months: int) -> bytes:
+    """
+    複数月分の勤務データファイルを生成する
+    """
+    year, month = FIRST_MONTH
+    lines: list[bytes] = []
+    for i in range(months):
+        work_month = (
+            f"{year + (month - 1 + i) // 12}-{(month - 1 + i) % 12 + 1:02}"
+        )
+        content = make_sample_work_file(USER_ID, "ローカル 太郎", work_month)
+        file_lines = content.split(b"\r\n")[:-1]
+        lines.extend(file_lines if i == 0 else file_lines[1:])
+
+    return b"\r\n".join(lines) + b"\r\n"
+
+
+def pad_configs(config_bytes: int) -> None:
+    """
+    デフォルトのユーザ設定とテンプレート設定に詰め物の属性を追加する
+    (作成済みのユーザ設定は削除し、次の実行で作り直す)
+    """
+    import boto3
+
+    dynamodb = boto3.client("dynamodb")
+    note: dict = {"S": "x" * config_bytes} if config_bytes else {"NULL": True}
+    for user_id in ["0000000", USER_ID]:
+        items = dynamodb.query(
+            TableName=TABLE_NAME,
+            KeyConditionExpression="id = :id AND begins_with(SK, :sk)",
+            ExpressionAttributeValues={
+                ":id": {"S": user_id},
+                ":sk": {"S": "UserConfig"},
+            },
+        )["Items"]
+        for item in items:
+            if user_id == USER_ID:
+                dynamodb.delete_item(
+                    TableName=TABLE_NAME,
+                    Key={"id": item["id"], "SK": item["SK"]},
+                )
+            else:
+                dynamodb.put_item(
+                    TableName=TABLE_NAME, Item={**item, "note": note}
+                )
+
+    template = dynamodb.get_item(
+        TableName=TABLE_NAME,
+        Key={"id": {"S": DEFAULT_TEMPLATE_ID}, "SK": {"S": "TemplateConfig"}},
+    )["Item"]
+    version = int(template.get("version", {"N": "0"})["N"]) + 1
+    dynamodb.put_item(
+        TableName=TABLE_NAME,
+        Item={**template, "note": note, "version": {"N": str(version)}},
+    )
+
+
+def forget_uploads(slack_user_id: str = "ULOCAL") -> None:
+    """
+    アップロードの記録(Upload#)を削除する
+    (同じ内容の再アップロードとして勤務表の作成が省略されないようにする)
+    """
+    import boto3
+
+    dynamodb = boto3.client("dynamodb")
+    items = dynamodb.query(
+        TableName=TABLE_NAME,
+        KeyConditionExpression="id = :id AND begins_with(SK, :sk)",
+        ExpressionAttributeValues={
+            ":id": {"S": slack_user_id},
+            ":sk": {"S": "Upload#"},
+        },
+        ProjectionExpression="id, SK",
+    )["Items"]
+    for item in items:
+        dynamodb.delete_item(TableName=TABLE_NAME, Key=item)
+
+
+def run_variant(
+    pipeline: LocalPipeline,
+    machine: LocalStateMachine,
+    content: bytes,
+    repeat: int,
+) -> dict:
+    """
+    1回のウォームアップの後に指定回数実行し、計測結果を集計する
+    """
+    payload_bytes: dict[str, int] = {}
+    run_task = machine.task_handler
+
+    def measured_task(resource: str, parameters: Any) -> Any:
+        if resource.endswith("lambda:invoke"):
+            name = parameters["FunctionName"]
+            size = len(json.dumps(parameters.get("Payload")))
+            payload_bytes[name] = max(payload_bytes.get(name, 0), size)
+        return run_task(resource, parameters)
+
+    machine.task_handler = measured_task
+    pipeline.modules["CreateWorkSchedule"].invalidate_config_cache()
+    reports: list[ExecutionReport] = []
+    try:
+        for i in range(repeat + 1):
+            forget_uploads()
+            report = machine.execute(pipeline.upload(content))
+            if report.status != "SUCCEEDED":
+                raise SystemExit(f"{machine.name}: {report.format()}")
+            if i > 0:
+                reports.append(report)
+    finally:
+        machine.task_handler = run_task
+
+    max_state_bytes = max(
+        max(timing.max_input_bytes, timing.max_output_bytes)
+        for report in reports
+        for timing in report.timings.values()
+    )
+    result: dict = {
+        "elapsed": statistics.mean(report.elapsed for report in reports),
+        "max_state_bytes": max_state_bytes,
+        "payload_bytes": payload_bytes,
+        "states": {},
+    }
+    for name in TIMED_STATES:
+        timings = [r.timings[name] for r in reports if name in r.timings]
+        result["states"][name] = sum(t.total for t in timings) / sum(
+            t.count for t in timings
+        )
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument(
+        "--config-bytes", type=int, nargs="+", default=[0, 16384, 65536]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    content = make_work_file(args.months)
+    rows: list[tuple[int, str, dict]] = []
+    with LocalPipeline() as pipeline:
+        compact = pipeline.state_machines["WorkScheduleMaker"]
+        embedded = LocalStateMachine(
+            embed_configs(compact.definition),
+            pipeline.run_task,
+            "WorkScheduleMakerEmbedded",
+        )
+        for config_bytes in args.config_bytes:
+            pad_configs(config_bytes)
+            for name, machine in [("embedded", embedded), ("ref", compact)]:
+                result = run_variant(pipeline, machine, content, args.repeat)
+                rows.append((config_bytes, name, result))
+
+    print(
+        f"{'config':>7} {'mode':<9} {'state max':>10} {'create in':>10} "
+        f"{'send in':>8} {'elapsed':>8}  "
+        + " ".join(
+            f"{name.rsplit('/', 1)[-1][:18]:>18}" for name in TIMED_STATES
+        )
+    )
+    for config_bytes, name, result in rows:
+        payload = result["payload_bytes"]
+        over = " *" if result["max_state_bytes"] > PAYLOAD_LIMIT else ""
+        print(
+            f"{config_bytes:>7} {name:<9} {result['max_state_bytes']:>10} "
+            f"{payload.get('CreateWorkSchedule', 0):>10} "
+            f"{payload.get('SendWorkSchedule', 0):>8} "
+            f"{result['elapsed'] * 1000:>6.1f}ms  "
+            + " ".join(
+                f"{result['states'][state] * 1000:>16.1f}ms"
+                for state in TIMED_STATES
+            )
+            + over
+        )
+    print(f"* exceeds the {PAYLOAD_LIMIT}-byte Step Functions payload limit")
+
+
+if __name__ == "__main__":
+    main()
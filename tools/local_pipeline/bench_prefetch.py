@@ -0,0 +1,225 @@
+"""
+CreateWorkScheduleの入出力の並行化のベンチマーク
+
+motoの呼び出しにネットワークの遅延を模した待ち時間を加え、以前の処理
+(勤務データの取得・テンプレートファイルの取得を順に行う)と
+現在のlogic(勤務データとテンプレートファイルを並行して取得する)の
+ステージごとの時間を比較する
+
+    python -m tools.local_pipeline.bench_prefetch
+    python -m tools.local_pipeline.bench_prefetch --query-ms 80 --get-ms 60 \\
+        --put-ms 90 --config-ms 15 --cold --repeat 10
+"""
+
+import argparse
+import importlib
+import logging
+import statistics
+import time
+from typing import Any, Callable
+
+from tools.load_test.harness import serialize_moto
+from tools.local_pipeline.pipeline import (
+    BUCKET_NAME,
+    TABLE_NAME,
+    LocalPipeline,
+    make_sample_work_file,
+)
+
+USER_ID: str = "1234567"
+WORK_MONTH: str = "2023-07"
+
+# 表示するステート(順に実行した場合の順序)
+STAGES: list[str] = [
+    "resolve_configs",
+    "get_work_data",
+    "wait_work_data",
+    "convert_work_data",
+    "get_template_file",
+    "wait_template_file",
+    "create_work_schedule",
+    "put_work_schedule",
+]
+
+
+class TimingsHandler(logging.Handler):
+    """
+    logicが出力するステージごとの処理時間(timings)を取り出す
+    """
+
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.timings: list[dict[str, float]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        fields: dict = getattr(record, "fields", None) or {}
+        if "timings" in fields:
+            self.timings.append(fields["timings"])
+
+
+def add_latency(client: Any, operation: str, milliseconds: float) -> None:
+    """
+    クライアントの呼び出しに待ち時間を加える
+
+    motoへの呼び出しを直列化するロックの外で待つため、並行した呼び出しの
+    待ち時間は重なる
+    """
+
+    def delay(**kwargs: Any) -> None:
+        time.sleep(milliseconds / 1000)
+
+    client.meta.events.register(f"before-call.{operation}", delay)
+
+
+def run_sequential(module: Any, event: dict) -> dict[str, float]:
+    """
+    以前のlogic(入出力を順に行う)
+    """
+    timings: dict[str, float] = {}
+    measure = module.measure
+    with measure(timings, "resolve_configs"):
+        user_config, template = module.resolve_configs(event, TABLE_NAME)
+    with measure(timings, "get_work_data"):
+        work_df = module.get_work_data(
+            TABLE_NAME, user_config["id"], WORK_MONTH
+        )
+    with measure(timings, "convert_work_data"):
+        converted_work_df = module.convert_work_data(
+            WORK_MONTH, work_df, user_config
+        )
+    with measure(timings, "get_template_file"):
+        template_file = module.get_template_file(BUCKET_NAME, template)
+    with measure(timings, "create_work_schedule"):
+        work_schedule_file = module.create_work_schedule(
+            template_file, template, user_config, WORK_MONTH, converted_work_df
+        )
+    with measure(timings, "put_work_schedule"):
+        object_name, etag = module.put_work_schedule(
+            BUCKET_NAME, user_config["id"], WORK_MONTH, work_schedule_file
+        )
+    module.create_response(WORK_MONTH, BUCKET_NAME, object_name, etag)
+    return timings
+
+
+def run(
+    module: Any,
+    func: Callable[[], dict[str, float]],
+    repeat: int,
+    cold: bool,
+) -> tuple[list[float], list[dict[str, float]]]:
+    """
+    1回のウォームアップの後に指定回数実行する
+    """
+    elapsed: list[float] = []
+    timings: list[dict[str, float]] = []
+    for i in range(repeat + 1):
+        if cold:
+            module.invalidate_config_cache()
+        start = time.perf_counter()
+        stage_timings = func()
+        if i > 0:
+            elapsed.append(time.perf_counter() - start)
+            timings.append(stage_timings)
+    return elapsed, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--query-ms", type=float, default=60)
+    parser.add_argument("--get-ms", type=float, default=40)
+    parser.add_argument("--put-ms", type=float, default=60)
+    parser.add_argument(
+        "--config-ms",
+        type=float,
+        default=10,
+        help="設定の取得(GetItem)の待ち時間",
+    )
+    parser.add_argument(
+        "--cold", action="store_true", help="設定のキャッシュを毎回破棄する"
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with serialize_moto(), LocalPipeline() as pipeline:
+        # 勤務データとユーザ設定を登録する
+        report = pipeline.execute(
+            pipeline.upload(
+                make_sample_work_file(USER_ID, "ローカル 太郎", WORK_MONTH)
+            )
+        )
+        if report.status != "SUCCEEDED":
+            raise SystemExit(report.format())
+
+        core = importlib.import_module("workforce_buddy_core")
+        module = pipeline.modules["CreateWorkSchedule"]
+        latest = core.get_latest_user_config(TABLE_NAME, USER_ID)
+        template_item = module.get_config_item(
+            TABLE_NAME, latest["template_id"]["S"], "TemplateConfig"
+        )
+        event: dict = {
+            "work_months": WORK_MONTH,
+            "user_config_key": {
+                "id": USER_ID,
+                "SK": latest["version_sk"]["S"],
+            },
+            "template_ref": {
+                key: template_item[key]
+                for key in ["id", "version"]
+                if key in template_item
+            },
+        }
+
+        dynamodb = module.get_client("dynamodb")
+        s3 = module.get_client("s3")
+        add_latency(dynamodb, "dynamodb.Query", args.query_ms)
+        add_latency(dynamodb, "dynamodb.GetItem", args.config_ms)
+        add_latency(s3, "s3.GetObject", args.get_ms)
+        add_latency(s3, "s3.PutObject", args.put_ms)
+
+        handler = TimingsHandler()
+        module.logger.logger.addHandler(handler)
+
+        def run_prefetch() -> dict[str, float]:
+            pipeline.invoke("CreateWorkSchedule", event)
+            return handler.timings[-1]
+
+        results = {
+            "sequential": run(
+                module,
+                lambda: run_sequential(module, event),
+                args.repeat,
+                args.cold,
+            ),
+            "prefetch": run(module, run_prefetch, args.repeat, args.cold),
+        }
+        module.logger.logger.removeHandler(handler)
+
+    slowest_io = max(args.query_ms, args.get_ms, args.put_ms)
+    print(
+        f"latency: query {args.query_ms:.0f}ms, get {args.get_ms:.0f}ms, "
+        f"put {args.put_ms:.0f}ms, config {args.config_ms:.0f}ms, "
+        f"{'cold' if args.cold else 'warm'} caches, "
+        f"slowest single I/O {slowest_io:.0f}ms"
+    )
+    print(f"{'stage':<22}" + "".join(f"{mode:>12}" for mode in results))
+    for stage in STAGES:
+        cells = []
+        for elapsed, timings in results.values():
+            values = [t[stage] for t in timings if stage in t]
+            cells.append(
+                f"{statistics.mean(values) * 1000:>10.1f}ms"
+                if values
+                else f"{'-':>12}"
+            )
+        print(f"{stage:<22}" + "".join(cells))
+    print(
+        f"{'total':<22}"
+        + "".join(
+            f"{statistics.mean(elapsed) * 1000:>10.1f}ms"
+            for elapsed, _ in results.values()
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
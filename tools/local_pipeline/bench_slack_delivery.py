@@ -0,0 +1,220 @@
+"""
+Slackへの一括送信のベンチマーク
+
+レート制限を課したSlackのスタンドインに対して、複数のコンテナが勤務表の
+送信(ファイルのアップロードとメッセージの送信)を同時に行う
+以前の送信方法(順に呼び出し、429は2回まで再試行、失敗した時点で中断)と
+SlackDeliverySchedulerによる送信を比較する
+
+    python -m tools.local_pipeline.bench_slack_delivery
+    python -m tools.local_pipeline.bench_slack_delivery --executions 60 \\
+        --files 3 --containers 8 --rate-window 10 \\
+        --limit chat.postMessage=10 --limit files.getUploadURLExternal=16 \\
+        --limit files.completeUploadExternal=16
+"""
+
+import argparse
+import importlib
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable
+
+from tools.local_pipeline.fake_slack import FakeSlackServer
+from tools.local_pipeline.pipeline import add_lambda_paths
+
+TOKEN: str = "xoxb-local"
+CONTENT: bytes = b"x" * 8192
+
+
+def parse_limits(values: list[str]) -> dict[str, int]:
+    """
+    'メソッド名=集計期間あたりの上限' の一覧を変換する
+    """
+    limits: dict[str, int] = {}
+    for value in values:
+        method, _, limit = value.partition("=")
+        limits[method] = int(limit)
+    return limits
+
+
+def deliver_direct(core: Any, files: int, channel: str) -> None:
+    """
+    以前の送信方法(ファイルを順にアップロードし、最初のエラーで中断する)
+    """
+    client = core.get_slack_client(TOKEN)
+    links: list[str] = []
+    for i in range(files):
+        res = client.files_upload_v2(
+            title=f"{i}.xlsx", filename=f"{i}.xlsx", content=CONTENT
+        )
+        links.append(res["file"]["id"])
+    client.chat_postMessage(channel=channel, text="\n".join(links))
+
+
+def make_deliver_scheduled(
+    scheduler: Any, upload_methods: tuple[str, ...]
+) -> Callable[[Any, int, str], None]:
+    """
+    スケジューラによる送信(ファイルごとに並行して送信し、ファイルごとに再試行する)
+    """
+
+    def deliver(core: Any, files: int, channel: str) -> None:
+        client = scheduler.client
+
+        def upload(i: int) -> str:
+            res = scheduler.call(
+                upload_methods,
+                lambda: client.files_upload_v2(
+                    title=f"{i}.xlsx", filename=f"{i}.xlsx", content=CONTENT
+                ),
+            )
+            return res["file"]["id"]
+
+        links = scheduler.map(upload, list(range(files)))
+        scheduler.call(
+            ["chat.postMessage"],
+            lambda: client.chat_postMessage(
+                channel=channel, text="\n".join(links)
+            ),
+            idempotent=False,
+        )
+
+    return deliver
+
+
+def run(mode: str, args: argparse.Namespace) -> dict:
+    """
+    コンテナごとのスレッドで送信を処理し、結果を集計する
+    """
+    limits = parse_limits(args.limit)
+    slack = FakeSlackServer(
+        rate_limits=limits, rate_window=args.rate_window
+    ).start()
+    os.environ["SLACK_API_URL"] = slack.api_url
+    add_lambda_paths()
+    core = importlib.import_module("workforce_buddy_core")
+    delivery = importlib.import_module("workforce_buddy_core.slack_delivery")
+    core.reset_clients()
+
+    # スケジューラの上限はSlackのスタンドインと同じ割合(1分あたり)にする
+    per_minute = {
+        method: limit * 60 / args.rate_window
+        for method, limit in limits.items()
+    }
+    jobs: "queue.Queue[int]" = queue.Queue()
+    for n in range(args.executions):
+        jobs.put(n)
+    results: dict = {"succeeded": 0, "failed": 0, "errors": {}}
+    lock = threading.Lock()
+
+    def container() -> None:
+        # コンテナごとにトークンバケットを持つ(Lambdaのコンテナは別プロセス)
+        scheduler = delivery.SlackDeliveryScheduler(
+            core.get_slack_client(TOKEN, rate_limit_retries=0),
+            rate_limits=per_minute,
+        )
+        deliver = (
+            deliver_direct
+            if mode == "direct"
+            else make_deliver_scheduled(
+                scheduler,
+                ("files.getUploadURLExternal", "files.completeUploadExternal"),
+            )
+        )
+        while True:
+            try:
+                n = jobs.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                deliver(core, args.files, f"C{n % args.channels:06}")
+                with lock:
+                    results["succeeded"] += 1
+            except Exception as err:
+                name = type(err).__name__
+                with lock:
+                    results["failed"] += 1
+                    results["errors"][name] = (
+                        results["errors"].get(name, 0) + 1
+                    )
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=container) for _ in range(args.containers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results["elapsed"] = time.perf_counter() - start
+    results["rate_limited"] = sum(slack.state.rate_limited.values())
+    results["messages"] = len(slack.state.messages)
+
+    core.reset_clients()
+    slack.stop()
+    os.environ.pop("SLACK_API_URL", None)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--executions", type=int, default=60)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--containers", type=int, default=8)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument(
+        "--rate-window",
+        type=float,
+        default=10,
+        help="Slackのスタンドインのレート制限の集計期間(秒)",
+    )
+    parser.add_argument(
+        "--limit",
+        action="append",
+        metavar="METHOD=N",
+        help="集計期間あたりの上限",
+    )
+    parser.add_argument("--modes", nargs="+", default=["direct", "scheduler"])
+    args = parser.parse_args()
+    if not args.limit:
+        # Slackの1分あたりの上限(60, 100, 100)を集計期間に合わせる
+        args.limit = [
+            f"chat.postMessage={round(60 * args.rate_window / 60)}",
+            f"files.getUploadURLExternal={round(100 * args.rate_window / 60)}",
+            f"files.completeUploadExternal={round(100 * args.rate_window / 60)}",
+        ]
+
+    # 1分あたりに送信できる勤務表の上限
+    limits = parse_limits(args.limit)
+    per_minute = {m: n * 60 / args.rate_window for m, n in limits.items()}
+    ceiling = min(
+        per_minute.get("chat.postMessage", float("inf")),
+        per_minute.get("files.getUploadURLExternal", float("inf"))
+        / args.files,
+        per_minute.get("files.completeUploadExternal", float("inf"))
+        / args.files,
+    )
+
+    print(
+        f"{args.executions} executions x {args.files} files, "
+        f"{args.containers} containers, limits {limits} "
+        f"per {args.rate_window:.0f}s, ceiling {ceiling:.1f} executions/min"
+    )
+    print(
+        f"{'mode':<10} {'ok':>5} {'failed':>6} {'429s':>6} {'seconds':>8} "
+        f"{'exec/min':>9} {'of ceiling':>10}  errors"
+    )
+    for mode in args.modes:
+        result = run(mode, args)
+        rate = result["succeeded"] / result["elapsed"] * 60
+        print(
+            f"{mode:<10} {result['succeeded']:>5} {result['failed']:>6} "
+            f"{result['rate_limited']:>6} {result['elapsed']:>8.1f} "
+            f"{rate:>9.1f} {rate / ceiling:>10.0%}  {result['errors']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+チーム勤務表作成のベンチマーク
+
+メンバー数ごとに書き込み専用モードでチーム勤務表を作成し、
+処理時間とPythonヒープの最大使用量を計測する
+
+    python -m tools.local_pipeline.bench_team_report
+    python -m tools.local_pipeline.bench_team_report --sizes 10 100 500
+"""
+
+import argparse
+import calendar
+import importlib
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from typing import Iterator
+
+from tools.local_pipeline.pipeline import add_lambda_paths
+
+DEFAULT_SIZES: list[int] = [50, 100, 250, 500]
+
+
+def make_members(
+    size: int, work_month: str
+) -> Iterator[tuple[dict, list[dict]]]:
+    """
+    メンバー1人ずつのユーザ設定と勤務データ(DynamoDBの項目形式)を生成する
+
+    Args:
+        size (int): メンバー数
+        work_month (str): 勤務月(ex: '2023-07')
+
+    Yields:
+        tuple[dict, list[dict]]: ユーザ設定, 勤務データのリスト
+    """
+    year, month = map(int, work_month.split("-"))
+    for n in range(size):
+        user_id = f"{n:07}"
+        work_data: list[dict] = []
+        for day in range(1, calendar.monthrange(year, month)[1] + 1):
+            if date(year, month, day).weekday() >= 5:
+                continue
+            ymd = f"{year}-{month:02}-{day:02}"
+            work_data.append(
+                {
+                    "id": user_id,
+                    "SK": f"WorkData#{ymd}#01",
+                    "datetime": ymd,
+                    "date_code": "0",
+                    "work_code": "01",
+                    "start_datetime": f"{ymd} 09:00:00",
+                    "end_datetime": f"{ymd} 18:00:00",
+                    "break_hours": "1:00",
+                    "work_hours": "8:00",
+                    "night_hours": "0:00",
+                    "memo": None,
+                }
+            )
+        user_config = {
+            "id": user_id,
+            "user_name": f"社員 {n}",
+            "time_sharing": "15",
+        }
+        yield user_config, work_data
+
+
+def run(size: int, work_month: str, module) -> dict:
+    """
+    指定したメンバー数でチーム勤務表を作成し、計測結果を返す
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "team_report.xlsx")
+        tracemalloc.start()
+        start = time.perf_counter()
+        sheets = module.write_team_report(
+            path, work_month, make_members(size, work_month)
+        )
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        file_bytes = os.path.getsize(path)
+
+    return {
+        "members": size,
+        "sheets": sheets,
+        "seconds": elapsed,
+        "peak_mib": peak / 1024 / 1024,
+        "file_kib": file_bytes / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--work-month", default="2023-07")
+    args = parser.parse_args()
+
+    add_lambda_paths()
+    os.environ.setdefault("AWS_DEFAULT_REGION", "ap-northeast-1")
+    module = importlib.import_module("create_team_report.create_team_report")
+
+    print(
+        f"{'members':>8} {'sheets':>7} {'seconds':>9} "
+        f"{'peak MiB':>9} {'file KiB':>9}"
+    )
+    for size in args.sizes:
+        result = run(size, args.work_month, module)
+        print(
+            f"{result['members']:>8} {result['sheets']:>7} "
+            f"{result['seconds']:>9.2f} {result['peak_mib']:>9.2f} "
+            f"{result['file_kib']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
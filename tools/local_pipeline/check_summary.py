@@ -0,0 +1,165 @@
+"""
+月次集計(Summary#yyyy-mm)の整合性チェック
+
+勤務データ(WorkData#)から月次集計を再計算し、差分更新された
+Summary#yyyy-mmの値と一致するかを確認する
+
+    # moto上でランダムな登録・再登録・競合する登録を行って確認する
+    python -m tools.local_pipeline.check_summary --rounds 20
+    # 実際のテーブルを確認する
+    python -m tools.local_pipeline.check_summary --table WorkScheduleTable
+"""
+
+import argparse
+import importlib
+import random
+import sys
+from typing import Any
+
+from tools.local_pipeline.pipeline import TABLE_NAME, LocalPipeline
+
+HOURS: list[str] = ["", "0:00", "0:45", "1:00", "7:30", "8:00", "9:15"]
+
+
+def scan_table(table_name: str) -> list[dict]:
+    """
+    テーブルの全項目を取得する
+    """
+    import boto3
+
+    table = boto3.resource("dynamodb").Table(table_name)
+    items: list[dict] = []
+    query: dict = {}
+    while True:
+        res = table.scan(**query)
+        items.extend(res["Items"])
+        if "LastEvaluatedKey" not in res:
+            return items
+        query["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+
+def check_table(table_name: str, store_module: Any) -> list[str]:
+    """
+    月次集計と勤務データからの再計算結果を比較する
+
+    Returns:
+        list[str]: 不一致の内容(一致している場合は空)
+    """
+    rows_by_user: dict[str, list[dict]] = {}
+    summaries: dict[tuple[str, str], dict] = {}
+    for item in scan_table(table_name):
+        if item["SK"].startswith("WorkData#"):
+            rows_by_user.setdefault(item["id"], []).append(item)
+        elif item["SK"].startswith("Summary#"):
+            summaries[(item["id"], item["SK"][len("Summary#") :])] = item
+
+    expected: dict[tuple[str, str], dict] = {}
+    for user_id, rows in rows_by_user.items():
+        for month, summary in store_module.summarize_work_data(rows).items():
+            expected[(user_id, month)] = summary
+
+    errors: list[str] = []
+    for key in sorted(set(expected) | set(summaries)):
+        want = expected.get(key, dict.fromkeys(store_module.SUMMARY_FIELDS, 0))
+        got = summaries.get(key, {})
+        for field in store_module.SUMMARY_FIELDS:
+            if int(got.get(field, 0)) != want[field]:
+                errors.append(
+                    f"{key[0]} {key[1]} {field}: "
+                    f"summary={int(got.get(field, 0))}, recomputed={want[field]}"
+                )
+
+    return errors
+
+
+def random_rows(rng: random.Random, user_id: str) -> list[dict]:
+    """
+    ランダムな勤務データ(store_work_dataへ渡す形式)を生成する
+    """
+    rows: list[dict] = []
+    month = rng.choice(["2023-06", "2023-07", "2023-08"])
+    for day in rng.sample(range(1, 29), rng.randint(1, 28)):
+        ymd = f"{month}-{day:02}"
+        for work_num in range(1, rng.choice([1, 1, 1, 2]) + 1):
+            work_hours = rng.choice(HOURS) or None
+            rows.append(
+                {
+                    "id": user_id,
+                    "SK": f"WorkData#{ymd}#{work_num:02}",
+                    "datetime": ymd,
+                    "date_code": "0",
+                    "work_code": "01" if work_hours else None,
+                    "start_datetime": None,
+                    "end_datetime": None,
+                    "break_hours": rng.choice(HOURS) or None,
+                    "work_hours": work_hours,
+                    "night_hours": rng.choice(HOURS) or None,
+                    "memo": rng.choice([None, "memo"]),
+                }
+            )
+    return rows
+
+
+def simulate(rounds: int, seed: int, store_module: Any) -> None:
+    """
+    ランダムな登録・再登録・競合する登録を行う
+
+    motoはスレッドセーフではないため、同時登録は「読み込み後・書き込み前に
+    別の登録が割り込む」順序を再現して確認する
+    """
+    rng = random.Random(seed)
+    users = ["1000001", "1000002", "1000003"]
+    get_stored_rows = store_module.get_stored_rows
+    for _ in range(rounds):
+        user_id = rng.choice(users)
+        batch = random_rows(rng, user_id)
+        racing_batches = [
+            random_rows(rng, user_id) for _ in range(rng.randint(0, 2))
+        ]
+
+        def racing_get_stored_rows(*args: Any) -> dict:
+            stored_rows = get_stored_rows(*args)
+            if racing_batches:
+                store_module.get_stored_rows = get_stored_rows
+                try:
+                    store_module.store_work_data(racing_batches.pop())
+                finally:
+                    store_module.get_stored_rows = racing_get_stored_rows
+            return stored_rows
+
+        store_module.get_stored_rows = racing_get_stored_rows
+        try:
+            store_module.store_work_data(batch)
+        finally:
+            store_module.get_stored_rows = get_stored_rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--table", help="確認する実際のテーブル名")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.table:
+        from tools.local_pipeline.pipeline import add_lambda_paths
+
+        add_lambda_paths()
+        store_module = importlib.import_module(
+            "store_work_data.store_work_data"
+        )
+        errors = check_table(args.table, store_module)
+    else:
+        with LocalPipeline() as pipeline:
+            store_module = pipeline.modules["StoreWorkData"]
+            simulate(args.rounds, args.seed, store_module)
+            errors = check_table(TABLE_NAME, store_module)
+
+    for error in errors:
+        print(error)
+    print(f"{len(errors)} mismatches")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
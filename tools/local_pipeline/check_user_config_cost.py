@@ -0,0 +1,174 @@
+"""
+最新のユーザ設定の取得コストが、設定の版の数に依らず一定であることの確認
+
+moto上で1人の社員の設定の版を増やしながら、以前の取得方法(全ての版を
+取得して先頭を使う)とUserConfig#LATESTのGetItemの読み込み量を比較する
+版を増やすごとにCreateUserConfigを実行し、UserConfig#LATESTが最新の版を
+指していること・versionが1ずつ増えることも確認する
+
+    python -m tools.local_pipeline.check_user_config_cost
+    python -m tools.local_pipeline.check_user_config_cost --versions 1 10 100 1000
+"""
+
+import argparse
+import importlib
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+import boto3
+
+from tools.local_pipeline.pipeline import TABLE_NAME, LocalPipeline
+
+USER_ID: str = "1000001"
+
+
+def item_size(item: dict) -> int:
+    """
+    DynamoDB形式の項目のサイズ(属性名と値のバイト数の合計)を概算する
+    """
+    size = 0
+    for name, value in item.items():
+        size += len(name.encode())
+        for value_type, body in value.items():
+            if value_type == "N":
+                size += math.ceil(len(body.lstrip("-")) / 2) + 1
+            else:
+                size += len(str(body).encode())
+    return size
+
+
+def read_units(size: int) -> float:
+    """
+    結果整合性のある読み込みの消費RCU(4KB単位で0.5)
+    """
+    return max(1, math.ceil(size / 4096)) * 0.5
+
+
+def query_all_versions(dynamodb: Any) -> list[dict]:
+    """
+    以前の取得方法(社員の全ての版を新しい順に取得する)
+    """
+    items: list[dict] = []
+    params: dict = {
+        "TableName": TABLE_NAME,
+        "KeyConditionExpression": "id = :id AND begins_with(SK, :sk)",
+        "ExpressionAttributeValues": {
+            ":id": {"S": USER_ID},
+            ":sk": {"S": "UserConfig#"},
+        },
+        "ScanIndexForward": False,
+    }
+    while True:
+        res = dynamodb.query(**params)
+        items.extend(res["Items"])
+        if "LastEvaluatedKey" not in res:
+            return items
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+
+def add_versions(dynamodb: Any, start: int, stop: int) -> None:
+    """
+    移行前に登録された版を模擬して追加する
+    """
+    base = datetime(2023, 1, 1)
+    for n in range(start, stop):
+        created_at = (base + timedelta(minutes=n)).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        dynamodb.put_item(
+            TableName=TABLE_NAME,
+            Item={
+                "id": {"S": USER_ID},
+                "SK": {"S": f"UserConfig#{created_at}"},
+                "created_at": {"S": created_at},
+                "template_id": {"S": "local"},
+                "time_sharing": {"S": "15"},
+                "user_name": {"S": "ローカル 太郎"},
+            },
+        )
+
+
+def measure(func: Callable[[], Any], repeat: int) -> tuple[Any, float]:
+    """
+    処理を繰り返し実行し、1回あたりの時間(ミリ秒)を返す
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--versions", type=int, nargs="+", default=[1, 10, 100, 1000]
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    errors: list[str] = []
+    with LocalPipeline() as pipeline:
+        dynamodb = boto3.client("dynamodb")
+        get_latest_user_config = importlib.import_module(
+            "workforce_buddy_core"
+        ).get_latest_user_config
+
+        print(
+            f"{'versions':>8} {'version':>7}  "
+            f"{'query items':>11} {'query RCU':>9} {'query ms':>8}  "
+            f"{'get items':>9} {'get RCU':>7} {'get ms':>6}"
+        )
+        added = 0
+        for executions, target in enumerate(sorted(args.versions), 1):
+            # 各回の最後の1件はCreateUserConfigで登録する
+            add_versions(dynamodb, added, target - executions)
+            added = max(added, target - executions)
+            # 版のSKは秒単位のため、前の実行と異なる時刻に実行する
+            time.sleep(1 - time.time() % 1)
+            report = pipeline.execute(
+                {"work_info": {"user_id": USER_ID}}, name="CreateUserConfig"
+            )
+            if report.status != "SUCCEEDED":
+                errors.append(f"{target}: CreateUserConfig {report.status}")
+                break
+
+            versions, query_ms = measure(
+                lambda: query_all_versions(dynamodb), args.repeat
+            )
+            latest, get_ms = measure(
+                lambda: get_latest_user_config(TABLE_NAME, USER_ID),
+                args.repeat,
+            )
+            # UserConfig#LATEST を除いた、以前の取得方法の先頭の版
+            history = [v for v in versions if v["SK"] != latest["SK"]]
+            if latest["version_sk"] != history[0]["SK"]:
+                errors.append(
+                    f"{target}: LATEST points to {latest['version_sk']['S']}, "
+                    f"newest version is {history[0]['SK']['S']}"
+                )
+            if latest["version"]["N"] != str(executions):
+                errors.append(
+                    f"{target}: version {latest['version']['N']}, "
+                    f"expected {executions}"
+                )
+
+            query_rcu = read_units(sum(item_size(v) for v in versions))
+            get_rcu = read_units(item_size(latest))
+            print(
+                f"{len(history):>8} {latest['version']['N']:>7}  "
+                f"{len(versions):>11} {query_rcu:>9.1f} {query_ms:>8.2f}  "
+                f"{1:>9} {get_rcu:>7.1f} {get_ms:>6.2f}"
+            )
+            if get_rcu != read_units(0):
+                errors.append(f"{target}: GetItem consumed {get_rcu} RCU")
+
+    for error in errors:
+        print(error)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
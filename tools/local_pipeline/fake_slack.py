@@ -0,0 +1,324 @@
+"""
+ローカル実行用のSlack Web APIスタンドイン
+
+勤務データの取得・勤務表の送信で使用するAPIのみを実装する
+"""
+
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class FakeFile:
+    """
+    Slack上のファイル
+    """
+
+    id: str
+    name: str
+    content: bytes
+    filetype: str = "text"
+    title: str = ""
+
+
+@dataclass
+class FakeSlackState:
+    """
+    スタンドインが保持するファイル・メッセージ・呼び出し回数・ダウンロード量
+    ・受け付けた接続数・レート制限で拒否した回数
+    """
+
+    files: dict[str, FakeFile] = field(default_factory=dict)
+    messages: list[dict] = field(default_factory=list)
+    calls: dict[str, int] = field(default_factory=dict)
+    rate_limited: dict[str, int] = field(default_factory=dict)
+    downloaded_bytes: int = 0
+    connections: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class FakeSlackServer:
+    """
+    Slack Web APIのスタンドインとなるHTTPサーバ
+
+    Args:
+        host (str): 待ち受けるホスト
+        port (int): 待ち受けるポート(0の場合は空きポート)
+        connect_delay (float): 新しい接続ごとの待ち時間(秒, TLSの確立を模擬する)
+        rate_limits (dict[str, int]): メソッドごとの集計期間あたりの呼び出し上限
+            (超えた呼び出しにはRetry-After付きの429を返す)
+        rate_window (float): レート制限の集計期間(秒, Slackと同じ1分)
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        connect_delay: float = 0,
+        rate_limits: Optional[dict[str, int]] = None,
+        rate_window: float = 60,
+    ) -> None:
+        self.state = FakeSlackState()
+        self.connect_delay = connect_delay
+        self.rate_limits: dict[str, int] = dict(rate_limits or {})
+        self.rate_window = rate_window
+        self._recent_calls: dict[str, deque] = {}
+        handler = type(
+            "FakeSlackHandler", (_FakeSlackHandler,), {"server_state": self}
+        )
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/api/"
+
+    def start(self) -> "FakeSlackServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeSlackServer":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def add_file(
+        self, name: str, content: bytes, filetype: str = "text"
+    ) -> str:
+        """
+        ユーザがアップロードしたファイルを登録する
+
+        Returns:
+            str: ファイルID
+        """
+        file_id = f"F{uuid.uuid4().hex[:10].upper()}"
+        with self.state.lock:
+            self.state.files[file_id] = FakeFile(
+                id=file_id, name=name, content=content, filetype=filetype
+            )
+        return file_id
+
+    def check_rate_limit(self, method: str) -> Optional[int]:
+        """
+        呼び出しをレート制限の集計に加える
+
+        Returns:
+            Optional[int]: 上限を超えた場合は再試行までの秒数(Retry-After)
+        """
+        limit = self.rate_limits.get(method)
+        if limit is None:
+            return None
+
+        now = time.monotonic()
+        with self.state.lock:
+            recent = self._recent_calls.setdefault(method, deque())
+            while recent and recent[0] <= now - self.rate_window:
+                recent.popleft()
+            if len(recent) < limit:
+                recent.append(now)
+                return None
+            self.state.rate_limited[method] = (
+                self.state.rate_limited.get(method, 0) + 1
+            )
+            return max(1, math.ceil(recent[0] + self.rate_window - now))
+
+    def file_info(self, file_id: str) -> Optional[dict]:
+        f = self.state.files.get(file_id)
+        if f is None:
+            return None
+        return {
+            "id": f.id,
+            "name": f.name,
+            "title": f.title or f.name,
+            "filetype": f.filetype,
+            "size": len(f.content),
+            "url_private_download": f"{self.base_url}/download/{f.id}",
+            "permalink": f"{self.base_url}/files/{f.id}",
+        }
+
+
+class _FakeSlackHandler(BaseHTTPRequestHandler):
+    server_state: FakeSlackServer
+
+    # keep-aliveによる接続の再利用を受け付ける
+    protocol_version = "HTTP/1.1"
+    # ヘッダーと本文を別々に送信するため、Nagleアルゴリズムによる遅延を避ける
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server_state.state.lock:
+            self.server_state.state.connections += 1
+        if self.server_state.connect_delay:
+            time.sleep(self.server_state.connect_delay)
+
+    def handle(self) -> None:
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            # クライアントが受信を打ち切って切断した
+            pass
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _params(self, body: bytes) -> dict:
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        content_type = self.headers.get("Content-Type", "")
+        if body and "application/json" in content_type:
+            params.update(json.loads(body))
+        elif body:
+            params.update(
+                {k: v[0] for k, v in parse_qs(body.decode()).items()}
+            )
+        return params
+
+    def _send(
+        self,
+        status: int,
+        body: Any,
+        content_type: str = "application/json",
+        headers: Optional[dict] = None,
+    ) -> None:
+        data = body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._dispatch()
+
+    def do_POST(self) -> None:
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        slack = self.server_state
+        path = urlparse(self.path).path
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if path.startswith("/download/"):
+            self._download(path.rsplit("/", 1)[-1])
+            return
+        if path.startswith("/upload/"):
+            file_id = path.rsplit("/", 1)[-1]
+            with slack.state.lock:
+                slack.state.files[file_id].content = body
+            self._send(200, b"OK", "text/plain")
+            return
+
+        params = self._params(body)
+
+        method = path[len("/api/") :]
+        with slack.state.lock:
+            slack.state.calls[method] = slack.state.calls.get(method, 0) + 1
+        retry_after = slack.check_rate_limit(method)
+        if retry_after is not None:
+            self._send(
+                429,
+                {"ok": False, "error": "ratelimited"},
+                headers={"Retry-After": str(retry_after)},
+            )
+            return
+        self._api(method, params)
+
+    def _download(self, file_id: str) -> None:
+        f = self.server_state.state.files.get(file_id)
+        if f is None:
+            self._send(404, b"not found", "text/plain")
+            return
+
+        # Rangeヘッダー(bytes=start-end)に対応する
+        content, status, headers = f.content, 200, {}
+        match = re.fullmatch(
+            r"bytes=(\d+)-(\d*)", self.headers.get("Range", "")
+        )
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2) or len(f.content) - 1)
+            content = f.content[start : end + 1]
+            status = 206
+            headers["Content-Range"] = (
+                f"bytes {start}-{start + len(content) - 1}/{len(f.content)}"
+            )
+        with self.server_state.state.lock:
+            state = self.server_state.state
+            state.calls["download"] = state.calls.get("download", 0) + 1
+            state.downloaded_bytes += len(content)
+        self._send(status, content, "application/octet-stream", headers)
+
+    def _api(self, method: str, params: dict) -> None:
+        slack = self.server_state
+        if method == "auth.test":
+            self._send(
+                200,
+                {"ok": True, "user_id": "UBOT", "bot_id": "BBOT"},
+            )
+        elif method == "files.info":
+            info = slack.file_info(params.get("file", ""))
+            if info is None:
+                self._send(200, {"ok": False, "error": "file_not_found"})
+            else:
+                self._send(200, {"ok": True, "file": info})
+        elif method == "files.getUploadURLExternal":
+            file_id = f"F{uuid.uuid4().hex[:10].upper()}"
+            with slack.state.lock:
+                slack.state.files[file_id] = FakeFile(
+                    id=file_id, name=params.get("filename", ""), content=b""
+                )
+            self._send(
+                200,
+                {
+                    "ok": True,
+                    "file_id": file_id,
+                    "upload_url": f"{slack.base_url}/upload/{file_id}",
+                },
+            )
+        elif method == "files.completeUploadExternal":
+            files = params.get("files", "[]")
+            files = json.loads(files) if isinstance(files, str) else files
+            with slack.state.lock:
+                for f in files:
+                    slack.state.files[f["id"]].title = f.get("title", "")
+            self._send(
+                200,
+                {"ok": True, "files": [{"id": f["id"]} for f in files]},
+            )
+        elif method == "chat.postMessage":
+            with slack.state.lock:
+                slack.state.messages.append(
+                    {
+                        "channel": params.get("channel"),
+                        "text": params.get("text"),
+                    }
+                )
+            self._send(200, {"ok": True, "ts": "0000000000.000000"})
+        else:
+            self._send(200, {"ok": False, "error": "unknown_method"})
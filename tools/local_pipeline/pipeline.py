@@ -0,0 +1,485 @@
+"""
+WorkScheduleMakerのローカル実行環境
+
+moto上のS3/DynamoDBとSlackのスタンドインを用意し、Lambdaハンドラを
+プロセス内で呼び出しながらASL定義をそのまま実行する
+"""
+
+import calendar
+import importlib
+import io
+import json
+import os
+import re
+import sys
+from datetime import date
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, Optional
+
+from tools.local_pipeline.asl import (
+    ExecutionReport,
+    LocalStateMachine,
+    StatesError,
+)
+from tools.local_pipeline.fake_slack import FakeSlackServer
+
+ROOT_DIR: Path = Path(__file__).resolve().parents[2]
+LAMBDA_DIR: Path = ROOT_DIR / "src" / "lambda"
+CORE_LAYER_DIR: Path = (
+    ROOT_DIR / "src" / "layer" / "workforce_buddy_core" / "python"
+)
+STEPFUNCTIONS_DIR: Path = ROOT_DIR / "src" / "stepfunctions"
+
+TABLE_NAME: str = "WorkScheduleTable"
+BUCKET_NAME: str = "workschedule-bucket"
+SLACK_BOT_TOKEN: str = "xoxb-local"
+SLACK_SIGNING_SECRET: str = "local-signing-secret"
+# スタンドインのauth.testが返すBOTのユーザID
+SLACK_BOT_ID: str = "UBOT"
+DEFAULT_TEMPLATE_ID: str = "T0001"
+
+# 勤務月・テンプレートごとのユーザ一覧(lib/construct/workschedule/datastore.ts)
+INVERTED_INDEX: dict = {
+    "IndexName": "InvertedIndex",
+    "KeySchema": [
+        {"AttributeName": "index_pk", "KeyType": "HASH"},
+        {"AttributeName": "index_sk", "KeyType": "RANGE"},
+    ],
+    "Projection": {
+        "ProjectionType": "INCLUDE",
+        "NonKeyAttributes": [
+            "work_minutes",
+            "night_minutes",
+            "break_minutes",
+            "template_id",
+        ],
+    },
+}
+
+# ASL定義のプレースホルダと関数名の対応(lib/construct/workschedule/batch.ts)
+FUNCTION_PLACEHOLDERS: dict[str, str] = {
+    "GET_WORK_DATA_LAMBDA_ARN": "GetWorkData",
+    "STORE_WORK_DATA_LAMBDA_ARN": "StoreWorkData",
+    "CREATE_WORK_SCHEDULE_LAMBDA_ARN": "CreateWorkSchedule",
+    "SEND_WORK_SCHEDULE_LAMBDA_ARN": "SendWorkSchedule",
+}
+
+# batch.tsが置き換えるテーブル名のプレースホルダ
+TABLE_PLACEHOLDER: str = "WORKSCHEDULE_TABLE_NAME"
+
+# 置き換え漏れのプレースホルダ(デプロイ時にも置き換えられず、そのまま残る)
+UNRESOLVED_PLACEHOLDER: re.Pattern = re.compile(
+    r'"[A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+_(?:NAME|ARN|KEY)"'
+)
+
+# 関数名とハンドラモジュールの対応
+FUNCTION_MODULES: dict[str, str] = {
+    "GetWorkData": "get_work_data.get_work_data",
+    "StoreWorkData": "store_work_data.store_work_data",
+    "CreateWorkSchedule": "create_work_schedule.create_work_schedule",
+    "SendWorkSchedule": "send_work_schedule.send_work_schedule",
+    "RunWorkSchedule": "run_work_schedule.run_work_schedule",
+    "CreateTeamReport": "create_team_report.create_team_report",
+}
+
+# 勤務データファイルの見出し行(ローカルで生成するサンプル用)
+# (見出しの文言は検証しないため、実際のエクスポートと一致しなくてもよい)
+SAMPLE_FILE_HEADER: list[str] = [
+    "社員番号",
+    "氏名",
+    "日付",
+    "勤務番号",
+    "日付区分コード",
+    "日付区分",
+    "勤務形態コード",
+    "勤務形態",
+    "開始時刻",
+    "終了時刻",
+    "開始時刻(丸め)",
+    "終了時刻(丸め)",
+    "休憩時間",
+    "勤務時間",
+    "深夜時間",
+    "備考",
+    "承認者",
+    "承認日時",
+    "第二承認者",
+    "第二承認日時",
+    "第三承認者",
+    "第三承認日時",
+]
+
+
+def add_lambda_paths() -> None:
+    """
+    Lambda関数と共通レイヤ(workforce_buddy_core)をimportできるようにする
+    """
+    for path in [CORE_LAYER_DIR, LAMBDA_DIR]:
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+
+def make_sample_work_file(
+    user_id: str, user_name: str, work_month: str
+) -> bytes:
+    """
+    1か月分の勤務データファイル(TSV, Shift-JIS)を生成する
+
+    Args:
+        user_id (str): 社員番号
+        user_name (str): 氏名
+        work_month (str): 勤務月(ex: '2023-07')
+
+    Returns:
+        bytes: 勤務データファイル
+    """
+    year, month = map(int, work_month.split("-"))
+    lines: list[str] = ["\t".join(SAMPLE_FILE_HEADER)]
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
+        workday = date(year, month, day).weekday() < 5
+        row: list[str] = [
+            user_id,
+            user_name,
+            f"{year}{month:02}{day:02}",
+            "1",
+            "0" if workday else "1",
+            "平日" if workday else "休日",
+            "01" if workday else "",
+            "客先常駐" if workday else "",
+            "09:00" if workday else "",
+            "18:00" if workday else "",
+            "09:00" if workday else "",
+            "18:00" if workday else "",
+            "1:00" if workday else "",
+            "8:00" if workday else "",
+            "0:00" if workday else "",
+        ] + [""] * 7
+        lines.append("\t".join(row))
+
+    return ("\r\n".join(lines) + "\r\n").encode("shift_jis")
+
+
+def make_template_file() -> bytes:
+    """
+    勤務表テンプレート(Excel)を生成する
+    """
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    ws = wb.worksheets[0]
+    ws["A4"], ws["B4"], ws["C4"], ws["D4"] = "日", "曜日", "開始", "終了"
+    with io.BytesIO() as file:
+        wb.save(file)
+        return file.getvalue()
+
+
+class LocalStepFunctionsClient:
+    """
+    start_executionをローカルのステートマシンで処理するクライアント
+
+    Args:
+        pipeline (LocalPipeline): ローカル実行環境
+    """
+
+    def __init__(self, pipeline: "LocalPipeline") -> None:
+        self.pipeline = pipeline
+        self.reports: list[ExecutionReport] = []
+
+    def start_execution(self, stateMachineArn: str, input: str) -> dict:
+        name = stateMachineArn.rsplit(":", 1)[-1]
+        report = self.pipeline.execute(json.loads(input), name)
+        self.reports.append(report)
+        return {"executionArn": f"arn:aws:states:local:execution:{name}"}
+
+
+class LocalPipeline:
+    """
+    WorkScheduleMakerをローカルで実行する環境
+
+    with文で使用すると、motoのモックとSlackのスタンドインを起動・停止する
+
+    Args:
+        slack (FakeSlackServer): 使用するSlackのスタンドイン(省略時は作成する)
+    """
+
+    def __init__(self, slack: Optional[FakeSlackServer] = None) -> None:
+        self.slack = slack or FakeSlackServer()
+        self.functions: dict[str, Callable[[dict, Any], Any]] = {}
+        self.modules: dict[str, ModuleType] = {}
+        self._mock: Any = None
+        self._env: dict[str, Optional[str]] = {}
+        self.state_machines: dict[str, LocalStateMachine] = {}
+
+    def __enter__(self) -> "LocalPipeline":
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    # --------------------------------------------------------------
+    # 起動・停止
+
+    def start(self) -> "LocalPipeline":
+        from moto import mock_aws
+
+        self.slack.start()
+        self._set_env(
+            {
+                "AWS_DEFAULT_REGION": "ap-northeast-1",
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+                "TABLE_NAME": TABLE_NAME,
+                "BUCKET_NAME": BUCKET_NAME,
+                "SLACK_BOT_TOKEN": SLACK_BOT_TOKEN,
+                "SLACK_SIGNING_SECRET": SLACK_SIGNING_SECRET,
+                "SLACK_BOT_ID": SLACK_BOT_ID,
+                "SLACK_API_URL": self.slack.api_url,
+                "WORKSCHEDULE_MAKER_KEY": "WorkScheduleMaker",
+            }
+        )
+        self._mock = mock_aws()
+        self._mock.start()
+
+        self.create_resources()
+        self.seed()
+        self.load_functions()
+        self.load_state_machines()
+
+        return self
+
+    def stop(self) -> None:
+        # motoのモック中に作成したクライアントを破棄する
+        if "workforce_buddy_core" in sys.modules:
+            sys.modules["workforce_buddy_core"].reset_clients()
+        if self._mock is not None:
+            self._mock.stop()
+            self._mock = None
+        self.slack.stop()
+        for key, value in self._env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    def _set_env(self, env: dict[str, str]) -> None:
+        for key, value in env.items():
+            self._env.setdefault(key, os.environ.get(key))
+            os.environ[key] = value
+
+    # --------------------------------------------------------------
+    # リソース
+
+    def create_resources(self) -> None:
+        """
+        lib/construct/workschedule/datastore.ts と同じ構成のテーブルと
+        バケットを作成する
+        """
+        import boto3
+
+        boto3.client("dynamodb").create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[
+                {"AttributeName": "id", "KeyType": "HASH"},
+                {"AttributeName": "SK", "KeyType": "RANGE"},
+            ],
+            AttributeDefinitions=[
+                {"AttributeName": "id", "AttributeType": "S"},
+                {"AttributeName": "SK", "AttributeType": "S"},
+                {"AttributeName": "index_pk", "AttributeType": "S"},
+                {"AttributeName": "index_sk", "AttributeType": "S"},
+            ],
+            GlobalSecondaryIndexes=[INVERTED_INDEX],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        boto3.client("s3").create_bucket(
+            Bucket=BUCKET_NAME,
+            CreateBucketConfiguration={
+                "LocationConstraint": os.environ["AWS_DEFAULT_REGION"]
+            },
+        )
+
+    def seed(self) -> None:
+        """
+        デフォルトのユーザ設定・テンプレート設定・テンプレートを登録する
+        """
+        import boto3
+
+        dynamodb = boto3.client("dynamodb")
+        basic_user_config: dict = {
+            "id": {"S": "0000000"},
+            "SK": {"S": "UserConfig#2023-01-01 00:00:00"},
+            "created_at": {"S": "2023-01-01 00:00:00"},
+            "template_id": {"S": DEFAULT_TEMPLATE_ID},
+            "time_sharing": {"S": "15"},
+            "user_name": {"S": "ローカル 太郎"},
+            "version_sk": {"S": "UserConfig#2023-01-01 00:00:00"},
+            "version": {"N": "1"},
+        }
+        for sort_key in [
+            "UserConfig#2023-01-01 00:00:00",
+            "UserConfig#LATEST",
+        ]:
+            dynamodb.put_item(
+                TableName=TABLE_NAME,
+                Item={**basic_user_config, "SK": {"S": sort_key}},
+            )
+        dynamodb.put_item(
+            TableName=TABLE_NAME,
+            Item={
+                "id": {"S": DEFAULT_TEMPLATE_ID},
+                "SK": {"S": "TemplateConfig"},
+                "name": {"S": "template.xlsx"},
+                "version": {"N": "1"},
+                "year_month_formats": {
+                    "S": json.dumps(
+                        {"year": "{year}年", "month": "{month}月"},
+                        ensure_ascii=False,
+                    )
+                },
+                "year_month_cells": {
+                    "S": json.dumps({"year": "A1", "month": "B1"})
+                },
+                "user_name_cell": {"S": "D1"},
+                "start_cells": {
+                    "S": json.dumps(
+                        {
+                            "work_day": "A5",
+                            "work_weekday": "B5",
+                            "start_time": "C5",
+                            "end_time": "D5",
+                        }
+                    )
+                },
+            },
+        )
+        boto3.client("s3").put_object(
+            Bucket=BUCKET_NAME,
+            Key="template/template.xlsx",
+            Body=make_template_file(),
+        )
+
+    # --------------------------------------------------------------
+    # Lambda関数
+
+    def load_functions(self) -> None:
+        """
+        Lambdaハンドラを読み込み、Step Functionsをローカルのステートマシンへ向ける
+        (SlackのAPIは環境変数SLACK_API_URLでスタンドインへ向ける)
+        """
+        add_lambda_paths()
+        core = importlib.import_module("workforce_buddy_core")
+        core.reset_clients()
+
+        for function_name, module_name in FUNCTION_MODULES.items():
+            module = importlib.import_module(module_name)
+            self.modules[function_name] = module
+            self.functions[function_name] = module.lambda_handler
+
+        core.register_client("stepfunctions", LocalStepFunctionsClient(self))
+
+    def invoke(self, function_name: str, payload: Any) -> Any:
+        """
+        Lambda関数をプロセス内で呼び出す
+        """
+        return self.functions[function_name](payload, None)
+
+    # --------------------------------------------------------------
+    # ステートマシン
+
+    def load_state_machines(self) -> None:
+        """
+        src/stepfunctions のASL定義を読み込む
+
+        プレースホルダはbatch.tsと同じもののみ置き換え、置き換えられずに
+        残ったものがあればエラーとする
+        """
+        for name, file_name in [
+            ("CreateUserConfig", "CreateUserConfig.asl.json"),
+            ("WorkScheduleMaker", "WorkScheduleStatemachine.asl.json"),
+        ]:
+            definition = (STEPFUNCTIONS_DIR / file_name).read_text()
+            for placeholder, function_name in FUNCTION_PLACEHOLDERS.items():
+                definition = definition.replace(placeholder, function_name)
+            definition = definition.replace(TABLE_PLACEHOLDER, TABLE_NAME)
+            unresolved = UNRESOLVED_PLACEHOLDER.findall(definition)
+            if unresolved:
+                raise ValueError(
+                    f"{file_name}: unresolved placeholders {unresolved}"
+                )
+            self.state_machines[name] = LocalStateMachine(
+                json.loads(definition), self.run_task, name
+            )
+
+    def execute(
+        self, execution_input: Any, name: str = "WorkScheduleMaker"
+    ) -> ExecutionReport:
+        """
+        ステートマシンを実行する
+        """
+        return self.state_machines[name].execute(execution_input)
+
+    def upload(
+        self,
+        content: bytes,
+        file_name: str = "work_data.tsv",
+        user_id: str = "ULOCAL",
+        channel_id: str = "CLOCAL",
+        filetype: str = "text",
+    ) -> dict:
+        """
+        Slackへのファイルアップロードを模擬し、ステートマシンの入力を返す
+        """
+        file_id = self.slack.add_file(file_name, content, filetype)
+        return {
+            "slack_info": {
+                "file_id": file_id,
+                "user_id": user_id,
+                "channel_id": channel_id,
+            }
+        }
+
+    def run_task(self, resource: str, parameters: Any) -> Any:
+        """
+        Taskステートのリソースを実行する
+        """
+        import boto3
+        from botocore.exceptions import ClientError
+
+        prefix = "arn:aws:states:::"
+        integration = resource[len(prefix) :]
+
+        if integration == "lambda:invoke":
+            payload = self.invoke(
+                parameters["FunctionName"], parameters.get("Payload")
+            )
+            return {"Payload": payload, "StatusCode": 200}
+
+        if integration.startswith("states:startExecution"):
+            report = self.execute(
+                parameters.get("Input"), parameters["StateMachineArn"]
+            )
+            if report.error is not None:
+                raise report.error
+            return {"Output": report.output, "Status": report.status}
+
+        if integration.startswith("aws-sdk:dynamodb:"):
+            error_prefix, action = "DynamoDb", integration.split(":")[-1]
+        elif integration.startswith("dynamodb:"):
+            error_prefix, action = "DynamoDB", integration.split(":")[-1]
+        else:
+            raise StatesError(
+                "States.Runtime", f"Unsupported resource: {resource}"
+            )
+
+        # camelCaseのアクション名をboto3のメソッド名へ変換
+        method = "".join(f"_{c.lower()}" if c.isupper() else c for c in action)
+        try:
+            res = getattr(boto3.client("dynamodb"), method)(**parameters)
+        except ClientError as err:
+            raise StatesError(
+                f"{error_prefix}.{err.response['Error']['Code']}", str(err)
+            )
+        res.pop("ResponseMetadata", None)
+
+        return res
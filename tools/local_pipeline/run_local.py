@@ -0,0 +1,63 @@
+"""
+WorkScheduleMakerをローカルで実行し、ステートごとの処理時間を表示する
+
+Usage:
+    python -m tools.local_pipeline.run_local --sample-month 2023-07
+    python -m tools.local_pipeline.run_local --file work_data.tsv
+    python -m tools.local_pipeline.run_local --sample-month 2023-07 --mode direct
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from tools.local_pipeline.pipeline import LocalPipeline, make_sample_work_file
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", type=Path, help="勤務データファイル(TSV)")
+    source.add_argument("--sample-month", help="サンプルを生成する勤務月")
+    parser.add_argument("--user-id", default="1234567", help="社員番号")
+    parser.add_argument(
+        "--mode",
+        choices=["statemachine", "direct"],
+        default="statemachine",
+        help="ステートマシン経由か、RunWorkScheduleでの同期実行か",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="実行回数(2回目以降はウォーム)"
+    )
+    args = parser.parse_args()
+
+    content: bytes = (
+        args.file.read_bytes()
+        if args.file
+        else make_sample_work_file(
+            args.user_id, "ローカル 太郎", args.sample_month
+        )
+    )
+
+    with LocalPipeline() as pipeline:
+        for i in range(args.repeat):
+            execution_input = pipeline.upload(content)
+            print(f"--- run {i + 1} ({args.mode})")
+            if args.mode == "statemachine":
+                report = pipeline.execute(execution_input)
+                print(report.format())
+            else:
+                start = time.perf_counter()
+                res = pipeline.invoke("RunWorkSchedule", execution_input)
+                elapsed = time.perf_counter() - start
+                print(f"elapsed: {elapsed:.3f}s")
+                print(json.dumps(res, ensure_ascii=False, indent=2))
+
+        print("--- slack messages")
+        for message in pipeline.slack.state.messages:
+            print(json.dumps(message, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+既存の項目にInvertedIndexのキー(index_pk, index_sk)を設定する
+
+    python -m tools.maintenance.backfill_inverted_index --table WorkScheduleTable
+    python -m tools.maintenance.backfill_inverted_index --table WorkScheduleTable --dry-run
+
+- Summary#yyyy-mm: Month#yyyy-mm / 社員番号
+- 最新のUserConfig: Template#テンプレートID / 社員番号
+"""
+
+import argparse
+from typing import Any, Iterator
+
+import boto3
+
+# デフォルトのユーザ設定を持つユーザID(インデックスに含めない)
+DEFAULT_USER_ID: str = "0000000"
+
+
+def scan_targets(dynamodb: Any, table_name: str) -> Iterator[dict]:
+    """
+    UserConfig・Summaryを取得する
+    """
+    params: dict = {
+        "TableName": table_name,
+        "FilterExpression": (
+            "begins_with(SK, :user_config) OR begins_with(SK, :summary)"
+        ),
+        "ExpressionAttributeValues": {
+            ":user_config": {"S": "UserConfig"},
+            ":summary": {"S": "Summary#"},
+        },
+        "ProjectionExpression": "id, SK, template_id, index_pk",
+    }
+    while True:
+        res = dynamodb.scan(**params)
+        yield from res["Items"]
+        if "LastEvaluatedKey" not in res:
+            return
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+
+def find_index_keys(items: Iterator[dict]) -> list[tuple[dict, str, str]]:
+    """
+    項目ごとに設定するインデックスのキーを決める
+
+    UserConfigは社員ごとに最新のものだけを対象とし、
+    既にキーを持つ項目は対象外とする
+
+    Returns:
+        list[tuple[dict, str, str]]: (項目のキー, index_pk, index_sk)のリスト
+    """
+    targets: list[tuple[dict, str, str]] = []
+    latest_configs: dict[str, dict] = {}
+    for item in items:
+        user_id: str = item["id"]["S"]
+        sort_key: str = item["SK"]["S"]
+        if sort_key.startswith("Summary#"):
+            if "index_pk" in item:
+                continue
+            work_month = sort_key[len("Summary#") :]
+            targets.append(
+                (
+                    {"id": item["id"], "SK": item["SK"]},
+                    f"Month#{work_month}",
+                    user_id,
+                )
+            )
+        elif user_id != DEFAULT_USER_ID and "template_id" in item:
+            latest = latest_configs.get(user_id)
+            if latest is None or latest["SK"]["S"] < sort_key:
+                latest_configs[user_id] = item
+
+    for user_id, item in latest_configs.items():
+        if "index_pk" in item:
+            continue
+        targets.append(
+            (
+                {"id": item["id"], "SK": item["SK"]},
+                f"Template#{item['template_id']['S']}",
+                user_id,
+            )
+        )
+
+    return targets
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    dynamodb = boto3.client("dynamodb")
+    targets = find_index_keys(scan_targets(dynamodb, args.table))
+    for key, index_pk, index_sk in targets:
+        print(f"{key['id']['S']} {key['SK']['S']} -> {index_pk}")
+        if args.dry_run:
+            continue
+        dynamodb.update_item(
+            TableName=args.table,
+            Key=key,
+            UpdateExpression="SET index_pk = :index_pk, index_sk = :index_sk",
+            ConditionExpression="attribute_exists(id)",
+            ExpressionAttributeValues={
+                ":index_pk": {"S": index_pk},
+                ":index_sk": {"S": index_sk},
+            },
+        )
+    print(f"{len(targets)} items")
+
+
+if __name__ == "__main__":
+    main()
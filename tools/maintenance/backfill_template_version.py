@@ -0,0 +1,90 @@
+"""
+version属性を持たないテンプレート設定(TemplateConfig)にversion 1を設定する
+
+    python -m tools.maintenance.backfill_template_version --table WorkScheduleTable
+    python -m tools.maintenance.backfill_template_version --table WorkScheduleTable --dry-run
+
+CreateWorkScheduleはテンプレート設定の参照のversionでキャッシュを判定するため、
+versionのないテンプレート設定は一定時間(TEMPLATE_CACHE_TTL_SECONDS)ごとに
+取得し直す。設定後はversionが変わるまで取得しない
+以降の更新は put_template_config で行う(versionを1ずつ増やす)
+"""
+
+import argparse
+from typing import Any, Iterator
+
+import boto3
+
+TEMPLATE_CONFIG_SK: str = "TemplateConfig"
+
+
+def scan_template_configs(dynamodb: Any, table_name: str) -> Iterator[dict]:
+    """
+    テンプレート設定のキーとversionを全て取得する
+    """
+    params: dict = {
+        "TableName": table_name,
+        "FilterExpression": "SK = :template_config",
+        "ExpressionAttributeValues": {
+            ":template_config": {"S": TEMPLATE_CONFIG_SK},
+        },
+        "ProjectionExpression": "id, SK, #version",
+        "ExpressionAttributeNames": {"#version": "version"},
+    }
+    while True:
+        res = dynamodb.scan(**params)
+        yield from res["Items"]
+        if "LastEvaluatedKey" not in res:
+            return
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+
+def set_initial_version(dynamodb: Any, table_name: str, key: dict) -> bool:
+    """
+    version 1を設定する
+
+    Returns:
+        bool: 設定した場合True(既にversionが設定されていた場合False)
+    """
+    try:
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression="SET #version = :version",
+            ConditionExpression=(
+                "attribute_exists(id) AND attribute_not_exists(#version)"
+            ),
+            ExpressionAttributeNames={"#version": "version"},
+            ExpressionAttributeValues={":version": {"N": "1"}},
+        )
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    dynamodb = boto3.client("dynamodb")
+    templates = list(scan_template_configs(dynamodb, args.table))
+    targets = [item for item in templates if "version" not in item]
+    updated = 0
+    for item in targets:
+        print(f"{item['id']['S']} -> version 1")
+        if args.dry_run:
+            continue
+        key = {"id": item["id"], "SK": item["SK"]}
+        if set_initial_version(dynamodb, args.table, key):
+            updated += 1
+        else:
+            print(f"{item['id']['S']} skipped (already versioned)")
+    print(
+        f"{len(templates)} templates, {len(targets)} unversioned, {updated} updated"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+既存のユーザ設定から最新のユーザ設定(UserConfig#LATEST)を作成する
+
+    python -m tools.maintenance.migrate_user_config_latest --table WorkScheduleTable
+    python -m tools.maintenance.migrate_user_config_latest --table WorkScheduleTable --dry-run
+
+- 社員ごとに最も新しいUserConfig#<作成日時>を複製してUserConfig#LATESTを作成する
+  (version_sk: 複製元のSK, version: 履歴の件数)
+- InvertedIndexのキー(Template#テンプレートID / 社員番号)はUserConfig#LATESTに
+  移し、履歴の項目からは削除する
+- 既にUserConfig#LATESTを持つ社員は対象外とする
+  (移行中に設定が登録された場合も、登録された内容を優先する)
+"""
+
+import argparse
+from typing import Any, Iterator
+
+import boto3
+
+# デフォルトのユーザ設定を持つユーザID(インデックスに含めない)
+DEFAULT_USER_ID: str = "0000000"
+
+USER_CONFIG_PREFIX: str = "UserConfig#"
+USER_CONFIG_LATEST_SK: str = "UserConfig#LATEST"
+
+# 1つのトランザクションで書き込める項目数の上限
+TRANSACTION_MAX_ITEMS: int = 100
+
+
+def scan_user_configs(dynamodb: Any, table_name: str) -> Iterator[dict]:
+    """
+    UserConfigを全て取得する
+    """
+    params: dict = {
+        "TableName": table_name,
+        "FilterExpression": "begins_with(SK, :user_config)",
+        "ExpressionAttributeValues": {
+            ":user_config": {"S": USER_CONFIG_PREFIX},
+        },
+    }
+    while True:
+        res = dynamodb.scan(**params)
+        yield from res["Items"]
+        if "LastEvaluatedKey" not in res:
+            return
+        params["ExclusiveStartKey"] = res["LastEvaluatedKey"]
+
+
+def make_migrations(items: Iterator[dict]) -> list[tuple[dict, list[dict]]]:
+    """
+    社員ごとに作成するUserConfig#LATESTと、インデックスのキーを削除する
+    履歴の項目を決める
+
+    Returns:
+        list[tuple[dict, list[dict]]]:
+            (UserConfig#LATEST, インデックスのキーを削除する項目のキー)のリスト
+    """
+    versions: dict[str, list[dict]] = {}
+    migrated: set[str] = set()
+    for item in items:
+        user_id: str = item["id"]["S"]
+        if item["SK"]["S"] == USER_CONFIG_LATEST_SK:
+            migrated.add(user_id)
+        else:
+            versions.setdefault(user_id, []).append(item)
+
+    migrations: list[tuple[dict, list[dict]]] = []
+    for user_id, user_configs in sorted(versions.items()):
+        if user_id in migrated:
+            continue
+        newest: dict = max(user_configs, key=lambda item: item["SK"]["S"])
+        latest: dict = {
+            **newest,
+            "SK": {"S": USER_CONFIG_LATEST_SK},
+            "version_sk": newest["SK"],
+            "version": {"N": str(len(user_configs))},
+        }
+        latest.pop("index_pk", None)
+        latest.pop("index_sk", None)
+        if user_id != DEFAULT_USER_ID and "template_id" in newest:
+            latest["index_pk"] = {
+                "S": f"Template#{newest['template_id']['S']}"
+            }
+            latest["index_sk"] = {"S": user_id}
+
+        indexed_keys = [
+            {"id": item["id"], "SK": item["SK"]}
+            for item in user_configs
+            if "index_pk" in item
+        ]
+        migrations.append((latest, indexed_keys))
+
+    return migrations
+
+
+def migrate(
+    dynamodb: Any, table_name: str, latest: dict, indexed_keys: list[dict]
+) -> bool:
+    """
+    UserConfig#LATESTの作成と履歴の項目からのインデックスのキーの削除を
+    1つのトランザクションで行う
+
+    Returns:
+        bool: 作成した場合True(既にUserConfig#LATESTがあった場合False)
+    """
+    items: list[dict] = [
+        {
+            "Put": {
+                "TableName": table_name,
+                "Item": latest,
+                "ConditionExpression": "attribute_not_exists(id)",
+            }
+        }
+    ]
+    for key in indexed_keys[: TRANSACTION_MAX_ITEMS - 1]:
+        items.append(
+            {
+                "Update": {
+                    "TableName": table_name,
+                    "Key": key,
+                    "UpdateExpression": "REMOVE index_pk, index_sk",
+                    "ConditionExpression": "attribute_exists(id)",
+                }
+            }
+        )
+    try:
+        dynamodb.transact_write_items(TransactItems=items)
+    except dynamodb.exceptions.TransactionCanceledException:
+        return False
+
+    # トランザクションに含められなかった項目(通常はない)
+    for key in indexed_keys[TRANSACTION_MAX_ITEMS - 1 :]:
+        dynamodb.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression="REMOVE index_pk, index_sk",
+            ConditionExpression="attribute_exists(id)",
+        )
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    dynamodb = boto3.client("dynamodb")
+    migrations = make_migrations(scan_user_configs(dynamodb, args.table))
+    created = 0
+    for latest, indexed_keys in migrations:
+        print(
+            f"{latest['id']['S']} {latest['version_sk']['S']} "
+            f"-> {USER_CONFIG_LATEST_SK} (version {latest['version']['N']}, "
+            f"{len(indexed_keys)} index keys removed)"
+        )
+        if args.dry_run:
+            continue
+        if migrate(dynamodb, args.table, latest, indexed_keys):
+            created += 1
+        else:
+            print(f"{latest['id']['S']} skipped (already migrated)")
+    print(f"{len(migrations)} users, {created} created")
+
+
+if __name__ == "__main__":
+    main()
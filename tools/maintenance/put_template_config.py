@@ -0,0 +1,143 @@
+"""
+テンプレート設定(TemplateConfig)を登録・更新し、versionを1ずつ増やす
+
+    python -m tools.maintenance.put_template_config --table WorkScheduleTable \\
+        --file template_T0001.json
+    python -m tools.maintenance.put_template_config --table WorkScheduleTable \\
+        --file template_T0001.json --dry-run
+
+設定ファイルはテンプレート設定の各項目を持つJSONとする
+(year_month_formats, year_month_cells, start_cells はオブジェクトで記述し、
+DynamoDBにはJSON文字列として格納する)
+
+    {
+        "id": "T0001",
+        "name": "template.xlsx",
+        "year_month_formats": {"year": "{year}年", "month": "{month}月"},
+        "year_month_cells": {"year": "A1", "month": "B1"},
+        "user_name_cell": "D1",
+        "start_cells": {"work_day": "A5", "start_time": "C5"}
+    }
+
+CreateWorkScheduleはversionが変わった場合にのみテンプレート設定を取得し直すため、
+テンプレート設定の更新はこのスクリプトで行う
+(読み込んだversionから変わっていない場合のみ書き込み、変わっていれば読み直す)
+"""
+
+import argparse
+import json
+from typing import Any, Optional
+
+import boto3
+
+TEMPLATE_CONFIG_SK: str = "TemplateConfig"
+
+# テンプレート設定の必須項目
+REQUIRED_FIELDS: tuple[str, ...] = (
+    "id",
+    "name",
+    "year_month_formats",
+    "year_month_cells",
+    "user_name_cell",
+    "start_cells",
+)
+
+# 他の更新と競合した場合に読み直す回数
+MAX_ATTEMPTS: int = 3
+
+
+def make_item(config: dict) -> dict:
+    """
+    設定ファイルの内容をDynamoDB形式の項目にする(versionは含めない)
+    """
+    missing = [field for field in REQUIRED_FIELDS if field not in config]
+    if missing:
+        raise SystemExit(f"missing fields: {missing}")
+
+    item: dict = {"SK": {"S": TEMPLATE_CONFIG_SK}}
+    for key, value in config.items():
+        if key in ("SK", "version"):
+            continue
+        if isinstance(value, (dict, list)):
+            item[key] = {"S": json.dumps(value, ensure_ascii=False)}
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            item[key] = {"S": str(value)}
+        else:
+            item[key] = {"N": str(value)}
+    return item
+
+
+def get_current_version(
+    dynamodb: Any, table_name: str, template_id: str
+) -> Optional[int]:
+    """
+    登録済みのversionを取得する(未登録の場合None, versionがない場合0)
+    """
+    item: Optional[dict] = dynamodb.get_item(
+        TableName=table_name,
+        Key={"id": {"S": template_id}, "SK": {"S": TEMPLATE_CONFIG_SK}},
+        ProjectionExpression="id, #version",
+        ExpressionAttributeNames={"#version": "version"},
+    ).get("Item")
+    if item is None:
+        return None
+    return int(item.get("version", {"N": "0"})["N"])
+
+
+def put_template_config(
+    dynamodb: Any, table_name: str, item: dict, current: Optional[int]
+) -> bool:
+    """
+    読み込んだversionから変わっていない場合のみ、versionを1増やして書き込む
+
+    Returns:
+        bool: 書き込んだ場合True(他の更新と競合した場合False)
+    """
+    params: dict = {
+        "TableName": table_name,
+        "Item": {**item, "version": {"N": str((current or 0) + 1)}},
+    }
+    if current is None:
+        params["ConditionExpression"] = "attribute_not_exists(id)"
+    elif current == 0:
+        params["ConditionExpression"] = "attribute_not_exists(#version)"
+        params["ExpressionAttributeNames"] = {"#version": "version"}
+    else:
+        params["ConditionExpression"] = "#version = :current"
+        params["ExpressionAttributeNames"] = {"#version": "version"}
+        params["ExpressionAttributeValues"] = {":current": {"N": str(current)}}
+    try:
+        dynamodb.put_item(**params)
+    except dynamodb.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--file", required=True)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.file, encoding="utf-8") as f:
+        item = make_item(json.load(f))
+    template_id: str = item["id"]["S"]
+
+    dynamodb = boto3.client("dynamodb")
+    for _ in range(MAX_ATTEMPTS):
+        current = get_current_version(dynamodb, args.table, template_id)
+        print(
+            f"{template_id}: version {current if current is not None else '-'}"
+            f" -> {(current or 0) + 1}"
+        )
+        if args.dry_run:
+            return
+        if put_template_config(dynamodb, args.table, item, current):
+            return
+        print(f"{template_id}: updated concurrently, retrying")
+    raise SystemExit(f"{template_id}: gave up after {MAX_ATTEMPTS} attempts")
+
+
+if __name__ == "__main__":
+    main()